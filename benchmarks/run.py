@@ -0,0 +1,257 @@
+"""
+Offline benchmark runner.
+
+Generates synthetic ERA5, SMAP RSS, CYGNSS, OSCAR and SFMR inputs, serves them through the
+local stand-ins and times every adapter stage (authenticate, build_request_params,
+fetch_raw_data, parse_data, standardize_data, load) for small/medium/large requests.
+Each stage reports seconds, input throughput (MB/s of raw files) and peak memory traced by
+tracemalloc (Python and numpy allocations, not HDF5's own buffers), and is compared against
+the stored baselines. Timing and memory are measured in separate passes, each with an empty
+cache, so tracing overhead does not distort the timings.
+
+Usage:
+    python -m benchmarks.run --size small
+    python -m benchmarks.run --size small medium --check
+    python -m benchmarks.run --size small --update-baselines
+"""
+import argparse
+import datetime
+import gc
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from spatiotemporal_data_library.adapters import ERA5Adapter, SMAPRSSAdapter, NOAACygnssL2Adapter, OSCARAdapter, SFMRAdapter
+from . import synthetic
+from .standins import patched_services, cds_request_key
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = BENCHMARK_DIR / "baselines.json"
+DATA_DIR = BENCHMARK_DIR / ".data"
+STAGES = ("authenticate", "build_request_params", "fetch_raw_data", "parse_data", "standardize_data", "load")
+# Stages that touch the data; throughput is only reported for these
+DATA_STAGES = ("fetch_raw_data", "parse_data", "standardize_data", "load")
+START = datetime.datetime(2023, 1, 1)
+
+SIZES = {
+    "small": {
+        "era5": {"hours": 6, "bbox": [-5, 40, 5, 50]},
+        "smap_rss": {"days": 2, "n_lat": 180, "n_lon": 360},
+        "cygnss": {"days": 2, "samples_per_day": 20_000},
+        "oscar": {"days": 2, "n_lat": 180, "n_lon": 360},
+        "sfmr": {"rows": 20_000},
+    },
+    "medium": {
+        "era5": {"hours": 24, "bbox": [-30, 0, 30, 60]},
+        "smap_rss": {"days": 7, "n_lat": 720, "n_lon": 1440},
+        "cygnss": {"days": 7, "samples_per_day": 200_000},
+        "oscar": {"days": 7, "n_lat": 719, "n_lon": 1440},
+        "sfmr": {"rows": 200_000},
+    },
+    "large": {
+        "era5": {"hours": 48, "bbox": None},
+        "smap_rss": {"days": 30, "n_lat": 720, "n_lon": 1440},
+        "cygnss": {"days": 30, "samples_per_day": 500_000},
+        "oscar": {"days": 30, "n_lat": 719, "n_lon": 1440},
+        "sfmr": {"rows": 1_000_000},
+    },
+}
+
+
+def build_cases(size):
+    """
+    Adapter constructor arguments for every dataset at a given size.
+    Args:
+        size (str): Key of SIZES.
+    Returns:
+        dict: name -> (adapter class, args tuple, kwargs dict).
+    """
+    spec = SIZES[size]
+    end = lambda days: START + datetime.timedelta(days=days) - datetime.timedelta(seconds=1)
+    era5_end = START + datetime.timedelta(hours=spec["era5"]["hours"] - 1)
+    return {
+        "era5": (ERA5Adapter, ("ECMWF_ERA5", ["surface_wind_speed"], START, era5_end, spec["era5"]["bbox"]), {}),
+        "smap_rss": (SMAPRSSAdapter, ("SMAP_L3_RSS_FINAL", ["surface_wind_speed"], START, end(spec["smap_rss"]["days"])), {}),
+        "cygnss": (NOAACygnssL2Adapter, ("NOAA_CYGNSS_L2_V1.2", ["surface_wind_speed"], START, end(spec["cygnss"]["days"])), {}),
+        "oscar": (OSCARAdapter, ("OSCAR_V2_NRT", ["surface_current_speed"], START, end(spec["oscar"]["days"])),
+                  {"oscar_product_type": "nrt"}),
+        "sfmr": (SFMRAdapter, ("SFMR_HRD", ["surface_wind_speed"], START, end(1)),
+                 {"storm_name": "BENCH", "year": START.year, "mission_id": f"{START:%Y%m%d}H1", "sfmr_file_type": "ascii"}),
+    }
+
+
+def prepare_sources(size, data_dir=DATA_DIR):
+    """
+    Generate the synthetic remote files for a size once; later runs reuse them.
+    Args:
+        size (str): Key of SIZES.
+        data_dir (Path): Root directory for generated data.
+    Returns:
+        Path: Source directory to serve.
+    """
+    source_dir = Path(data_dir) / size
+    marker = source_dir / ".complete"
+    if marker.exists():
+        return source_dir
+    spec = SIZES[size]
+    cases = build_cases(size)
+    print(f"Generating synthetic {size} inputs in {source_dir}", file=sys.stderr)
+    adapter_class, args, kwargs = cases["era5"]
+    request = adapter_class(*args, **kwargs)._build_request_params()
+    (source_dir / "cds").mkdir(parents=True, exist_ok=True)
+    synthetic.era5_for_request(source_dir / "cds" / f"{cds_request_key(request)}.nc", request)
+    synthetic.smap_rss_files(source_dir, START.date(), spec["smap_rss"]["days"], spec["smap_rss"]["n_lat"], spec["smap_rss"]["n_lon"])
+    synthetic.cygnss_files(source_dir / "podaac" / NOAACygnssL2Adapter.COLLECTION_SHORT_NAME, START.date(),
+                           spec["cygnss"]["days"], spec["cygnss"]["samples_per_day"])
+    synthetic.oscar_files(source_dir / "podaac" / OSCARAdapter.COLLECTION_MAP["nrt"], START.date(),
+                          spec["oscar"]["days"], spec["oscar"]["n_lat"], spec["oscar"]["n_lon"])
+    _, _, sfmr_kwargs = cases["sfmr"]
+    sfmr_dir = source_dir / "sfmr" / f"{sfmr_kwargs['storm_name']}{sfmr_kwargs['year']}" / "data" / "sfmr"
+    sfmr_dir.mkdir(parents=True, exist_ok=True)
+    synthetic.sfmr_ascii_file(sfmr_dir / f"NOAA_SFMR{sfmr_kwargs['mission_id']}.dat.gz", START, spec["sfmr"]["rows"])
+    marker.touch()
+    return source_dir
+
+
+def _raw_bytes(raw_data_info):
+    paths = raw_data_info if isinstance(raw_data_info, (list, tuple)) else [raw_data_info]
+    return sum(Path(p).stat().st_size for p in paths if p)
+
+
+def run_stages(adapter_class, args, kwargs, trace_memory):
+    """
+    Run the adapter pipeline stage by stage.
+    Args:
+        adapter_class (type): Adapter class.
+        args (tuple): Positional constructor arguments.
+        kwargs (dict): Keyword constructor arguments.
+        trace_memory (bool): Record peak traced memory per stage instead of timing.
+    Returns:
+        tuple: (dict stage -> seconds or peak bytes, raw input bytes).
+    """
+    adapter = adapter_class(*args, **kwargs)
+    state = {}
+    steps = {
+        "authenticate": lambda: adapter._authenticate(),
+        "build_request_params": lambda: state.update(params=adapter._build_request_params()),
+        "fetch_raw_data": lambda: state.update(raw=adapter._fetch_raw_data(state["params"])),
+        "parse_data": lambda: state.update(ds=adapter._parse_data(state["raw"])),
+        "standardize_data": lambda: state.update(ds=adapter._standardize_data(state["ds"])),
+        "load": lambda: state["ds"].load(),
+    }
+    measurements = {}
+    for stage in STAGES:
+        gc.collect()
+        if trace_memory:
+            tracemalloc.start()
+            steps[stage]()
+            measurements[stage] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            started = time.perf_counter()
+            steps[stage]()
+            measurements[stage] = time.perf_counter() - started
+    return measurements, _raw_bytes(state.get("raw"))
+
+
+def run_benchmarks(sizes, datasets=None, data_dir=DATA_DIR, repeat=1):
+    """
+    Benchmark every dataset at every size, each run in a fresh cache. Every dataset gets an
+    untimed warm-up run (imports, first file opens), `repeat` timing runs of which the fastest
+    is kept per stage, and one memory-tracing run.
+    Args:
+        sizes (list[str]): Keys of SIZES.
+        datasets (list[str], optional): Subset of dataset names; all by default.
+        data_dir (Path): Root directory for generated data.
+        repeat (int): Number of timing runs.
+    Returns:
+        dict: "size/dataset/stage" -> {"seconds", "mb_per_s", "peak_mb"}.
+    """
+    results = {}
+    for size in sizes:
+        source_dir = prepare_sources(size, data_dir)
+        for name, (adapter_class, args, kwargs) in build_cases(size).items():
+            if datasets and name not in datasets:
+                continue
+            timings = []
+            for run in range(repeat + 2):
+                trace_memory = run == repeat + 1
+                with tempfile.TemporaryDirectory() as cache_dir, patched_services(source_dir, cache_dir):
+                    measurements, raw_bytes = run_stages(adapter_class, args, kwargs, trace_memory)
+                if trace_memory:
+                    peaks = measurements
+                elif run > 0:
+                    timings.append(measurements)
+            seconds = {stage: min(t[stage] for t in timings) for stage in STAGES}
+            for stage in STAGES:
+                results[f"{size}/{name}/{stage}"] = {
+                    "seconds": round(seconds[stage], 4),
+                    "mb_per_s": round(raw_bytes / 1e6 / seconds[stage], 2) if stage in DATA_STAGES and seconds[stage] > 0 else None,
+                    "peak_mb": round(peaks[stage] / 1e6, 2),
+                }
+            print(f"{size}/{name}: " + ", ".join(f"{s}={seconds[s]:.3f}s" for s in STAGES), file=sys.stderr)
+    return results
+
+
+def compare(results, baselines, tolerance=0.5, min_seconds=0.05, min_mb=1.0):
+    """
+    Find stages slower or hungrier than their baseline by more than the tolerance.
+    Args:
+        results (dict): Output of run_benchmarks.
+        baselines (dict): Stored results in the same layout.
+        tolerance (float): Allowed relative increase.
+        min_seconds (float): Absolute time increase below which differences are noise.
+        min_mb (float): Absolute memory increase below which differences are noise.
+    Returns:
+        list[str]: Regression descriptions.
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        for metric, floor in (("seconds", min_seconds), ("peak_mb", min_mb)):
+            before, after = baseline[metric], result[metric]
+            if after > before * (1 + tolerance) and after - before > floor:
+                regressions.append(f"{key}: {metric} {before} -> {after}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=["small"], choices=list(SIZES))
+    parser.add_argument("--datasets", nargs="+", choices=["era5", "smap_rss", "cygnss", "oscar", "sfmr"])
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--baselines", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--repeat", type=int, default=1, help="timing runs per dataset; the fastest is kept")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    options = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    results = run_benchmarks(options.size, options.datasets, options.data_dir, options.repeat)
+    print(f"{'benchmark':45} {'seconds':>9} {'MB/s':>9} {'peak MB':>9}")
+    for key, result in results.items():
+        print(f"{key:45} {result['seconds']:9.3f} {result['mb_per_s'] or float('nan'):9.1f} {result['peak_mb']:9.1f}")
+    if options.output:
+        options.output.write_text(json.dumps(results, indent=2, sort_keys=True))
+    baselines = json.loads(options.baselines.read_text()) if options.baselines.exists() else {}
+    if options.update_baselines:
+        baselines.update(results)
+        options.baselines.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Updated {options.baselines}")
+        return 0
+    regressions = compare(results, baselines, options.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions and options.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Local stand-ins for the remote services used by the adapters.
+
+- LocalHTTPServer: serves a directory over HTTP (SFMR downloads).
+- LocalFTPServer: a minimal passive-mode FTP server for RETR (SMAP RSS downloads).
+- FakeCDSClient: drop-in for cdsapi.Client that synthesizes the requested ERA5 file.
+- fake_podaac_downloader: a podaac-data-downloader executable that copies local granules.
+
+patched_services() wires all of them into the adapter modules for the duration of a block.
+"""
+import contextlib
+import functools
+import ftplib
+import hashlib
+import http.server
+import json
+import os
+import shutil
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from . import synthetic
+
+
+class LocalHTTPServer:
+    """Threaded HTTP server for a directory, bound to an ephemeral localhost port."""
+    def __init__(self, directory):
+        handler = functools.partial(_QuietHTTPHandler, directory=str(directory))
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHTTPHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _FTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode("latin-1"))
+        self.wfile.flush()
+
+    def handle(self):
+        root = Path(self.server.root)
+        passive = None
+        self._reply("220 benchmark FTP stand-in")
+        try:
+            for raw in self.rfile:
+                command, _, argument = raw.decode("latin-1").strip().partition(" ")
+                command = command.upper()
+                if command == "USER":
+                    self._reply("331 password required")
+                elif command == "PASS":
+                    self._reply("230 logged in")
+                elif command == "TYPE":
+                    self._reply("200 type set")
+                elif command == "PASV":
+                    passive = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    passive.bind(("127.0.0.1", 0))
+                    passive.listen(1)
+                    port = passive.getsockname()[1]
+                    self._reply(f"227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 0xFF})")
+                elif command == "RETR":
+                    path = root / argument.lstrip("/")
+                    if passive is None or not path.is_file():
+                        self._reply("550 file not found")
+                        continue
+                    self._reply("150 opening data connection")
+                    connection, _ = passive.accept()
+                    with connection, open(path, "rb") as f:
+                        connection.sendfile(f)
+                    passive.close()
+                    passive = None
+                    self._reply("226 transfer complete")
+                elif command == "QUIT":
+                    self._reply("221 bye")
+                    return
+                else:
+                    self._reply("502 command not implemented")
+        finally:
+            if passive is not None:
+                passive.close()
+
+
+class LocalFTPServer:
+    """Threaded minimal FTP server (USER/PASS/TYPE/PASV/RETR/QUIT) for a directory."""
+    def __init__(self, directory):
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FTPHandler)
+        self.server.daemon_threads = True
+        self.server.root = str(directory)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client_class(self):
+        """An ftplib.FTP subclass whose connections go to this server whatever host is given."""
+        server_port = self.port
+
+        class LocalFTP(ftplib.FTP):
+            def connect(self, host="", port=0, timeout=-999, source_address=None):
+                return super().connect("127.0.0.1", server_port, timeout, source_address)
+        return LocalFTP
+
+
+def cds_request_key(request):
+    """Stable key of a CDS request, used to name pre-generated responses."""
+    return hashlib.md5(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class FakeCDSClient:
+    """
+    Stand-in for cdsapi.Client. Serves a pre-generated response from ``source_dir/cds/<key>.nc``
+    when present, otherwise synthesizes the requested ERA5 file. Optional queue delay.
+    """
+    source_dir = None
+    latency_seconds = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def retrieve(self, dataset_id, request, target):
+        time.sleep(self.latency_seconds)
+        prepared = Path(self.source_dir or ".") / "cds" / f"{cds_request_key(request)}.nc"
+        if self.source_dir and prepared.exists():
+            shutil.copyfile(prepared, target)
+        else:
+            synthetic.era5_for_request(target, request)
+
+
+_DOWNLOADER_SCRIPT = """#!{python}
+import shutil, sys
+from pathlib import Path
+args = sys.argv[1:]
+collection = args[args.index('-c') + 1]
+output_dir = Path(args[args.index('-d') + 1])
+output_dir.mkdir(parents=True, exist_ok=True)
+source = Path({source!r}) / collection
+for granule in sorted(source.glob('*.nc')):
+    shutil.copy(granule, output_dir / granule.name)
+print(f"Downloaded granules for {{collection}}")
+"""
+
+
+def fake_podaac_downloader(bin_dir, granule_root):
+    """
+    Write a podaac-data-downloader executable that copies granules from granule_root/<collection>.
+    Args:
+        bin_dir (Path): Directory to put on PATH.
+        granule_root (Path): Directory with one sub-directory of .nc granules per collection.
+    Returns:
+        Path: The executable.
+    """
+    path = Path(bin_dir) / "podaac-data-downloader"
+    path.write_text(_DOWNLOADER_SCRIPT.format(python=sys.executable, source=str(granule_root)))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+@contextlib.contextmanager
+def _patched(obj, name, value):
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, original)
+
+
+@contextlib.contextmanager
+def patched_services(source_dir, cache_dir):
+    """
+    Serve source_dir through the local stand-ins and point every adapter at them and at cache_dir.
+    Args:
+        source_dir (Path): Directory holding the synthetic remote files (smap/, sfmr/, podaac/).
+        cache_dir (Path): Empty cache directory for the adapters.
+    """
+    from spatiotemporal_data_library.adapters import era5, smap_rss, sfmr, podaac
+    source_dir, cache_dir = Path(source_dir), Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with contextlib.ExitStack() as stack:
+        http_server = stack.enter_context(LocalHTTPServer(source_dir / "sfmr"))
+        ftp_server = stack.enter_context(LocalFTPServer(source_dir))
+        bin_dir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        fake_podaac_downloader(bin_dir, source_dir / "podaac")
+        cdsapirc = bin_dir / ".cdsapirc"
+        cdsapirc.write_text("url: http://127.0.0.1\nkey: benchmark\n")
+        for module in (era5, smap_rss, sfmr, podaac):
+            stack.enter_context(_patched(module, "CACHE_DIR", cache_dir))
+        stack.enter_context(_patched(era5, "CDSAPIRC_PATH", cdsapirc))
+        stack.enter_context(_patched(era5.cdsapi, "Client", FakeCDSClient))
+        stack.enter_context(_patched(FakeCDSClient, "source_dir", source_dir))
+        stack.enter_context(_patched(smap_rss.ftplib, "FTP", ftp_server.client_class()))
+        stack.enter_context(_patched(sfmr.SFMRAdapter, "BASE_URL", http_server.url))
+        environment = {"PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+                       "RSS_FTP_USER": "benchmark", "RSS_FTP_PASSWORD": "benchmark"}
+        saved = {key: os.environ.get(key) for key in environment}
+        os.environ.update(environment)
+        try:
+            yield
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
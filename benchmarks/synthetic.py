@@ -0,0 +1,193 @@
+"""
+Synthetic input files shaped like the real products, for offline benchmarks.
+
+Each generator writes files with the names, dimensions, variable names and packing the
+corresponding adapter expects, filled with smooth random fields.
+"""
+import gzip
+import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+_RNG = np.random.default_rng(42)
+
+
+def _packed(encoding_scale, fill=-32767):
+    return {"dtype": "int16", "scale_factor": encoding_scale, "add_offset": 0.0, "_FillValue": fill, "zlib": True, "complevel": 1}
+
+
+def _field(shape, mean, spread):
+    return (mean + spread * _RNG.standard_normal(shape)).astype(np.float32)
+
+
+def era5_file(path, times, n_lat, n_lon, north=90.0, west=0.0, resolution=0.25):
+    """
+    Write an ERA5 single-levels NetCDF file as returned by the CDS (u10/v10, packed int16).
+    Args:
+        path (Path): Output file.
+        times (pandas.DatetimeIndex): Time steps.
+        n_lat (int): Number of latitudes, descending from north.
+        n_lon (int): Number of longitudes, ascending from west.
+    Returns:
+        Path: The written file.
+    """
+    shape = (len(times), n_lat, n_lon)
+    ds = xr.Dataset(
+        {"u10": (("time", "latitude", "longitude"), _field(shape, 2.0, 5.0), {"units": "m s**-1"}),
+         "v10": (("time", "latitude", "longitude"), _field(shape, -1.0, 5.0), {"units": "m s**-1"})},
+        coords={"time": times.values,
+                "latitude": north - resolution * np.arange(n_lat),
+                "longitude": west + resolution * np.arange(n_lon)})
+    ds.to_netcdf(path, encoding={"u10": _packed(0.001), "v10": _packed(0.001)})
+    return Path(path)
+
+
+def era5_for_request(path, request):
+    """
+    Write a synthetic ERA5 file matching a CDS request dict (dates, hours and area).
+    Args:
+        path (Path): Output file.
+        request (dict): Request as built by ERA5Adapter._build_request_params.
+    Returns:
+        Path: The written file.
+    """
+    dates = []
+    for year in request["year"]:
+        for month in request["month"]:
+            for day in request["day"]:
+                try:
+                    dates.append(datetime.date(int(year), int(month), int(day)))
+                except ValueError:
+                    continue
+    times = pd.DatetimeIndex([pd.Timestamp(d) + pd.Timedelta(t + ":00") for d in sorted(dates) for t in request["time"]])
+    if "area" in request:
+        # Accept the area corners in either latitude order
+        lat_a, west, lat_b, east = request["area"]
+        north, south = max(lat_a, lat_b), min(lat_a, lat_b)
+        n_lat = int(round((north - south) / 0.25)) + 1
+        n_lon = int(round((east - west) / 0.25)) + 1
+    else:
+        north, west, n_lat, n_lon = 90.0, 0.0, 721, 1440
+    return era5_file(path, times, n_lat, n_lon, north=north, west=west)
+
+
+def smap_rss_files(directory, start_date, n_days, n_lat=720, n_lon=1440):
+    """
+    Write daily SMAP RSS L3 files (wind and minute per lat/lon/node), named like the RSS FTP tree.
+    Args:
+        directory (Path): Root directory; files go to smap/wind/v01.0/daily/final/YYYY/MM/.
+        start_date (datetime.date): First day.
+        n_days (int): Number of daily files.
+        n_lat (int): Number of latitudes.
+        n_lon (int): Number of longitudes.
+    Returns:
+        list[Path]: The written files.
+    """
+    lat = -90 + (np.arange(n_lat) + 0.5) * (180.0 / n_lat)
+    lon = (np.arange(n_lon) + 0.5) * (360.0 / n_lon)
+    paths = []
+    for i in range(n_days):
+        day = start_date + datetime.timedelta(days=i)
+        folder = Path(directory) / "smap" / "wind" / "v01.0" / "daily" / "final" / f"{day.year:04d}" / f"{day.month:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"rss_smap_L3_daily_winds_v01.0_final_{day:%Y%m%d}.nc"
+        shape = (n_lat, n_lon, 2)
+        minute = np.empty(shape, dtype=np.int16)
+        # Swaths sweep westward through the day; ascending and descending passes are ~12 h apart
+        minute[..., 0] = (np.linspace(0, 1439, n_lon)[::-1].astype(np.int16))[None, :]
+        minute[..., 1] = (minute[..., 0] + 720) % 1440
+        wind = _field(shape, 7.0, 3.0)
+        gaps = _RNG.random(shape) < 0.3
+        wind[gaps] = np.nan
+        minute[gaps] = -9999
+        ds = xr.Dataset(
+            {"wind": (("lat", "lon", "node"), wind, {"units": "m s-1"}),
+             "minute": (("lat", "lon", "node"), minute, {"units": "minutes of day", "_FillValue": np.int16(-9999)})},
+            coords={"lat": lat, "lon": lon, "node": [0, 1]})
+        ds.to_netcdf(path, encoding={"wind": _packed(0.01), "minute": {"zlib": True, "complevel": 1}})
+        paths.append(path)
+    return paths
+
+
+def cygnss_files(directory, start_date, n_days, samples_per_day):
+    """
+    Write daily CYGNSS L2 granules with along-track samples.
+    Args:
+        directory (Path): Output directory.
+        start_date (datetime.date): First day.
+        n_days (int): Number of granules.
+        samples_per_day (int): Samples per granule.
+    Returns:
+        list[Path]: The written files.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_days):
+        day = start_date + datetime.timedelta(days=i)
+        offsets = np.sort(_RNG.integers(0, 86_400_000, samples_per_day)).astype("timedelta64[ms]")
+        sample_time = np.datetime64(day, "ms") + offsets
+        ds = xr.Dataset(
+            {"wind_speed": (("sample",), _field(samples_per_day, 8.0, 3.0), {"units": "m s-1"}),
+             "lat": (("sample",), _RNG.uniform(-38, 38, samples_per_day).astype(np.float32)),
+             "lon": (("sample",), _RNG.uniform(0, 360, samples_per_day).astype(np.float32)),
+             "sample_time": (("sample",), sample_time.astype("datetime64[ns]")),
+             "quality_flags": (("sample",), _RNG.choice([0, 0, 0, 1, 2, 4], samples_per_day).astype(np.int32))},
+            coords={"sample": np.arange(i * samples_per_day, (i + 1) * samples_per_day, dtype=np.int64)})
+        path = Path(directory) / f"cyg.ddmi.s{day:%Y%m%d}-000000-e{day:%Y%m%d}-235959.l2.wind-mss-noaa.a12.d12.nc"
+        ds.to_netcdf(path, encoding={"wind_speed": {"zlib": True, "complevel": 1}})
+        paths.append(path)
+    return paths
+
+
+def oscar_files(directory, start_date, n_days, n_lat=719, n_lon=1440):
+    """
+    Write daily OSCAR L4 current granules (u, v, ug, vg on a regular grid).
+    Args:
+        directory (Path): Output directory.
+        start_date (datetime.date): First day.
+        n_days (int): Number of granules.
+        n_lat (int): Number of latitudes.
+        n_lon (int): Number of longitudes.
+    Returns:
+        list[Path]: The written files.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    lat = np.linspace(-89.75, 89.75, n_lat)
+    lon = np.linspace(0, 359.75, n_lon)
+    paths = []
+    for i in range(n_days):
+        day = start_date + datetime.timedelta(days=i)
+        shape = (1, n_lat, n_lon)
+        ds = xr.Dataset(
+            {name: (("time", "lat", "lon"), _field(shape, 0.0, 0.3), {"units": "m s-1"}) for name in ("u", "v", "ug", "vg")},
+            coords={"time": [np.datetime64(day, "ns")], "lat": lat, "lon": lon})
+        path = Path(directory) / f"oscar_currents_nrt_{day:%Y%m%d}.nc"
+        ds.to_netcdf(path, encoding={name: {"zlib": True, "complevel": 1} for name in ("u", "v", "ug", "vg")})
+        paths.append(path)
+    return paths
+
+
+def sfmr_ascii_file(path, start, n_rows):
+    """
+    Write a gzip'd SFMR ASCII flight file with one observation per second.
+    Args:
+        path (Path): Output file (.dat.gz).
+        start (datetime.datetime): Time of the first observation.
+        n_rows (int): Number of observations.
+    Returns:
+        Path: The written file.
+    """
+    times = pd.date_range(start, periods=n_rows, freq="s")
+    wind = _field(n_rows, 35.0, 10.0)
+    rain = np.abs(_field(n_rows, 2.0, 4.0))
+    wind[_RNG.random(n_rows) < 0.01] = -99.9
+    table = pd.DataFrame({
+        "Date": times.strftime("%Y%m%d"), "Time": times.hour * 10000 + times.minute * 100 + times.second,
+        "Lat": np.round(np.linspace(18.0, 25.0, n_rows), 4), "Lon": np.round(np.linspace(-70.0, -60.0, n_rows), 4),
+        "Sfc_WS": np.round(wind, 2), "RR": np.round(rain, 2)})
+    with gzip.open(path, "wt") as f:
+        f.write("# Date Time Lat Lon Sfc_WS RR\n")
+        table.to_csv(f, sep=" ", header=False, index=False)
+    return Path(path)
@@ -16,7 +16,7 @@ setup(
         "Source": "https://github.com/yourusername/spatiotemporal_data_library",
         "Tracker": "https://github.com/yourusername/spatiotemporal_data_library/issues"
     },
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "xarray>=2022.0",
         "pandas>=1.3",
@@ -34,6 +34,13 @@ setup(
             "cdsapi>=0.5",
             "netCDF4>=1.5"
         ],
+        "arrow": [
+            "pyarrow>=8.0"
+        ],
+        "zarr": [
+            "zarr>=2.11",
+            "dask>=2022.0"
+        ],
     },
     python_requires=">=3.8",
     include_package_data=True,
@@ -1,12 +1,31 @@
 import datetime
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
 import xarray as xr
 from abc import ABC, abstractmethod
+from ..precision import normalize_precision, mixed_packing_in_files
+from ..qc import normalize_qc
+from ..aggregate import TemporalAccumulator
+from ..transfer import RetryPolicy
 
 class DataSourceAdapter(ABC):
     """
     数据源适配器的抽象基类。
     每个适配器处理一个特定的数据集。
     """
+    # 点观测（沿轨）数据集可输出为列式表 (见 get_table)
+    SUPPORTS_TABLE = False
+    # 流式处理时每块包含的时间步数
+    STREAM_TIME_BLOCK = 24
+    # 分布式执行时每个任务的时间窗口 (pandas 频率)；None 表示不拆分
+    DISTRIBUTED_SPLIT = "1D"
+    # 是否在文件内部应用时间窗口 (见 _restrict_to_window)；热缓存构建整文件条目时关闭
+    within_file_window = True
+    # 近实时产品：同一时段的数据可能被更新，结果缓存需设置过期时间
+    near_real_time = False
+
     def __init__(self, dataset_name, variables, start_time, end_time, bbox=None, point=None, **kwargs):
         self.dataset_name = dataset_name
         self.raw_variables_requested = variables
@@ -15,6 +34,17 @@ class DataSourceAdapter(ABC):
         self.bbox = bbox
         self.point = point
         self.kwargs = kwargs
+        self.precision = normalize_precision(kwargs.get('precision'))
+        # 读取时逐文件应用的质量控制条件 (见 qc.py)
+        self.qc = normalize_qc(kwargs.get('qc'))
+        self.parse_workers = int(kwargs.get('parse_workers') or 1)
+        if self.parse_workers < 1:
+            raise ValueError("parse_workers 必须是正整数。")
+        # 下载重试策略：RetryPolicy 实例或其参数字典，如 {"max_attempts": 8}
+        retry = kwargs.get('retry')
+        self.retry_policy = retry if isinstance(retry, RetryPolicy) else RetryPolicy(**(retry or {}))
+        # get_data 实际读取的源文件 (_fetch_raw_data 的输出，流式获取时为各单元文件的列表)，获取前为 None
+        self.raw_data_info = None
         self.native_variables = self._map_variables(variables)
 
     def _parse_time(self, time_input):
@@ -54,12 +84,185 @@ class DataSourceAdapter(ABC):
     def _standardize_data(self, dataset: xr.Dataset) -> xr.Dataset:
         pass
 
+    def _split_fetch_units(self, request_params):
+        """
+        Split request parameters into independently fetchable units.
+        Each unit must be accepted by _fetch_raw_data. Default: a single unit.
+        Args:
+            request_params: Output of _build_request_params.
+        Returns:
+            list: Fetch units.
+        """
+        return [request_params]
+
+    def _describe_fetch_unit(self, unit):
+        """
+        Describe a fetch unit without touching the network.
+        Args:
+            unit: A fetch unit from _split_fetch_units.
+        Returns:
+            dict: Unit description with keys 'request', 'target', 'cached' and 'estimated_bytes'.
+        """
+        return {"request": unit, "target": None, "cached": False, "estimated_bytes": None}
+
+    def plan(self) -> dict:
+        """
+        Dry-run the request: resolve fetch units, estimate sizes and check the cache.
+        No authentication or network transfer takes place.
+        Returns:
+            dict: Plan with 'dataset', 'n_units', 'n_cached', 'estimated_bytes',
+                'estimated_download_bytes' and the per-unit descriptions in 'units'.
+        """
+        request_params = self._build_request_params()
+        units = [self._describe_fetch_unit(unit) for unit in self._split_fetch_units(request_params)]
+        estimated_bytes = sum(u["estimated_bytes"] or 0 for u in units)
+        estimated_download_bytes = sum(u["estimated_bytes"] or 0 for u in units if not u["cached"])
+        return {
+            "dataset": self.dataset_name,
+            "n_units": len(units),
+            "n_cached": sum(1 for u in units if u["cached"]),
+            "estimated_bytes": estimated_bytes,
+            "estimated_download_bytes": estimated_download_bytes,
+            "units": units,
+        }
+
+    def _restrict_to_window(self, dataset: xr.Dataset) -> xr.Dataset:
+        """
+        Apply the request's time window inside one file, below the time resolution of its
+        'time' coordinate (e.g. per-pixel observation times). Default: unchanged.
+        Args:
+            dataset (xarray.Dataset): Parsed (or standardized) data of one file.
+        Returns:
+            xarray.Dataset: Data restricted to the time window.
+        """
+        return dataset
+
+    def _parse_granule(self, path) -> xr.Dataset:
+        """
+        Decode one granule into memory. Multi-file adapters override this to enable parse_workers.
+        Runs in a worker process, so it must only use picklable adapter state.
+        Args:
+            path (Path): Granule file path.
+        Returns:
+            xarray.Dataset: Loaded (numpy-backed) dataset of one granule.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support per-granule parsing.")
+
+    def _mixed_packing(self, paths):
+        """
+        With precision "packed", the variables whose packing differs between the files that are
+        combined into one dataset; they are decoded instead (see precision.mixed_packing).
+        Args:
+            paths (list[Path]): NetCDF files to be combined.
+        Returns:
+            set[str]: Variable names; empty in the other precisions or for a single file.
+        """
+        if self.precision != "packed" or len(paths) < 2:
+            return set()
+        return mixed_packing_in_files(paths, engine='netcdf4')
+
+    def _parse_granules(self, paths):
+        """
+        Decode granules with _parse_granule across a pool of parse_workers processes.
+        Results come back in the order of paths.
+        Args:
+            paths (list[Path]): Granule file paths.
+        Returns:
+            list[xarray.Dataset]: Loaded datasets, one per granule.
+        """
+        workers = min(self.parse_workers, len(paths))
+        if workers <= 1:
+            return [self._parse_granule(path) for path in paths]
+        logging.info(f"使用 {workers} 个进程解析 {len(paths)} 个文件。")
+        # HDF5 is not fork-safe once the parent has opened files, so workers are spawned
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            return list(pool.map(self._parse_granule, paths))
+
+    def _iter_parsed(self, raw_data_info):
+        """
+        Yield parsed data in pieces for streaming stages. The default parses everything lazily
+        and yields blocks of STREAM_TIME_BLOCK time steps; multi-file adapters yield per file.
+        Args:
+            raw_data_info: Output of _fetch_raw_data for one fetch unit.
+        Yields:
+            xarray.Dataset: Parsed pieces.
+        """
+        dataset = self._parse_data(raw_data_info)
+        if 'time' not in dataset.dims:
+            yield dataset
+            return
+        for start in range(0, dataset.sizes['time'], self.STREAM_TIME_BLOCK):
+            yield dataset.isel(time=slice(start, start + self.STREAM_TIME_BLOCK))
+
+    def _iter_standardized(self):
+        """
+        Fetch unit by unit and yield standardized pieces, so only one piece is held at a time.
+        Units that fail with FileNotFoundError are skipped when others succeed.
+        Yields:
+            xarray.Dataset: Standardized pieces.
+        Raises:
+            FileNotFoundError: If no unit produced any data.
+        """
+        self._authenticate()
+        units = self._split_fetch_units(self._build_request_params())
+        produced = False
+        self.raw_data_info = []
+        for unit in units:
+            try:
+                raw_data_info = self._fetch_raw_data(unit)
+            except FileNotFoundError as e:
+                if len(units) == 1:
+                    raise
+                logging.warning(f"跳过无法获取的数据单元: {e}")
+                continue
+            if not raw_data_info:
+                continue
+            self.raw_data_info.extend(raw_data_info if isinstance(raw_data_info, (list, tuple)) else [raw_data_info])
+            for piece in self._iter_parsed(raw_data_info):
+                produced = True
+                yield self._standardize_data(piece)
+        if not produced and len(units) > 1:
+            raise FileNotFoundError(f"{self.dataset_name}: 没有获取到任何数据。")
+
     def get_data(self) -> xr.Dataset:
+        aggregate = self.kwargs.get('aggregate')
+        if self.kwargs.get('executor'):
+            if aggregate:
+                raise ValueError("aggregate 不能与 executor 同时使用。")
+            from ..distributed import get_distributed_data
+            return get_distributed_data(self)
+        if aggregate:
+            accumulator = TemporalAccumulator(aggregate)
+            for piece in self._iter_standardized():
+                accumulator.add(piece)
+            return accumulator.result()
         self._authenticate()
         request_params = self._build_request_params()
         raw_data_info = self._fetch_raw_data(request_params)
+        self.raw_data_info = raw_data_info
         if not raw_data_info:
             return xr.Dataset()
+        if self.kwargs.get('resolution') or self.kwargs.get('max_cells'):
+            from ..overviews import get_overview_data
+            return get_overview_data(self, raw_data_info)
+        if self.kwargs.get('hot_cache'):
+            from ..hotcache import get_hot_data
+            return get_hot_data(self, raw_data_info)
         dataset = self._parse_data(raw_data_info)
         standardized_dataset = self._standardize_data(dataset)
-        return standardized_dataset 
\ No newline at end of file
+        return standardized_dataset 
+
+    def get_table(self):
+        """
+        Fetch the data as a columnar pyarrow.Table with one row per observation.
+        Only meaningful for along-track datasets (SUPPORTS_TABLE = True). The default goes
+        through get_data(); adapters with a native tabular path override this.
+        Returns:
+            pyarrow.Table: Observation table with standardized column names.
+        """
+        from ..tabular import table_from_dataframe
+        dataset = self.get_data()
+        if not dataset.sizes:
+            return table_from_dataframe(pd.DataFrame())
+        return table_from_dataframe(dataset.to_dataframe().reset_index())
@@ -1,13 +1,20 @@
 import logging
+import hashlib
+import json
 import pandas as pd
 import xarray as xr
 import cdsapi
 from .base import DataSourceAdapter
+from .. import config
+from ..derived import derived_dependencies, add_derived_variables
+from ..precision import open_kwargs, apply_precision
+from ..transfer import retry_transfer, part_path
 from pathlib import Path
+from urllib.parse import urlparse
 import os
 
 CDSAPIRC_PATH = Path.home() / ".cdsapirc"
-CACHE_DIR = Path.home() / ".spatiotemporal_data_cache"
+CACHE_DIR = config.CACHE_DIR
 
 class ERA5Adapter(DataSourceAdapter):
     """
@@ -16,11 +23,19 @@ class ERA5Adapter(DataSourceAdapter):
     Handles authentication, request building, data download, parsing, and standardization for ERA5.
     """
     DATASET_ID_SINGLE_LEVELS = 'reanalysis-era5-single-levels'
+    GRID_RESOLUTION = 0.25
+    # NetCDF downloads store values packed as int16
+    ESTIMATED_BYTES_PER_VALUE = 2
     VARIABLE_MAP = {
         "10m_u_component_of_wind": "10m_u_component_of_wind",
         "10m_v_component_of_wind": "10m_v_component_of_wind",
-        "significant_wave_height": "significant_height_of_combined_wind_waves_and_swell",
-        "surface_wind_speed": "calculated_wind_speed"
+        "significant_wave_height": "significant_height_of_combined_wind_waves_and_swell"
+    }
+    # CDS NetCDF files name variables by their short names
+    NETCDF_SHORT_NAMES = {
+        "10m_u_component_of_wind": "u10",
+        "10m_v_component_of_wind": "v10",
+        "significant_height_of_combined_wind_waves_and_swell": "swh"
     }
     def _map_variables(self, standardized_vars):
         """
@@ -29,21 +44,21 @@ class ERA5Adapter(DataSourceAdapter):
         Args:
             standardized_vars (list[str]): List of standardized variable names.
         Returns:
-            list[str]: List of native ERA5 variable names.
+            list[str]: Sorted native ERA5 variable names, so request parameters and cache keys
+                do not depend on set iteration order.
         """
         native_vars = set()
-        self.needs_wind_speed_calculation = False
+        self.derived_variables = []
         for var in standardized_vars:
-            if var == "surface_wind_speed":
-                native_vars.add(self.VARIABLE_MAP["10m_u_component_of_wind"])
-                native_vars.add(self.VARIABLE_MAP["10m_v_component_of_wind"])
-                self.needs_wind_speed_calculation = True
-            elif var in self.VARIABLE_MAP:
+            if var in self.VARIABLE_MAP:
                 native_vars.add(self.VARIABLE_MAP[var])
+            elif derived_dependencies(var, self.VARIABLE_MAP):
+                native_vars.update(derived_dependencies(var, self.VARIABLE_MAP))
+                self.derived_variables.append(var)
             else:
                 logging.warning(f"Variable '{var}' not explicitly mapped in ERA5. Using as is.")
                 native_vars.add(var)
-        return list(native_vars)
+        return sorted(native_vars)
     def _authenticate(self):
         """
         Check for CDS API credentials file (~/.cdsapirc).
@@ -82,6 +97,51 @@ class ERA5Adapter(DataSourceAdapter):
         if 'pressure_level' in self.kwargs:
             request['pressure_level'] = self.kwargs['pressure_level']
         return request
+    def _cache_target(self, request_params):
+        """
+        Cache file path for a CDS request, stable across processes.
+        Args:
+            request_params (dict): Request parameters for cdsapi.
+        Returns:
+            Path: Target NetCDF file path in the cache directory.
+        """
+        param_hash = hashlib.md5(json.dumps(request_params, sort_keys=True).encode("utf-8")).hexdigest()
+        return CACHE_DIR / f"era5_{param_hash}.nc"
+    def _estimate_request_bytes(self, request_params):
+        """
+        Estimate the download size of a CDS request from its dates, times, variables and area.
+        Args:
+            request_params (dict): Request parameters for cdsapi.
+        Returns:
+            int: Estimated size in bytes.
+        """
+        n_dates = 0
+        for year in request_params['year']:
+            for month in request_params['month']:
+                for day in request_params['day']:
+                    if pd.Timestamp(f"{year}-{month}-01").days_in_month >= int(day):
+                        n_dates += 1
+        n_steps = n_dates * len(request_params['time'])
+        if 'area' in request_params:
+            north, west, south, east = request_params['area']
+            n_lat = int(round(abs(north - south) / self.GRID_RESOLUTION)) + 1
+            n_lon = int(round(abs(east - west) / self.GRID_RESOLUTION)) + 1
+        else:
+            n_lat = int(round(180 / self.GRID_RESOLUTION)) + 1
+            n_lon = int(round(360 / self.GRID_RESOLUTION))
+        levels = request_params.get('pressure_level')
+        n_levels = len(levels) if isinstance(levels, (list, tuple)) and levels else 1
+        return n_steps * n_levels * n_lat * n_lon * len(request_params['variable']) * self.ESTIMATED_BYTES_PER_VALUE
+    def _describe_fetch_unit(self, unit):
+        """
+        Describe a CDS request: cache target, cache status and estimated size.
+        Args:
+            unit (dict): Request parameters for cdsapi.
+        Returns:
+            dict: Unit description.
+        """
+        target = self._cache_target(unit)
+        return {"request": unit, "target": target, "cached": target.exists(), "estimated_bytes": self._estimate_request_bytes(unit)}
     def _fetch_raw_data(self, request_params):
         """
         Download ERA5 data using cdsapi.Client().
@@ -90,21 +150,20 @@ class ERA5Adapter(DataSourceAdapter):
         Returns:
             Path: Path to the downloaded NetCDF file.
         Raises:
-            Exception: If download fails.
+            Exception: If download fails after the retries of the 'retry' policy.
         """
-        client = cdsapi.Client()
-        param_hash = abs(hash(frozenset(request_params.items())))
-        target_filename = CACHE_DIR / f"era5_{param_hash}.nc"
+        target_filename = self._cache_target(request_params)
         if target_filename.exists():
             logging.info(f"Found ERA5 data in cache: {target_filename}")
             return target_filename
+        client = cdsapi.Client()
         logging.info(f"Requesting ERA5 data: {request_params}")
+        part = part_path(target_filename)
+        host = urlparse(getattr(client, "url", "") or "").hostname or "cds"
         try:
-            client.retrieve(
-                self.DATASET_ID_SINGLE_LEVELS,
-                request_params,
-                str(target_filename)
-            )
+            retry_transfer(lambda: client.retrieve(self.DATASET_ID_SINGLE_LEVELS, request_params, str(part)),
+                           host, f"ERA5 request {target_filename.name}", self.retry_policy)
+            os.replace(part, target_filename)
             logging.info(f"ERA5 data downloaded to {target_filename}")
             return target_filename
         except Exception as e:
@@ -112,7 +171,7 @@ class ERA5Adapter(DataSourceAdapter):
             raise
     def _parse_data(self, raw_data_path):
         """
-        Parse ERA5 NetCDF file into an xarray.Dataset.
+        Parse ERA5 NetCDF file into an xarray.Dataset, honouring the 'precision' option.
         Args:
             raw_data_path (Path): Path to the NetCDF file.
         Returns:
@@ -121,32 +180,25 @@ class ERA5Adapter(DataSourceAdapter):
             Exception: If parsing fails.
         """
         try:
-            ds = xr.open_dataset(raw_data_path, engine='netcdf4')
-            return ds
+            ds = xr.open_dataset(raw_data_path, engine='netcdf4', chunks={}, **open_kwargs(self.precision))
+            return apply_precision(ds, self.precision)
         except Exception as e:
             logging.error(f"Error parsing ERA5 NetCDF file {raw_data_path}: {e}")
             raise
     def _standardize_data(self, dataset: xr.Dataset) -> xr.Dataset:
         """
-        Standardize ERA5 dataset: calculate wind speed if needed, rename coordinates.
+        Standardize ERA5 dataset: compute derived variables (e.g. wind speed) lazily, rename coordinates.
         Args:
             dataset (xarray.Dataset): Raw ERA5 dataset.
         Returns:
             xarray.Dataset: Standardized dataset.
         """
-        if self.needs_wind_speed_calculation:
-            u_var_name = self.VARIABLE_MAP["10m_u_component_of_wind"]
-            v_var_name = self.VARIABLE_MAP["10m_v_component_of_wind"]
-            if u_var_name in dataset and v_var_name in dataset:
-                dataset['surface_wind_speed'] = xr.ufuncs.sqrt(dataset[u_var_name]**2 + dataset[v_var_name]**2)
-                dataset['surface_wind_speed'].attrs['units'] = 'm s-1'
-                dataset['surface_wind_speed'].attrs['long_name'] = '10m Wind Speed'
-                if "10m_u_component_of_wind" not in self.raw_variables_requested:
-                    dataset = dataset.drop_vars([u_var_name], errors='ignore')
-                if "10m_v_component_of_wind" not in self.raw_variables_requested:
-                    dataset = dataset.drop_vars([v_var_name], errors='ignore')
-            else:
-                logging.warning("Requested surface_wind_speed, but u/v components missing in ERA5 dataset.")
+        if self.derived_variables:
+            source_names = {}
+            for std_name, native_name in self.VARIABLE_MAP.items():
+                short_name = self.NETCDF_SHORT_NAMES.get(native_name)
+                source_names[std_name] = short_name if native_name not in dataset and short_name in dataset else native_name
+            dataset = add_derived_variables(dataset, self.derived_variables, source_names, self.raw_variables_requested)
         rename_coords = {}
         if 'longitude' in dataset.coords and 'lon' not in dataset.coords:
             rename_coords['longitude'] = 'lon'
@@ -1,13 +1,41 @@
+import datetime
+import functools
 import logging
+import re
 import xarray as xr
 import pandas as pd
 import subprocess
 from pathlib import Path
 import os
 from .base import DataSourceAdapter
+from .. import config
+from ..derived import derived_dependencies, add_derived_variables
+from ..precision import open_kwargs, apply_precision, unify_packing
+from ..qc import apply_qc
+from ..transfer import retry_transfer
 
 NETRC_PATH = Path.home() / ".netrc"
-CACHE_DIR = Path.home() / ".spatiotemporal_data_cache"
+CACHE_DIR = config.CACHE_DIR
+PODAAC_HOST = "archive.podaac.earthdata.nasa.gov"
+# First YYYYMMDD group in a granule file name, e.g. cyg.ddmi.s20230101-... or oscar_currents_nrt_20230101.nc
+_GRANULE_DATE = re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)")
+
+
+def granule_date(path):
+    """
+    Start date of a granule, parsed from its file name.
+    Args:
+        path (Path or str): Granule file path.
+    Returns:
+        datetime.date or None: Granule date, or None if the name carries no date.
+    """
+    match = _GRANULE_DATE.search(Path(path).name)
+    if not match:
+        return None
+    try:
+        return datetime.date(*map(int, match.groups()))
+    except ValueError:
+        return None
 
 class PoDAACAdapterBase(DataSourceAdapter):
     """
@@ -15,6 +43,12 @@ class PoDAACAdapterBase(DataSourceAdapter):
 
     Handles authentication, request building, data download, parsing, and standardization for PO.DAAC datasets.
     """
+    # Approximate granule cadence and size, overridden per collection
+    GRANULES_PER_DAY = 1
+    ESTIMATED_GRANULE_BYTES = 10_000_000
+    # Return cached granules without running the downloader when every requested day has one.
+    # GranuleWatcher turns this off: more granules may be published for a day that is already cached.
+    trust_cached_days = True
     def _authenticate(self):
         """
         Check for Earthdata Login credentials file (~/.netrc).
@@ -34,7 +68,7 @@ class PoDAACAdapterBase(DataSourceAdapter):
         Returns:
             list[Path]: List of downloaded NetCDF file paths.
         Raises:
-            Exception: If download fails.
+            Exception: If download fails after the retries of the 'retry' policy.
         """
         output_dir = CACHE_DIR / collection_short_name
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -47,21 +81,25 @@ class PoDAACAdapterBase(DataSourceAdapter):
         ]
         if bbox_str:
             cmd.extend(['-b', bbox_str])
-        potential_cached_files = list(output_dir.glob('*.nc'))
-        if potential_cached_files:
-            logging.info(f"Found potential PO.DAAC files in cache: {output_dir}. Skipping download.")
-            return potential_cached_files
+        cached_files = self._granules_in_range(output_dir.glob('*.nc'))
+        if self.trust_cached_days and self._covers_request(cached_files):
+            logging.info(f"Found PO.DAAC granules for every requested day in cache: {output_dir}. Skipping download.")
+            return cached_files
         logging.info(f"Running podaac-data-downloader: {' '.join(cmd)}")
-        try:
+        def run_downloader():
             process = subprocess.run(cmd, capture_output=True, text=True, check=False)
-            if process.returncode != 0:
+            if process.returncode != 0 and not self._no_granules(process.stderr):
                 logging.error(f"podaac-data-downloader failed, return code {process.returncode}: {process.stderr}")
-                if "No granules found for" in process.stderr or "returned no results" in process.stderr:
-                    logging.warning(f"No matching granules found: {collection_short_name}, {start_date_str} to {end_date_str}")
-                    return
                 raise subprocess.CalledProcessError(process.returncode, cmd, output=process.stdout, stderr=process.stderr)
+            return process
+        try:
+            # Granules already in output_dir are skipped by the downloader, so a retry keeps earlier progress
+            process = retry_transfer(run_downloader, PODAAC_HOST, f"{collection_short_name} granules", self.retry_policy)
+            if process.returncode != 0:
+                logging.warning(f"No matching granules found: {collection_short_name}, {start_date_str} to {end_date_str}")
+                return
             logging.info(process.stdout)
-            downloaded_files = list(output_dir.glob('*.nc'))
+            downloaded_files = self._granules_in_range(output_dir.glob('*.nc'))
             if not downloaded_files:
                 logging.warning("No files downloaded by podaac-data-downloader, even though command succeeded.")
                 return
@@ -72,9 +110,78 @@ class PoDAACAdapterBase(DataSourceAdapter):
         except FileNotFoundError:
             logging.error("podaac-data-downloader command not found. Please install and add to PATH.")
             raise NotImplementedError("podaac-data-downloader not available.")
+    @staticmethod
+    def _no_granules(stderr):
+        return "No granules found for" in stderr or "returned no results" in stderr
+    def _granules_in_range(self, paths):
+        """
+        Keep the granules whose file-name date falls within the requested days.
+        Granules without a date in their name are kept.
+        Args:
+            paths (iterable[Path]): Granule file paths.
+        Returns:
+            list[Path]: Sorted granules of the requested period.
+        """
+        start_date, end_date = self.start_time.date(), self.end_time.date()
+        selected = []
+        for path in paths:
+            day = granule_date(path)
+            if day is None or start_date <= day <= end_date:
+                selected.append(path)
+        return sorted(selected)
+    def _covers_request(self, granules):
+        """
+        Whether cached granules cover every requested day, so the download can be skipped.
+        Args:
+            granules (list[Path]): Cached granules of the requested period.
+        Returns:
+            bool: True if each requested day has at least one granule.
+        """
+        if not granules:
+            return False
+        days = {granule_date(path) for path in granules}
+        if None in days:
+            return True
+        n_days = (self.end_time.date() - self.start_time.date()).days + 1
+        return len(days) >= n_days
+    def _describe_fetch_unit(self, unit):
+        """
+        Describe a podaac-data-downloader call: output directory, cache status and estimated size.
+        Args:
+            unit (dict): Keyword arguments for _fetch_raw_data_podaac_subscriber.
+        Returns:
+            dict: Unit description.
+        """
+        output_dir = CACHE_DIR / unit["collection_short_name"]
+        cached_files = self._granules_in_range(output_dir.glob('*.nc')) if output_dir.exists() else []
+        cached = self._covers_request(cached_files)
+        if cached:
+            estimated_bytes = sum(p.stat().st_size for p in cached_files)
+        else:
+            n_days = (self.end_time.date() - self.start_time.date()).days + 1
+            estimated_bytes = n_days * self.GRANULES_PER_DAY * self.ESTIMATED_GRANULE_BYTES
+        return {"request": unit, "target": output_dir, "cached": cached, "estimated_bytes": estimated_bytes}
+    def _select_native_variables(self, ds, decode=()):
+        """
+        Apply the 'qc' filters, keep only the requested native variables (and coordinates), if the
+        adapter maps variables, and convert them to the requested 'precision'.
+        QC runs first, so flag variables that are not requested can still be used.
+        Args:
+            ds (xarray.Dataset): Dataset opened from a granule.
+            decode (set[str], optional): Packed variables to decode anyway, see _mixed_packing.
+        Returns:
+            xarray.Dataset: Dataset restricted to the needed variables.
+        """
+        ds = apply_qc(ds, self.qc, getattr(self, 'VARIABLE_MAP', None))
+        if self.native_variables:
+            keep = [var for var in self.native_variables if var in ds.data_vars]
+            if keep:
+                ds = ds[keep]
+        return apply_precision(ds, self.precision, decode)
     def _parse_data(self, raw_data_paths):
         """
         Parse PO.DAAC NetCDF files into an xarray.Dataset.
+        With parse_workers > 1 the granules are decoded in parallel processes and loaded into memory.
         Args:
             raw_data_paths (list[Path]): List of NetCDF file paths.
         Returns:
@@ -86,16 +193,44 @@ class PoDAACAdapterBase(DataSourceAdapter):
             logging.info("No raw data paths provided to _parse_data, returning empty Dataset.")
             return xr.Dataset()
         try:
+            if len(raw_data_paths) > 1 and self.parse_workers > 1:
+                return xr.combine_by_coords(unify_packing(self._parse_granules(sorted(raw_data_paths))), combine_attrs='override')
             if len(raw_data_paths) > 1:
                 logging.info(f"Opening {len(raw_data_paths)} files as multi-file dataset.")
                 str_paths = [str(p) for p in raw_data_paths]
-                ds = xr.open_mfdataset(str_paths, combine='by_coords', engine='netcdf4', parallel=True, chunks={})
+                ds = xr.open_mfdataset(str_paths, combine='by_coords', engine='netcdf4', parallel=True, chunks={},
+                                       preprocess=functools.partial(self._select_native_variables,
+                                                                    decode=self._mixed_packing(raw_data_paths)),
+                                       **open_kwargs(self.precision))
             else:
-                ds = xr.open_dataset(raw_data_paths[0], engine='netcdf4', chunks={})
+                ds = xr.open_dataset(raw_data_paths[0], engine='netcdf4', chunks={}, **open_kwargs(self.precision))
+                ds = self._select_native_variables(ds)
             return ds
         except Exception as e:
             logging.error(f"Error parsing PO.DAAC NetCDF files {raw_data_paths}: {e}")
             raise
+    def _parse_granule(self, path):
+        """
+        Decode one granule into memory (worker side of parse_workers).
+        Args:
+            path (Path): NetCDF file path.
+        Returns:
+            xarray.Dataset: Loaded dataset of one granule.
+        """
+        with xr.open_dataset(path, engine='netcdf4', **open_kwargs(self.precision)) as ds:
+            return self._select_native_variables(ds).load()
+    def _iter_parsed(self, raw_data_paths):
+        """
+        Yield one parsed granule at a time, for streaming stages.
+        Args:
+            raw_data_paths (list[Path]): List of NetCDF file paths.
+        Yields:
+            xarray.Dataset: Parsed dataset of one granule.
+        """
+        decode = self._mixed_packing(raw_data_paths)
+        for path in sorted(raw_data_paths):
+            ds = xr.open_dataset(path, engine='netcdf4', chunks={}, **open_kwargs(self.precision))
+            yield self._select_native_variables(ds, decode)
     def _standardize_data(self, dataset: xr.Dataset) -> xr.Dataset:
         """
         Standardize PO.DAAC dataset: rename coordinates to latitude/longitude if needed.
@@ -116,7 +251,9 @@ class NOAACygnssL2Adapter(PoDAACAdapterBase):
     """
     Adapter for NOAA CYGNSS L2 wind speed data from PO.DAAC.
     """
+    SUPPORTS_TABLE = True
     COLLECTION_SHORT_NAME = "CYGNN-22512"
+    ESTIMATED_GRANULE_BYTES = 60_000_000
     VARIABLE_MAP = {
         "surface_wind_speed": "wind_speed",
         "latitude": "lat",
@@ -199,15 +336,28 @@ class OSCARAdapter(PoDAACAdapterBase):
         if self.product_type not in self.COLLECTION_MAP:
             raise ValueError(f"Invalid oscar_product_type: {self.product_type}. Must be one of {list(self.COLLECTION_MAP.keys())}")
         self.collection_short_name = self.COLLECTION_MAP[self.product_type]
+        self.near_real_time = self.product_type == 'nrt'
     def _map_variables(self, standardized_vars):
         """
         Map standardized variable names to OSCAR native variable names.
+        Derived variables (e.g. surface_current_speed) are expanded into their u/v dependencies.
         Args:
             standardized_vars (list[str]): List of standardized variable names.
         Returns:
             list[str]: List of native variable names.
         """
-        return
+        native_vars = set()
+        self.derived_variables = []
+        for var in standardized_vars:
+            if var in self.VARIABLE_MAP:
+                native_vars.add(self.VARIABLE_MAP[var])
+            elif derived_dependencies(var, self.VARIABLE_MAP):
+                native_vars.update(derived_dependencies(var, self.VARIABLE_MAP))
+                self.derived_variables.append(var)
+            else:
+                logging.warning(f"Variable '{var}' not explicitly mapped in OSCAR. Using as is.")
+                native_vars.add(var)
+        return list(native_vars)
     def _build_request_params(self):
         """
         Build request parameters for OSCAR download.
@@ -236,12 +386,14 @@ class OSCARAdapter(PoDAACAdapterBase):
         return self._fetch_raw_data_podaac_subscriber(**request_params)
     def _standardize_data(self, dataset: xr.Dataset) -> xr.Dataset:
         """
-        Standardize OSCAR dataset: rename coordinates if needed.
+        Standardize OSCAR dataset: compute derived variables (e.g. current speed) lazily, rename coordinates if needed.
         Args:
             dataset (xarray.Dataset): Raw dataset.
         Returns:
             xarray.Dataset: Standardized dataset.
         """
+        if self.derived_variables:
+            dataset = add_derived_variables(dataset, self.derived_variables, self.VARIABLE_MAP, self.raw_variables_requested)
         rename_map = {}
         if 'latitude' not in dataset.coords and 'lat' in dataset.coords:
             rename_map['lat'] = 'latitude'
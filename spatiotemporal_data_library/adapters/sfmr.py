@@ -1,4 +1,5 @@
 import logging
+import numpy as np
 import xarray as xr
 import pandas as pd
 import requests
@@ -6,8 +7,12 @@ import gzip
 import os
 from pathlib import Path
 from .base import DataSourceAdapter
+from .. import config
+from ..qc import apply_qc, qc_frame_mask
+from ..tabular import table_from_dataframe
+from ..transfer import http_download
 
-CACHE_DIR = Path.home() / ".spatiotemporal_data_cache"
+CACHE_DIR = config.CACHE_DIR
 
 class SFMRAdapter(DataSourceAdapter):
     """
@@ -15,9 +20,19 @@ class SFMRAdapter(DataSourceAdapter):
 
     Handles authentication, request building, download, parsing, and standardization for SFMR datasets.
     """
+    SUPPORTS_TABLE = True
+    # One flight file per request; splitting by day would download it once per window
+    DISTRIBUTED_SPLIT = None
+    BASE_URL = "https://www.aoml.noaa.gov/hrd/Storm_pages"
     # 对于 ASCII V1/V2 [8]
     ASCII_V1_COLS = ["Date", "Time", "Lat", "Lon", "Sfc_WS", "RR"]
     ASCII_V2_COLS = ["Date", "Time", "Lat", "Lon", "Sfc_WS", "RR"]
+    # Date is YYYYMMDD and Time is HHMMSS, both as integers
+    ASCII_DTYPES = {"Date": "int32", "Time": "int32", "Lat": "float32", "Lon": "float32", "Sfc_WS": "float32", "RR": "float32"}
+    ASCII_NA_VALUES = [-99.9, -999, -9999.0, -99.90]
+    ASCII_TABLE_COLUMNS = {"time_coord": "time", "Lat": "latitude", "Lon": "longitude", "Sfc_WS": "surface_wind_speed", "RR": "rain_rate"}
+    # Approximate size of one flight file by file type
+    ESTIMATED_FILE_BYTES = {"netcdf": 2_000_000, "ascii": 300_000}
     NETCDF_VAR_MAP = {
         "surface_wind_speed": "SWS",
         "rain_rate": "SRR",
@@ -66,11 +81,26 @@ class SFMRAdapter(DataSourceAdapter):
             filename = f"{filename_stem}.dat.gz"
         else:
             raise ValueError(f"Unsupported SFMR file type: {file_type}")
-        url = f"https://www.aoml.noaa.gov/hrd/Storm_pages/{storm_name.upper()}{year_str}/data/sfmr/{filename}"
+        url = f"{self.BASE_URL}/{storm_name.upper()}{year_str}/data/sfmr/{filename}"
         return {"url": url, "filename": filename, "file_type": file_type}
+    def _describe_fetch_unit(self, unit):
+        """
+        Describe the SFMR flight file: cache target, cache status and estimated size.
+        Args:
+            unit (dict): Request parameters (URL, filename, file_type).
+        Returns:
+            dict: Unit description.
+        """
+        target = CACHE_DIR / unit["filename"]
+        cached = target.exists()
+        if cached:
+            estimated_bytes = target.stat().st_size
+        else:
+            estimated_bytes = self.ESTIMATED_FILE_BYTES['netcdf' if unit["file_type"] == 'netcdf' else 'ascii']
+        return {"request": unit, "target": target, "cached": cached, "estimated_bytes": estimated_bytes}
     def _fetch_raw_data(self, request_params):
         """
-        Download SFMR data from NOAA HRD.
+        Download SFMR data from NOAA HRD, retrying transient failures and resuming partial downloads.
         Args:
             request_params (dict): Request parameters (URL, filename, file_type).
         Returns:
@@ -86,20 +116,84 @@ class SFMRAdapter(DataSourceAdapter):
             return target_file
         logging.info(f"Downloading SFMR data from: {url}")
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with open(target_file, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            http_download(url, target_file, self.retry_policy)
             logging.info(f"SFMR data downloaded to {target_file}")
             return target_file
         except requests.exceptions.RequestException as e:
             logging.error(f"Error downloading SFMR data from {url}: {e}")
-            if target_file.exists(): target_file.unlink()
             raise FileNotFoundError(f"Failed to download SFMR data from {url}. Check URL and availability.")
+    def _parsed_cache_path(self, raw_data_path):
+        """
+        Path of the parsed-table cache for an ASCII file: one entry per source file name,
+        replaced when the source file changes.
+        Args:
+            raw_data_path (Path): Path to the downloaded ASCII file.
+        Returns:
+            Path: Path to the .npz columnar cache file.
+        """
+        return CACHE_DIR / "parsed" / f"{Path(raw_data_path).name}.npz"
+    @staticmethod
+    def _source_signature(raw_data_path):
+        """
+        Size and mtime of a source file, stored with its parsed table to detect changes.
+        Args:
+            raw_data_path (Path): Path to the downloaded ASCII file.
+        Returns:
+            numpy.ndarray: [size, mtime_ns] as int64.
+        """
+        stat = Path(raw_data_path).stat()
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+    def _read_ascii_table(self, raw_data_path, file_type):
+        """
+        Read a gzip'd SFMR ASCII file into a DataFrame with compact dtypes and a 'time_coord' column.
+        The parsed columns are cached as .npz together with the source size and mtime, so later
+        reads skip text parsing and a changed source file overwrites its entry.
+        Args:
+            raw_data_path (Path): Path to the downloaded ASCII file.
+            file_type (str): 'ascii', 'ascii_v1' or 'ascii_v2'.
+        Returns:
+            pandas.DataFrame: Parsed table.
+        """
+        col_names = self.ASCII_V2_COLS if file_type == 'ascii_v2' else self.ASCII_V1_COLS
+        cache_path = self._parsed_cache_path(raw_data_path)
+        signature = self._source_signature(raw_data_path)
+        if cache_path.exists():
+            with np.load(cache_path) as columns:
+                if "_source" in columns.files and np.array_equal(columns["_source"], signature):
+                    logging.info(f"Found parsed SFMR table in cache: {cache_path}")
+                    return pd.DataFrame({name: columns[name] for name in col_names + ['time_coord']})
+            logging.info(f"Source of {cache_path} changed, parsing again.")
+        dtypes = {name: self.ASCII_DTYPES[name] for name in col_names}
+        na_values = {name: self.ASCII_NA_VALUES for name in col_names if dtypes[name].startswith('float')}
+        with gzip.open(raw_data_path, 'rt') as f:
+            df = pd.read_csv(f, sep=r'\s+', names=col_names, dtype=dtypes, na_values=na_values, comment='#')
+        date = df['Date'].to_numpy()
+        time_of_day = df['Time'].to_numpy()
+        df['time_coord'] = pd.to_datetime({
+            'year': date // 10000, 'month': date // 100 % 100, 'day': date % 100,
+            'hour': time_of_day // 10000, 'minute': time_of_day // 100 % 100, 'second': time_of_day % 100,
+        }).astype('datetime64[ns]')
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix('.tmp.npz')
+        np.savez(tmp_path, _source=signature, **{name: df[name].to_numpy() for name in df.columns})
+        os.replace(tmp_path, cache_path)
+        return df
+    def _ascii_qc(self, df):
+        """
+        Drop the rows of a parsed ASCII table rejected by the 'qc' filters.
+        Columns can be named natively (e.g. 'Sfc_WS') or by their standardized name.
+        Args:
+            df (pandas.DataFrame): Table from _read_ascii_table.
+        Returns:
+            pandas.DataFrame: Rows passing all filters.
+        """
+        if not self.qc:
+            return df
+        standardized = {std_name: column for column, std_name in self.ASCII_TABLE_COLUMNS.items()}
+        return df[qc_frame_mask(df, self.qc, standardized)]
     def _parse_data(self, raw_data_path):
         """
-        Parse SFMR NetCDF or ASCII file into an xarray.Dataset.
+        Parse SFMR NetCDF or ASCII file into an xarray.Dataset, dropping samples rejected by 'qc'.
         Args:
             raw_data_path (Path): Path to the downloaded file.
         Returns:
@@ -111,13 +205,9 @@ class SFMRAdapter(DataSourceAdapter):
         try:
             if file_type == 'netcdf':
                 ds = xr.open_dataset(raw_data_path, engine='netcdf4', chunks={})
+                ds = apply_qc(ds, self.qc, self.NETCDF_VAR_MAP)
             elif file_type.startswith('ascii'):
-                col_names = self.ASCII_V2_COLS if file_type == 'ascii_v2' else self.ASCII_V1_COLS
-                with gzip.open(raw_data_path, 'rt') as f:
-                    df = pd.read_csv(f, delim_whitespace=True, names=col_names, na_values=[-99.9, -999, -9999.0, -99.90], comment='#')
-                df['datetime_str'] = df['Date'].astype(str) + df['Time'].astype(str).str.zfill(6)
-                df['time_coord'] = pd.to_datetime(df['datetime_str'], format='%Y%m%d%H%M%S')
-                df = df.set_index('time_coord')
+                df = self._ascii_qc(self._read_ascii_table(raw_data_path, file_type)).set_index('time_coord')
                 ds = xr.Dataset.from_dataframe(df)
                 rename_map_ascii = {'Sfc_WS': 'SWS', 'RR': 'SRR', 'Lat':'LAT', 'Lon':'LON', 'Time':'TIME_int', 'Date':'DATE_int'}
                 ds = ds.rename({k:v for k,v in rename_map_ascii.items() if k in ds})
@@ -149,4 +239,20 @@ class SFMRAdapter(DataSourceAdapter):
         dataset = dataset.rename(rename_coords)
         if 'time' in dataset.coords and 'time' not in dataset.dims and len(dataset.dims)>0:
             dataset = dataset.swap_dims({list(dataset.dims)[0]: 'time'})
-        return dataset 
\ No newline at end of file
+        return dataset 
+    def get_table(self):
+        """
+        Fetch SFMR observations as a pyarrow.Table.
+        ASCII files go straight from the parsed table to Arrow, skipping the xarray round-trip.
+        Returns:
+            pyarrow.Table: Observation table with standardized column names.
+        """
+        file_type = self.kwargs.get('sfmr_file_type', 'netcdf').lower()
+        if not file_type.startswith('ascii'):
+            return super().get_table()
+        self._authenticate()
+        raw_data_path = self._fetch_raw_data(self._build_request_params())
+        self.raw_data_info = raw_data_path
+        df = self._ascii_qc(self._read_ascii_table(raw_data_path, file_type))
+        df = df.rename(columns=self.ASCII_TABLE_COLUMNS)[list(self.ASCII_TABLE_COLUMNS.values())]
+        return table_from_dataframe(df)
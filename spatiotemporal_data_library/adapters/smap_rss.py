@@ -1,12 +1,76 @@
 import logging
+import numpy as np
+import pandas as pd
 import xarray as xr
 import os
 import ftplib
 import datetime
+import functools
 from pathlib import Path
 from .base import DataSourceAdapter
+from .. import config
+from ..precision import open_kwargs, apply_precision, is_packed, decode_packed, unify_packing
+from ..qc import apply_qc, mask_variable
+from ..transfer import ftp_download
+
+CACHE_DIR = config.CACHE_DIR
+
+
+def pixel_times(minute, day):
+    """
+    Reconstruct per-pixel UTC observation times of a daily SMAP RSS file.
+    Args:
+        minute (numpy.ndarray): Decoded 'minute' variable (minutes of the UTC day; NaN where no observation).
+        day (numpy.datetime64): Date of the file.
+    Returns:
+        numpy.ndarray: datetime64[ns] array of the same shape; NaT where no observation.
+    """
+    minute = np.asarray(minute, dtype=np.float64)
+    missing = np.isnan(minute)
+    offsets = np.where(missing, 0, minute).astype(np.int64).astype("timedelta64[m]")
+    times = np.datetime64(day, "ns") + offsets
+    times[missing] = np.datetime64("NaT")
+    return times
+
+
+def _mask_within_box(dataset, inside):
+    """
+    Mask the cells of a dataset where inside is False, reading only the box of the grid that
+    covers the cells inside. The masked variables are padded back to the full grid with their
+    fill value (NaN, or _FillValue for packed integers), so the result has the dataset's shape.
+    Args:
+        dataset (xarray.Dataset): Data of one file, lazily indexed or dask-backed.
+        inside (xarray.DataArray): Boolean mask, True where cells are kept.
+    Returns:
+        xarray.Dataset: Masked dataset.
+    """
+    box = {}
+    for dim in inside.dims:
+        hits = np.flatnonzero(inside.any([other for other in inside.dims if other != dim]).values)
+        if hits.size:
+            box[dim] = slice(hits[0], hits[-1] + 1)
+    pad_width = {dim: (box[dim].start, inside.sizes[dim] - box[dim].stop) for dim in box}
+    masked = {}
+    for name, variable in dataset.data_vars.items():
+        if not set(inside.dims) <= set(variable.dims):
+            continue
+        fill = variable.attrs["_FillValue"] if is_packed(variable) and "_FillValue" in variable.attrs else np.nan
+        if not box:
+            # Nothing inside the window: nothing to read
+            masked[name] = xr.full_like(variable, fill)
+            continue
+        padded = mask_variable(variable.isel(box), inside.isel(box)).variable.pad(pad_width, constant_values=fill)
+        padded.encoding = dict(variable.encoding)
+        masked[name] = padded
+    return dataset.assign(masked)
+
+
+def _naive_utc64(time_value):
+    timestamp = pd.Timestamp(time_value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.to_datetime64()
 
-CACHE_DIR = Path.home() / ".spatiotemporal_data_cache"
 
 class SMAPRSSAdapter(DataSourceAdapter):
     """
@@ -15,6 +79,8 @@ class SMAPRSSAdapter(DataSourceAdapter):
     Handles authentication, FTP download, parsing, and standardization for SMAP RSS.
     """
     BASE_FTP_URL = "ftp.remss.com"
+    # Approximate size of one daily L3 file
+    ESTIMATED_FILE_BYTES = 10_000_000
     VARIABLE_MAP = {
         "surface_wind_speed": "wind",
         "time_of_day_utc_minute": "minute"
@@ -56,9 +122,31 @@ class SMAPRSSAdapter(DataSourceAdapter):
             file_list.append({"type": "ftp", "path": ftp_path_corrected, "date": current_date, "filename": filename})
             current_date += datetime.timedelta(days=1)
         return file_list
+    def _split_fetch_units(self, request_params_list):
+        """
+        Split the SMAP RSS file list into one fetch unit per daily file.
+        Args:
+            request_params_list (list[dict]): List of file info dicts.
+        Returns:
+            list[list[dict]]: Single-file lists accepted by _fetch_raw_data.
+        """
+        return [[file_info] for file_info in request_params_list]
+    def _describe_fetch_unit(self, unit):
+        """
+        Describe a single-file fetch unit: cache target, cache status and estimated size.
+        Args:
+            unit (list[dict]): Single-file list of file info dicts.
+        Returns:
+            dict: Unit description.
+        """
+        target = CACHE_DIR / unit[0]["filename"]
+        cached = target.exists()
+        estimated_bytes = target.stat().st_size if cached else self.ESTIMATED_FILE_BYTES
+        return {"request": unit, "target": target, "cached": cached, "estimated_bytes": estimated_bytes}
     def _fetch_raw_data(self, request_params_list):
         """
-        Download SMAP RSS files via FTP.
+        Download SMAP RSS files via FTP. Transient failures are retried per file; a day that still
+        fails is logged and skipped.
         Args:
             request_params_list (list[dict]): List of file info dicts.
         Returns:
@@ -79,24 +167,66 @@ class SMAPRSSAdapter(DataSourceAdapter):
                     continue
                 try:
                     logging.info(f"Attempting FTP download: ftp://{self.BASE_FTP_URL}{file_info['path']}")
-                    with ftplib.FTP(self.BASE_FTP_URL) as ftp:
-                        ftp.login(self.ftp_user, self.ftp_password)
-                        with open(target_file, 'wb') as fp:
-                            ftp.retrbinary(f"RETR {file_info['path']}", fp.write)
-                        logging.info(f"Downloaded {file_info['filename']} to {target_file}")
-                        downloaded_files.append(target_file)
+                    ftp_download(self.BASE_FTP_URL, self.ftp_user, self.ftp_password, file_info['path'], target_file, self.retry_policy)
+                    logging.info(f"Downloaded {file_info['filename']} to {target_file}")
+                    downloaded_files.append(target_file)
                 except Exception as e:
+                    # The partial .part file is kept so the next run resumes it
                     logging.error(f"FTP download failed for {file_info['filename']}: {e}")
-                    if target_file.exists(): target_file.unlink()
             elif file_info["type"] == "https":
                 logging.warning("HTTPS download for SMAP RSS not fully implemented in this example.")
                 pass
         if not downloaded_files:
             raise FileNotFoundError("No SMAP RSS files downloaded or found in cache.")
         return downloaded_files
+    def _preprocess_smap_rss(self, ds, decode=()):
+        """
+        Mask cells rejected by the 'qc' filters (e.g. land, ice or rain flags), stamp a daily
+        SMAP RSS file with its date (from the filename) as a 'time' dimension and convert it
+        to the requested 'precision'.
+        Args:
+            ds (xarray.Dataset): Dataset opened from one daily file.
+            decode (set[str], optional): Packed variables to decode anyway, see _mixed_packing.
+        Returns:
+            xarray.Dataset: Dataset with a length-1 'time' dimension.
+        """
+        filename = Path(ds.encoding["source"]).name
+        date_str = filename.split('_')[-1].split('.')[0]
+        file_date = datetime.datetime.strptime(date_str, "%Y%m%d")
+        ds = apply_qc(ds, self.qc, self.VARIABLE_MAP)
+        ds = ds.assign_coords(time=file_date)
+        ds = ds.expand_dims('time')
+        # Restrict before converting, so only the part of the grid inside the window is decoded
+        return apply_precision(self._restrict_to_window(ds), self.precision, decode)
+    def _restrict_to_window(self, dataset):
+        """
+        Apply start_time/end_time per pixel, using the UTC times reconstructed from 'minute'.
+        Days the window does not cut are returned unchanged. Otherwise only 'minute' is read
+        in full; the other variables are read for the lat/lon box covering the pixels inside
+        the window, masked there and padded back to the full daily grid, so every day keeps the
+        file's lat/lon grid and days can be concatenated, cached and exported like whole days.
+        Args:
+            dataset (xarray.Dataset): Data of one daily file, with a length-1 'time' dimension.
+        Returns:
+            xarray.Dataset: Data restricted to the time window.
+        """
+        if not self.within_file_window or 'minute' not in dataset or dataset.sizes.get('time') != 1:
+            return dataset
+        day = dataset['time'].values[0]
+        start, end = _naive_utc64(self.start_time), _naive_utc64(self.end_time)
+        if start <= day and day + np.timedelta64(1439, 'm') <= end:
+            return dataset
+        minute = dataset['minute']
+        if is_packed(minute):
+            minute = decode_packed(minute)
+        times = pixel_times(minute.values, day)
+        inside = xr.DataArray((times >= start) & (times <= end), dims=minute.dims)
+        return _mask_within_box(dataset, inside)
     def _parse_data(self, raw_data_paths):
         """
         Parse SMAP RSS NetCDF files into an xarray.Dataset.
+        Each file is converted to the requested 'precision' before concatenation.
+        With parse_workers > 1 the files are decoded in parallel processes and loaded into memory.
         Args:
             raw_data_paths (list[Path]): List of NetCDF file paths.
         Returns:
@@ -107,20 +237,42 @@ class SMAPRSSAdapter(DataSourceAdapter):
         if not raw_data_paths:
             raise ValueError("No data paths provided to SMAP RSS _parse_data.")
         try:
+            if self.parse_workers > 1:
+                pieces = unify_packing(self._parse_granules(sorted(raw_data_paths)))
+                # Only time-dependent variables are copied; lat/lon/node are taken from the first file
+                ds = xr.concat(pieces, dim='time', data_vars='minimal', coords='minimal',
+                               compat='override', join='override', combine_attrs='override')
+                return ds.sortby('time')
             str_paths = [str(p) for p in raw_data_paths]
-            def preprocess_smap_rss(ds):
-                filename = Path(ds.encoding["source"]).name
-                date_str = filename.split('_')[-1].split('.')[0]
-                file_date = datetime.datetime.strptime(date_str, "%Y%m%d")
-                ds = ds.assign_coords(time=file_date)
-                ds = ds.expand_dims('time')
-                return ds
-            ds = xr.open_mfdataset(str_paths, combine='nested', concat_dim='time', engine='netcdf4', preprocess=preprocess_smap_rss)
+            preprocess = functools.partial(self._preprocess_smap_rss, decode=self._mixed_packing(raw_data_paths))
+            ds = xr.open_mfdataset(str_paths, combine='nested', concat_dim='time', engine='netcdf4', preprocess=preprocess,
+                                   **open_kwargs(self.precision))
             ds = ds.sortby('time')
             return ds
         except Exception as e:
             logging.error(f"Error parsing SMAP RSS NetCDF files {raw_data_paths}: {e}")
             raise
+    def _parse_granule(self, path):
+        """
+        Decode one daily file into memory (worker side of parse_workers).
+        Args:
+            path (Path): NetCDF file path.
+        Returns:
+            xarray.Dataset: Loaded dataset of one day.
+        """
+        with xr.open_dataset(path, engine='netcdf4', **open_kwargs(self.precision)) as ds:
+            return self._preprocess_smap_rss(ds).load()
+    def _iter_parsed(self, raw_data_paths):
+        """
+        Yield one parsed daily file at a time, for streaming stages.
+        Args:
+            raw_data_paths (list[Path]): List of NetCDF file paths.
+        Yields:
+            xarray.Dataset: Parsed dataset of one day.
+        """
+        decode = self._mixed_packing(raw_data_paths)
+        for path in sorted(raw_data_paths):
+            yield self._preprocess_smap_rss(xr.open_dataset(path, engine='netcdf4', chunks={}, **open_kwargs(self.precision)), decode)
     def _standardize_data(self, dataset: xr.Dataset) -> xr.Dataset:
         """
         Standardize SMAP RSS dataset (currently a passthrough).
@@ -0,0 +1,123 @@
+"""
+Streaming temporal aggregation (resampling and climatologies).
+
+TemporalAccumulator receives standardized pieces of a request one at a time (per file or
+per block of time steps) and keeps running per-bin partial results, so memory is bounded by
+the size of the aggregated output rather than by the full-resolution input. Each piece only
+updates, in place, the bins it touches; the bins are assembled once in result().
+
+Specification, passed to fetch_data as ``aggregate=``:
+    {"time": "1D", "how": "mean"}        resample to a pandas frequency ("6h", "1D", "MS", ...)
+    {"time": "month", "how": "mean"}     climatology over month, dayofyear, season or hour
+"""
+import logging
+import numpy as np
+import xarray as xr
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+CLIMATOLOGY_GROUPS = ("month", "dayofyear", "season", "hour")
+AGGREGATIONS = ("mean", "sum", "min", "max", "count")
+# In-place merge of two partial results of the same bin; fmin/fmax skip NaN like the reductions
+_MERGE = {"sum": np.add, "count": np.add, "min": np.fmin, "max": np.fmax}
+
+
+class TemporalAccumulator:
+    """
+    Running temporal aggregation over a stream of datasets with a 'time' dimension.
+    """
+    def __init__(self, spec):
+        """
+        Args:
+            spec (dict): {"time": <pandas frequency or climatology group>, "how": <aggregation>}.
+        Raises:
+            ValueError: If the specification is invalid.
+        """
+        if not isinstance(spec, dict) or "time" not in spec:
+            raise ValueError("aggregate must be a dict like {'time': '1D', 'how': 'mean'}.")
+        self.freq = spec["time"]
+        self.how = spec.get("how", "mean")
+        if self.how not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation: {self.how}. Must be one of {list(AGGREGATIONS)}")
+        self.is_climatology = self.freq in CLIMATOLOGY_GROUPS
+        if not self.is_climatology:
+            to_offset(self.freq)
+        self._bin_dim = self.freq if self.is_climatology else "time"
+        # reduction -> {bin label: partial result of that bin}
+        self._partials = {}
+        self._attrs = None
+
+    def _group(self, piece):
+        if self.is_climatology:
+            return piece.groupby(f"time.{self.freq}")
+        if isinstance(to_offset(self.freq), Tick):
+            # Epoch-anchored bins line up across pieces whatever time each piece starts at
+            return piece.resample(time=self.freq, origin="epoch")
+        return piece.resample(time=self.freq)
+
+    def _partial_reductions(self):
+        return ("sum", "count") if self.how in ("mean", "sum") else (self.how,)
+
+    def add(self, piece: xr.Dataset):
+        """
+        Fold one piece into the running aggregates.
+        Args:
+            piece (xarray.Dataset): Standardized data with a 'time' dimension.
+        """
+        if "time" not in piece.dims:
+            logging.warning("Temporal aggregation skipped a piece without a 'time' dimension.")
+            return
+        if not piece.sizes["time"]:
+            return
+        numeric = [name for name, da in piece.data_vars.items()
+                   if "time" in da.dims and np.issubdtype(da.dtype, np.number)]
+        piece = piece[numeric]
+        if self._attrs is None:
+            self._attrs = piece.attrs
+        for reduction in self._partial_reductions():
+            grouped = self._group(piece)
+            partial = getattr(grouped, reduction)(keep_attrs=True).load()
+            bins = self._partials.setdefault(reduction, {})
+            for i, label in enumerate(partial[self._bin_dim].values):
+                update = partial.isel({self._bin_dim: i})
+                current = bins.get(label)
+                if current is None:
+                    bins[label] = update.copy(deep=True)
+                else:
+                    bins[label] = self._merge(current, update, reduction)
+
+    @staticmethod
+    def _merge(current, update, reduction):
+        if all(current[dim].equals(update[dim]) for dim in update.dims if dim in update.coords) \
+                and set(update.data_vars) <= set(current.data_vars):
+            for name, variable in update.data_vars.items():
+                values = current[name].values
+                _MERGE[reduction](values, variable.values.astype(values.dtype, copy=False), out=values)
+            return current
+        # Pieces on different grids: fall back to an outer-joined reduction of this bin only
+        stacked = xr.concat([current, update], dim="__partial", join="outer", combine_attrs="override")
+        combine = "sum" if reduction in ("sum", "count") else reduction
+        return getattr(stacked, combine)("__partial", keep_attrs=True)
+
+    def result(self) -> xr.Dataset:
+        """
+        Final aggregated dataset; empty if nothing was added.
+        Returns:
+            xarray.Dataset: Aggregated data.
+        """
+        if not self._partials:
+            return xr.Dataset()
+        partials = {reduction: xr.concat([bins[label] for label in sorted(bins)], dim=self._bin_dim,
+                                         join="outer", combine_attrs="override")
+                    for reduction, bins in self._partials.items()}
+        if self.how in ("mean", "sum"):
+            totals, counts = partials["sum"], partials["count"]
+            result = totals / counts if self.how == "mean" else totals
+            result = result.where(counts > 0)
+            for name in result.data_vars:
+                result[name].attrs = totals[name].attrs
+        else:
+            result = partials[self.how]
+        result.attrs = dict(self._attrs or {})
+        result.attrs["aggregation"] = f"{self.how} over time={self.freq}"
+        return result
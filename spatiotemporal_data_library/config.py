@@ -1 +1,7 @@
 # 配置相关内容，可根据需要扩展
+import os
+from pathlib import Path
+
+# 原始数据缓存目录；多进程/多节点运行时可通过环境变量指向共享文件系统
+CACHE_DIR_ENV = "SPATIOTEMPORAL_DATA_CACHE"
+CACHE_DIR = Path(os.environ.get(CACHE_DIR_ENV, str(Path.home() / ".spatiotemporal_data_cache"))).expanduser()
@@ -0,0 +1,108 @@
+"""
+Registry of derived variables shared by all adapters.
+
+A derived variable declares the standardized variables it depends on and a kernel that
+computes it from their arrays. Adapters expand requested derived variables into the
+native variables they must fetch, then call add_derived_variables() after parsing.
+Kernels run block-wise through xarray.apply_ufunc, so on dask-backed datasets the
+result stays lazy and is computed chunk by chunk; each kernel writes into a single
+output buffer instead of allocating full-size temporaries such as u**2 and v**2.
+"""
+import logging
+import numpy as np
+import xarray as xr
+from .precision import is_packed, decode_packed
+
+DERIVED_VARIABLES = {}
+
+
+def register_derived_variable(name, dependencies, func, attrs=None):
+    """
+    Register a derived variable.
+    Args:
+        name (str): Standardized name of the derived variable.
+        dependencies (list[str]): Standardized names of the input variables, in the order func expects them.
+        func (callable): Kernel taking one numpy array per dependency and returning the result array.
+        attrs (dict, optional): Attributes set on the result (units, long_name, ...).
+    """
+    DERIVED_VARIABLES[name] = {"dependencies": tuple(dependencies), "func": func, "attrs": dict(attrs or {})}
+
+
+def derived_dependencies(name, variable_map):
+    """
+    Native variable names needed to derive `name` with a given adapter variable map.
+    Args:
+        name (str): Standardized variable name.
+        variable_map (dict): Adapter mapping of standardized to native variable names.
+    Returns:
+        list[str] or None: Native dependency names, or None if `name` is not derivable from variable_map.
+    """
+    spec = DERIVED_VARIABLES.get(name)
+    if spec is None or not all(dep in variable_map for dep in spec["dependencies"]):
+        return None
+    return [variable_map[dep] for dep in spec["dependencies"]]
+
+
+def add_derived_variables(dataset: xr.Dataset, names, source_names, requested) -> xr.Dataset:
+    """
+    Compute derived variables and drop dependency variables that were not requested.
+    Args:
+        dataset (xarray.Dataset): Dataset holding the native dependency variables.
+        names (list[str]): Derived variables to compute.
+        source_names (dict): Mapping of standardized dependency names to variable names in dataset.
+        requested (list[str]): Variables originally requested; dependencies in it are kept.
+    Returns:
+        xarray.Dataset: Dataset with the derived variables added.
+    """
+    used = set()
+    for name in names:
+        spec = DERIVED_VARIABLES[name]
+        inputs = [source_names.get(dep) for dep in spec["dependencies"]]
+        if not all(var in dataset for var in inputs):
+            logging.warning(f"Requested {name}, but its inputs {list(spec['dependencies'])} are missing in the dataset.")
+            continue
+        # Packed inputs (precision="packed") are decoded to float32 inside the same lazy graph
+        arrays = [decode_packed(dataset[var]) if is_packed(dataset[var]) else dataset[var] for var in inputs]
+        dtype = np.result_type(np.float32, *[a.dtype for a in arrays])
+        result = xr.apply_ufunc(spec["func"], *arrays, dask="parallelized", output_dtypes=[dtype], keep_attrs=False)
+        result.attrs.update(spec["attrs"])
+        dataset[name] = result
+        used.update(zip(spec["dependencies"], inputs))
+    drop = [var for dep, var in used if dep not in requested and var not in requested]
+    return dataset.drop_vars(drop, errors="ignore")
+
+
+def _speed(u, v):
+    # hypot evaluates sqrt(u*u + v*v) in one pass without intermediate arrays
+    return np.hypot(u, v)
+
+
+def _direction_from(u, v):
+    # Meteorological convention: direction the flow comes from, clockwise from north
+    out = np.arctan2(u, v)
+    np.degrees(out, out=out)
+    out += 180.0
+    np.mod(out, 360.0, out=out)
+    return out
+
+
+def _direction_towards(u, v):
+    # Oceanographic convention: direction the flow goes to, clockwise from north
+    out = np.arctan2(u, v)
+    np.degrees(out, out=out)
+    np.mod(out, 360.0, out=out)
+    return out
+
+
+register_derived_variable(
+    "surface_wind_speed", ["10m_u_component_of_wind", "10m_v_component_of_wind"], _speed,
+    {"units": "m s-1", "long_name": "10m Wind Speed"})
+register_derived_variable(
+    "surface_wind_direction", ["10m_u_component_of_wind", "10m_v_component_of_wind"], _direction_from,
+    {"units": "degree", "long_name": "10m Wind Direction (coming from, clockwise from north)"})
+register_derived_variable(
+    "surface_current_speed", ["zonal_surface_current", "meridional_surface_current"], _speed,
+    {"units": "m s-1", "long_name": "Surface Current Speed"})
+register_derived_variable(
+    "surface_current_direction", ["zonal_surface_current", "meridional_surface_current"], _direction_towards,
+    {"units": "degree", "long_name": "Surface Current Direction (going towards, clockwise from north)"})
@@ -0,0 +1,168 @@
+"""
+Distributed execution of a request over a pool of worker processes or nodes.
+
+With the ``executor`` option, a request is split into time windows (one day each by default,
+see DataSourceAdapter.DISTRIBUTED_SPLIT). Every window is submitted to the executor as an
+independent task that builds its own adapter, runs the whole pipeline (download, parse,
+standardize) and writes its result to a NetCDF file in a shared directory. The parent only
+collects file paths and opens them lazily as one dataset, so no array data travels through
+the executor.
+
+Any concurrent.futures.Executor works: a ProcessPoolExecutor on one machine, or the executor
+of a cluster scheduler (e.g. dask.distributed's Client.get_executor()) across nodes. Workers
+on several nodes must see the same cache directory; point SPATIOTEMPORAL_DATA_CACHE at a
+shared file system on every node so downloads and window results are shared as well.
+
+Window results are kept under <cache>/distributed/<request key>/, so re-running an
+interrupted request only computes the missing windows. Each result has a sidecar JSON with
+the size and mtime of the source files it was built from (see resultcache.py); a window whose
+sources changed, or a near-real-time window older than the result TTL, is computed again.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import pandas as pd
+import xarray as xr
+from . import config
+from .resultcache import entry_meta, is_current, result_ttl
+
+# Options that only control how a request is executed, not its result
+EXECUTION_OPTIONS = ("executor", "result_cache", "result_cache_ttl")
+
+
+def distributed_root() -> Path:
+    """Shared directory of window results."""
+    return config.CACHE_DIR / "distributed"
+
+
+def split_time_windows(start_time, end_time, freq="1D"):
+    """
+    Split [start_time, end_time] into consecutive, non-overlapping windows aligned to freq.
+    Args:
+        start_time, end_time (datetime.datetime): Request period.
+        freq (str or None): Window length as a pandas frequency; None keeps a single window.
+    Returns:
+        list[tuple]: (start, end) pairs covering the period, in order.
+    """
+    start, end = pd.Timestamp(start_time), pd.Timestamp(end_time)
+    if freq is None or end <= start:
+        return [(start_time, end_time)]
+    edges = pd.date_range(start.floor(freq), end, freq=freq)
+    windows = []
+    for i, edge in enumerate(edges):
+        window_start = max(start, edge)
+        window_end = end if i + 1 == len(edges) else min(end, edges[i + 1] - pd.Timedelta(microseconds=1))
+        if window_start <= window_end:
+            windows.append((window_start.to_pydatetime(), window_end.to_pydatetime()))
+    return windows
+
+
+def request_key(adapter) -> str:
+    """
+    Key of a request's window results: dataset, variables, period, selection and result-relevant options.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+    Returns:
+        str: Hex digest.
+    """
+    options = {k: v for k, v in adapter.kwargs.items() if k not in EXECUTION_OPTIONS}
+    identity = [adapter.dataset_name, list(adapter.raw_variables_requested), adapter.start_time.isoformat(),
+                adapter.end_time.isoformat(), adapter.bbox, adapter.point, options]
+    return hashlib.md5(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def sources_path(target) -> Path:
+    """Sidecar JSON recording the source files of a window result."""
+    target = Path(target)
+    return target.with_name(f"{target.stem}.sources.json")
+
+
+def _read_sources(target):
+    try:
+        return json.loads(sources_path(target).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def run_window(adapter_class, dataset_name, variables, start_time, end_time, bbox, point, kwargs, target):
+    """
+    Worker task: fetch one time window and write its standardized result to target.
+    Module-level so it can be pickled by process and cluster executors.
+    Args:
+        adapter_class (type): DataSourceAdapter subclass of the request.
+        dataset_name (str): Dataset short name.
+        variables (list[str]): Standardized variable names.
+        start_time, end_time (datetime.datetime): Window.
+        bbox (list[float] or None): Bounding box.
+        point (list[float] or None): Point.
+        kwargs (dict): Adapter options, without the executor.
+        target (str): NetCDF file of the window result; an existing file is reused while its
+            source files are unchanged.
+    Returns:
+        str or None: target, or None if the window has no data.
+    """
+    target = Path(target)
+    adapter = adapter_class(dataset_name, variables, start_time, end_time, bbox, point, **kwargs)
+    meta = _read_sources(target)
+    if target.exists() and meta is not None and is_current(meta, result_ttl(adapter)):
+        return str(target)
+    try:
+        dataset = adapter.get_data()
+    except FileNotFoundError as e:
+        logging.warning(f"No data for {dataset_name} between {start_time} and {end_time}: {e}")
+        return None
+    if not dataset.sizes:
+        return None
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    dataset.to_netcdf(tmp)
+    # Drop the old sidecar first, so an interrupted write never pairs new data with old sources
+    sources_path(target).unlink(missing_ok=True)
+    os.replace(tmp, target)
+    tmp = sources_path(target).with_name(f"{sources_path(target).name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(entry_meta(adapter)))
+    os.replace(tmp, sources_path(target))
+    return str(target)
+
+
+def _concat_dim(path):
+    with xr.open_dataset(path) as dataset:
+        if "time" in dataset.dims:
+            return "time"
+        if len(dataset.dims) == 1:
+            return next(iter(dataset.dims))
+    raise ValueError(f"Cannot gather window results with dimensions {list(dataset.dims)}: no 'time' dimension.")
+
+
+def get_distributed_data(adapter) -> xr.Dataset:
+    """
+    Run a request window by window on the adapter's ``executor`` and gather the results lazily.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+    Returns:
+        xarray.Dataset: Window results concatenated along time, backed by dask arrays.
+    Raises:
+        FileNotFoundError: If no window produced any data.
+    """
+    executor = adapter.kwargs["executor"]
+    kwargs = {k: v for k, v in adapter.kwargs.items() if k not in EXECUTION_OPTIONS}
+    windows = split_time_windows(adapter.start_time, adapter.end_time, adapter.DISTRIBUTED_SPLIT)
+    directory = distributed_root() / request_key(adapter)
+    logging.info(f"Running {adapter.dataset_name} as {len(windows)} tasks on {type(executor).__name__}")
+    futures = [executor.submit(run_window, type(adapter), adapter.dataset_name, adapter.raw_variables_requested,
+                               start, end, adapter.bbox, adapter.point, kwargs, str(directory / f"{i:05d}.nc"))
+               for i, (start, end) in enumerate(windows)]
+    paths = [path for path in (future.result() for future in futures) if path]
+    if not paths:
+        raise FileNotFoundError(f"{adapter.dataset_name}: no data in any of the {len(windows)} windows.")
+    # Report the source files the windows were built from, so the result cache follows them
+    sources = set()
+    for path in paths:
+        sources.update(Path(entry[0]) for entry in (_read_sources(path) or {}).get("dependencies", []))
+    adapter.raw_data_info = sorted(sources)
+    if len(paths) == 1:
+        return xr.open_dataset(paths[0], chunks={})
+    return xr.open_mfdataset(paths, combine="nested", concat_dim=_concat_dim(paths[0]), chunks={},
+                             data_vars="minimal", coords="minimal", compat="override", combine_attrs="override")
@@ -0,0 +1,265 @@
+"""
+Streaming export of fetch_data results to NetCDF or Zarr.
+
+Standardized pieces (per file, per fetch unit or per block of time steps) are written to the
+target as they arrive instead of assembling the whole Dataset first. A background thread
+writes while the next piece is being downloaded and decoded; a one-slot queue between them
+bounds memory to a few pieces.
+
+- NetCDF: the file is created from the first piece with an unlimited append dimension,
+  zlib/shuffle compression and chunks aligned to the pieces; later pieces are appended in place.
+- Zarr: the first piece creates the store, later pieces are appended along the append dimension.
+  Pieces are dask-chunked before writing, so chunks are compressed and written in parallel.
+"""
+import logging
+import queue
+import threading
+from pathlib import Path
+import numpy as np
+import xarray as xr
+
+EXPORT_FORMATS = ("netcdf", "zarr")
+DEFAULT_COMPLEVEL = 4
+# Upper bound of a chunk along dimensions other than the append dimension
+MAX_CHUNK = 512
+_TIME_UNITS = "microseconds since 1970-01-01 00:00:00"
+_DONE = object()
+
+
+def export_format(path, fmt=None):
+    """
+    Resolve the export format from an explicit name or the target suffix.
+    Args:
+        path (str or Path): Export target.
+        fmt (str, optional): "netcdf" or "zarr".
+    Returns:
+        str: "netcdf" or "zarr".
+    Raises:
+        ValueError: If the format is unsupported or cannot be inferred.
+    """
+    if fmt is None:
+        suffix = Path(path).suffix.lower()
+        fmt = "zarr" if suffix == ".zarr" else "netcdf" if suffix in (".nc", ".nc4", ".netcdf") else None
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Cannot export to {path}: format must be one of {list(EXPORT_FORMATS)} "
+                         f"(or use a .nc/.zarr suffix).")
+    return fmt
+
+
+def _append_dim(piece):
+    if "time" in piece.dims:
+        return "time"
+    if len(piece.dims) == 1:
+        return next(iter(piece.dims))
+    raise ValueError(f"Cannot export pieces with dimensions {list(piece.dims)}: no 'time' dimension to append along.")
+
+
+def _dim_chunks(piece, append_dim, chunks):
+    sizes = {}
+    for dim, size in piece.sizes.items():
+        if dim == append_dim:
+            sizes[dim] = max(1, int(chunks.get(dim, size)))
+        else:
+            sizes[dim] = max(1, min(int(chunks.get(dim, MAX_CHUNK)), size))
+    return sizes
+
+
+class NetCDFWriter:
+    """
+    Append pieces to a NetCDF4 file along an unlimited dimension.
+    """
+    def __init__(self, path, chunks=None, complevel=DEFAULT_COMPLEVEL):
+        """
+        Args:
+            path (str or Path): Output file; overwritten.
+            chunks (dict, optional): Chunk size per dimension; defaults to the piece length along
+                the append dimension and up to MAX_CHUNK elsewhere.
+            complevel (int or None): zlib level 1-9; None or 0 disables compression.
+        """
+        self.path = Path(path)
+        self.chunks = dict(chunks or {})
+        self.complevel = complevel
+        self.append_dim = None
+        self._nc = None
+        self._appended = []
+
+    def _values(self, variable):
+        values = variable.values
+        if np.issubdtype(values.dtype, np.datetime64):
+            micros = values.astype("datetime64[us]").astype(np.int64)
+            return np.where(np.isnat(values), np.iinfo(np.int64).min, micros)
+        return values
+
+    def _create(self, piece):
+        import netCDF4
+        self.append_dim = _append_dim(piece)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._nc = netCDF4.Dataset(self.path, "w", format="NETCDF4")
+        self._nc.setncatts({k: v for k, v in piece.attrs.items() if v is not None})
+        for dim, size in piece.sizes.items():
+            self._nc.createDimension(dim, None if dim == self.append_dim else size)
+        dim_chunks = _dim_chunks(piece, self.append_dim, self.chunks)
+        for name, variable in piece.variables.items():
+            attrs = dict(variable.attrs)
+            fill_value = attrs.pop("_FillValue", None)
+            dtype = variable.dtype
+            if np.issubdtype(dtype, np.datetime64):
+                dtype, fill_value = np.dtype(np.int64), np.iinfo(np.int64).min
+                attrs.update(units=_TIME_UNITS, calendar="proleptic_gregorian")
+            elif dtype.kind not in "biuf":
+                logging.warning(f"Export skips variable '{name}' with unsupported dtype {dtype}.")
+                continue
+            elif dtype.kind == "f" and fill_value is None:
+                fill_value = np.nan
+            compress = bool(self.complevel) and variable.ndim > 0
+            nc_var = self._nc.createVariable(
+                name, dtype, variable.dims, fill_value=fill_value,
+                zlib=compress, complevel=self.complevel or 1, shuffle=compress,
+                chunksizes=[dim_chunks[dim] for dim in variable.dims] if variable.ndim else None)
+            nc_var.setncatts(attrs)
+            if self.append_dim in variable.dims:
+                self._appended.append(name)
+            else:
+                nc_var[...] = self._values(variable)
+
+    def write(self, piece: xr.Dataset):
+        """
+        Append one piece. The first piece defines the variables and static coordinates.
+        Args:
+            piece (xarray.Dataset): Loaded piece with the same variables as the first one.
+        """
+        if self._nc is None:
+            self._create(piece)
+        start = len(self._nc.dimensions[self.append_dim])
+        stop = start + piece.sizes[self.append_dim]
+        for name in self._appended:
+            variable = piece.variables[name]
+            index = tuple(slice(start, stop) if dim == self.append_dim else slice(None) for dim in variable.dims)
+            self._nc[name][index] = self._values(variable)
+
+    def close(self):
+        if self._nc is not None:
+            self._nc.close()
+            self._nc = None
+
+    def open(self) -> xr.Dataset:
+        """
+        Returns:
+            xarray.Dataset: The written file, opened lazily.
+        """
+        return xr.open_dataset(self.path, engine="netcdf4", chunks={})
+
+
+class ZarrWriter:
+    """
+    Append pieces to a Zarr store.
+    """
+    def __init__(self, path, chunks=None, encoding=None):
+        """
+        Args:
+            path (str or Path): Output store; overwritten.
+            chunks (dict, optional): Chunk size per dimension, as for NetCDFWriter.
+            encoding (dict, optional): Extra per-variable Zarr encoding (e.g. compressors).
+        """
+        self.path = str(path)
+        self.chunks = dict(chunks or {})
+        self.encoding = encoding or {}
+        self.append_dim = None
+        self._dask_chunks = None
+
+    def write(self, piece: xr.Dataset):
+        """
+        Append one piece; the first one creates the store.
+        Args:
+            piece (xarray.Dataset): Loaded piece with the same variables as the first one.
+        """
+        if self.append_dim is None:
+            self.append_dim = _append_dim(piece)
+            sizes = self._dask_chunks = _dim_chunks(piece, self.append_dim, self.chunks)
+            encoding = {}
+            for name, variable in piece.variables.items():
+                var_encoding = dict(self.encoding.get(name, {}))
+                if variable.ndim:
+                    var_encoding.setdefault("chunks", tuple(sizes[dim] for dim in variable.dims))
+                encoding[name] = var_encoding
+            piece.chunk(sizes).to_zarr(self.path, mode="w", encoding=encoding)
+        else:
+            # Static variables were written with the first piece
+            static = [name for name, variable in piece.variables.items() if self.append_dim not in variable.dims]
+            # A single writer appends sequentially, so partial trailing chunks are safe to extend
+            piece.drop_vars(static).chunk(self._dask_chunks).to_zarr(self.path, append_dim=self.append_dim, safe_chunks=False)
+
+    def close(self):
+        pass
+
+    def open(self) -> xr.Dataset:
+        """
+        Returns:
+            xarray.Dataset: The written store, opened lazily.
+        """
+        return xr.open_zarr(self.path)
+
+
+def make_writer(path, fmt=None, chunks=None, complevel=DEFAULT_COMPLEVEL, encoding=None):
+    """
+    Create the writer of an export target.
+    Args:
+        path (str or Path): Export target (.nc or .zarr, unless fmt is given).
+        fmt (str, optional): "netcdf" or "zarr".
+        chunks (dict, optional): Chunk size per dimension.
+        complevel (int, optional): zlib level for NetCDF.
+        encoding (dict, optional): Per-variable Zarr encoding.
+    Returns:
+        NetCDFWriter or ZarrWriter: Writer.
+    """
+    if export_format(path, fmt) == "zarr":
+        return ZarrWriter(path, chunks=chunks, encoding=encoding)
+    return NetCDFWriter(path, chunks=chunks, complevel=complevel)
+
+
+def export_pieces(pieces, writer):
+    """
+    Write pieces with writer, loading the next piece while the current one is written.
+    Args:
+        pieces (iterable[xarray.Dataset]): Standardized pieces.
+        writer (NetCDFWriter or ZarrWriter): Target writer.
+    Returns:
+        int: Number of pieces written.
+    Raises:
+        ValueError: If no piece was produced.
+        Exception: Any error raised while producing or writing a piece.
+    """
+    slot = queue.Queue(maxsize=1)
+    errors = []
+
+    def write_loop():
+        while True:
+            piece = slot.get()
+            if piece is _DONE:
+                return
+            if errors:
+                continue
+            try:
+                writer.write(piece)
+            except BaseException as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=write_loop, name="export-writer", daemon=True)
+    thread.start()
+    written = 0
+    try:
+        for piece in pieces:
+            if errors:
+                break
+            # Download and decode happen here, in parallel with the writer thread
+            slot.put(piece.load())
+            written += 1
+    finally:
+        slot.put(_DONE)
+        thread.join()
+        writer.close()
+    if errors:
+        raise errors[0]
+    if not written:
+        raise ValueError("Nothing to export: the request produced no data.")
+    return written
@@ -22,6 +22,7 @@ from .adapters.era5 import ERA5Adapter
 from .adapters.podaac import NOAACygnssL2Adapter, OSCARAdapter, PoDAACAdapterBase
 from .adapters.smap_rss import SMAPRSSAdapter
 from .adapters.sfmr import SFMRAdapter
+from .tabular import to_columnar
 
 # 数据集短名称常量
 DS_NOAA_CYGNSS_L2 = "NOAA_CYGNSS_L2_V1.2"
@@ -31,6 +32,9 @@ DS_OSCAR_V2_NRT = "OSCAR_V2_NRT"
 DS_SMAP_L3_RSS_FINAL = "SMAP_L3_RSS_FINAL"
 DS_SFMR_HRD = "SFMR_HRD"
 
+# 逐块导出时不会生效的选项
+_STREAMED_EXPORT_BYPASSES = ('hot_cache', 'resolution', 'max_cells', 'executor', 'result_cache')
+
 
 def fetch_data(dataset_short_name: str,
                variables: List[str],
@@ -38,7 +42,13 @@ def fetch_data(dataset_short_name: str,
                end_time: Union[str, datetime.datetime],
                bbox: List[float] = None,
                point: List[float] = None,
-               **kwargs) -> xr.Dataset:
+               dry_run: bool = False,
+               output_format: str = "xarray",
+               parquet_path: str = None,
+               table_filters: List[tuple] = None,
+               export: str = None,
+               export_options: dict = None,
+               **kwargs) -> Union[xr.Dataset, dict, "pyarrow.Table"]:
     """
     Fetch spatiotemporal data from a specified dataset and return a standardized xarray.Dataset.
 
@@ -51,10 +61,54 @@ def fetch_data(dataset_short_name: str,
         end_time (str or datetime.datetime): End time (ISO string or datetime object).
         bbox (list[float], optional): Geographic bounding box [min_lon, min_lat, max_lon, max_lat].
         point (list[float], optional): Single point [lon, lat].
-        **kwargs: Adapter-specific parameters (e.g., pressure_level, storm_name, mission_id, etc.).
+        dry_run (bool, optional): If True, return the adapter's fetch plan (fetch units, estimated
+            sizes and cache status) instead of fetching any data. See DataSourceAdapter.plan().
+        output_format (str, optional): "xarray" (default), "arrow" or "parquet". The columnar formats
+            are available for along-track datasets (SFMR, CYGNSS) and return a pyarrow.Table
+            filtered by time, bbox and table_filters; "parquet" also persists it under parquet_path,
+            partitioned by date, and reads it back with predicate pushdown. Requires pyarrow.
+        parquet_path (str, optional): Root directory of the Parquet dataset for output_format="parquet".
+        table_filters (list[tuple], optional): Extra (column, op, value) predicates for columnar
+            output, e.g. [("rain_rate", "<", 5.0)].
+        export (str, optional): Target file (.nc) or store (.zarr). Pieces are written as they are
+            fetched, with one piece in memory at a time, and the written target is returned,
+            opened lazily. See export.py.
+        export_options (dict, optional): "format" ("netcdf" or "zarr", if the suffix does not tell),
+            "chunks" (chunk size per dimension), "complevel" (NetCDF zlib level, default 4; 0 disables)
+            and "encoding" (extra per-variable Zarr encoding).
+        **kwargs: Adapter-specific parameters (e.g., pressure_level, storm_name, mission_id, etc.)
+            and common options:
+            precision (str): "float64" (default), "float32" or "packed"; see precision.py.
+            aggregate (dict): Temporal aggregation applied while data streams in, per file or
+                block of time steps, e.g. {"time": "1D", "how": "mean"} or {"time": "month"};
+                see aggregate.py.
+            parse_workers (int): Number of processes decoding granules in parallel for
+                multi-file datasets (SMAP RSS, PO.DAAC); default 1 (lazy, single process).
+            retry (dict or RetryPolicy): Download retry policy, e.g. {"max_attempts": 8, "base_delay": 2.0};
+                see transfer.py.
+            hot_cache (bool or str): Serve decoded arrays from memory-mapped .npy files, built once
+                per source file (True for ~/.spatiotemporal_data_cache/hot, or a directory); see hotcache.py.
+            result_cache (bool or str): Memoize the final result in memory and as compressed NetCDF
+                (True for ~/.spatiotemporal_data_cache/results, or a directory). Entries are invalidated
+                when a source file changes; see resultcache.py.
+            result_cache_ttl (float): Seconds after which a cached result expires; defaults to one
+                hour for near-real-time products and no expiry otherwise.
+            resolution (float): Coarsest acceptable grid spacing in degrees; gridded data is served
+                from the coarsest overview level (2x, 4x, 8x, 16x block means) that is still this fine.
+            max_cells (int): Largest acceptable number of lat x lon cells; gridded data is served from
+                the finest overview level that fits. Overviews are built once per source file; see overviews.py.
+            qc (list[tuple]): Quality-control filters evaluated per file while it is read, as
+                (variable, op, value) tuples, e.g. [("quality_flags", "bits_clear", 0b101)].
+                Along-track samples that fail are dropped, grid cells are masked; see qc.py.
+            executor (concurrent.futures.Executor): Run the request as one task per day on this
+                executor (worker processes or cluster nodes sharing the cache directory) and
+                gather the results lazily; see distributed.py.
 
     Returns:
-        xarray.Dataset: Standardized dataset containing the requested variables and coordinates.
+        xarray.Dataset: Standardized dataset containing the requested variables and coordinates
+            (read lazily from the target if export is given).
+        dict: The fetch plan, if dry_run is True.
+        pyarrow.Table: Observation table, if output_format is "arrow" or "parquet".
 
     Raises:
         ValueError: If the dataset_short_name is not supported.
@@ -72,6 +126,118 @@ def fetch_data(dataset_short_name: str,
     """
     logging.info(f"正在为 {dataset_short_name} 获取变量 {variables} 的数据")
 
+    adapter = create_adapter(dataset_short_name, variables, start_time, end_time, bbox, point, **kwargs)
+    if dry_run:
+        logging.info(f"仅生成 {dataset_short_name} 的请求计划 (dry_run)")
+        return adapter.plan()
+    if output_format != "xarray":
+        logging.info(f"以列式格式 {output_format} 输出 {dataset_short_name} 的数据")
+        return to_columnar(adapter, output_format, parquet_path, table_filters)
+    if export:
+        logging.info(f"将 {dataset_short_name} 的数据流式导出到 {export}")
+        return _export(adapter, dataset_short_name, bbox, point, export, export_options)
+    try:
+        data = fetch_result(adapter, dataset_short_name, bbox, point, kwargs.get('result_cache'))
+        logging.info(f"已成功获取并处理 {dataset_short_name} 的数据。")
+        return data
+    except Exception as e:
+        logging.error(f"获取 {dataset_short_name} 数据失败: {e}")
+        raise
+
+
+def fetch_result(adapter, dataset_short_name, bbox=None, point=None, result_cache=False) -> xr.Dataset:
+    """
+    Standardized, selected result of an adapter's request: the xarray output of fetch_data.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request, e.g. from create_adapter.
+        dataset_short_name (str): Dataset short name.
+        bbox (list[float] or None): Bounding box [min_lon, min_lat, max_lon, max_lat].
+        point (list[float] or None): Point [lon, lat].
+        result_cache (bool): Go through the on-disk result cache (resultcache.py).
+    Returns:
+        xarray.Dataset: Result; afterwards adapter.raw_data_info lists the source files read.
+    """
+    def compute():
+        return _subset_result(adapter.get_data(), dataset_short_name, adapter, bbox, point)
+    if result_cache:
+        from .resultcache import cached_result
+        return cached_result(adapter, compute)
+    return compute()
+
+
+def _subset_result(data, dataset_short_name, adapter, bbox, point):
+    """
+    Apply the point or bbox selection that the adapter does not handle itself.
+    Args:
+        data (xarray.Dataset): Standardized data (full result or one piece).
+        dataset_short_name (str): Dataset short name.
+        adapter (DataSourceAdapter): Adapter that produced the data.
+        bbox (list[float] or None): Bounding box [min_lon, min_lat, max_lon, max_lat].
+        point (list[float] or None): Point [lon, lat].
+    Returns:
+        xarray.Dataset: Selected data.
+    """
+    # 后处理：空间子集
+    if point and data and data.sizes:
+        logging.info(f"应用点选择: {point}")
+        try:
+            data = data.sel(latitude=point[1], longitude=point[0], method="nearest")
+        except Exception as e:
+            logging.warning(f"点选择时发生错误: {e}")
+    elif bbox and data and data.sizes:
+        is_bbox_handled_by_adapter = (dataset_short_name == DS_ECMWF_ERA5 or isinstance(adapter, PoDAACAdapterBase))
+        if not is_bbox_handled_by_adapter:
+            logging.info(f"应用边界框过滤器: {bbox}")
+            try:
+                lat_coord_name = 'latitude' if 'latitude' in data.coords else 'lat' if 'lat' in data.coords else None
+                lon_coord_name = 'longitude' if 'longitude' in data.coords else 'lon' if 'lon' in data.coords else None
+                if lat_coord_name and lon_coord_name:
+                    data = data.sel({lat_coord_name: slice(bbox[1], bbox[3]), lon_coord_name: slice(bbox[0], bbox[2])})
+                else:
+                    logging.warning("无法应用 bbox 过滤器，因为在数据集中找不到纬度/经度坐标。")
+            except Exception as e:
+                logging.warning(f"无法应用 bbox 过滤器: {e}")
+    return data
+
+
+def _export(adapter, dataset_short_name, bbox, point, export, export_options):
+    """
+    Stream the standardized pieces of a request into an export target.
+    Returns:
+        xarray.Dataset: The written target, opened lazily.
+    Raises:
+        ValueError: If the request also sets an option the streamed pieces would bypass.
+    """
+    from .export import make_writer, export_pieces
+    # 逐块导出直接读取标准化数据块，不经过 get_data 的分派（热缓存、概览层级、executor），也不经过结果缓存
+    bypassed = ['result_cache'] if adapter.kwargs.get('aggregate') else list(_STREAMED_EXPORT_BYPASSES)
+    conflicts = [name for name in bypassed if adapter.kwargs.get(name)]
+    if conflicts:
+        raise ValueError(f"export 不能与 {conflicts} 同时使用。")
+    options = dict(export_options or {})
+    writer = make_writer(export, fmt=options.get("format"), chunks=options.get("chunks"),
+                         complevel=options.get("complevel", 4), encoding=options.get("encoding"))
+    # 聚合结果只有输出大小，整体写出；否则按数据块边下载边写出
+    pieces = [adapter.get_data()] if adapter.kwargs.get('aggregate') else adapter._iter_standardized()
+    n_pieces = export_pieces((_subset_result(piece, dataset_short_name, adapter, bbox, point) for piece in pieces), writer)
+    logging.info(f"已将 {n_pieces} 个数据块导出到 {export}")
+    return writer.open()
+
+
+def create_adapter(dataset_short_name: str,
+                   variables: List[str],
+                   start_time: Union[str, datetime.datetime],
+                   end_time: Union[str, datetime.datetime],
+                   bbox: List[float] = None,
+                   point: List[float] = None,
+                   **kwargs):
+    """
+    Create the adapter of a dataset short name. Arguments are those of fetch_data.
+    Returns:
+        DataSourceAdapter: Adapter instance for the request.
+    Raises:
+        ValueError: If dataset_short_name is not supported.
+    """
     adapter_class = None
     adapter_kwargs = kwargs.copy()
 
@@ -92,31 +258,4 @@ def fetch_data(dataset_short_name: str,
     else:
         raise ValueError(f"不支持的 dataset_short_name: {dataset_short_name}")
 
-    adapter = adapter_class(dataset_short_name, variables, start_time, end_time, bbox, point, **adapter_kwargs)
-    try:
-        data = adapter.get_data()
-        # 后处理：空间子集
-        if point and data and data.sizes:
-            logging.info(f"应用点选择: {point}")
-            try:
-                data = data.sel(latitude=point[1], longitude=point[0], method="nearest")
-            except Exception as e:
-                logging.warning(f"点选择时发生错误: {e}")
-        elif bbox and data and data.sizes:
-            is_bbox_handled_by_adapter = (dataset_short_name == DS_ECMWF_ERA5 or isinstance(adapter, PoDAACAdapterBase))
-            if not is_bbox_handled_by_adapter:
-                logging.info(f"应用边界框过滤器: {bbox}")
-                try:
-                    lat_coord_name = 'latitude' if 'latitude' in data.coords else 'lat' if 'lat' in data.coords else None
-                    lon_coord_name = 'longitude' if 'longitude' in data.coords else 'lon' if 'lon' in data.coords else None
-                    if lat_coord_name and lon_coord_name:
-                        data = data.sel({lat_coord_name: slice(bbox[1], bbox[3]), lon_coord_name: slice(bbox[0], bbox[2])})
-                    else:
-                        logging.warning("无法应用 bbox 过滤器，因为在数据集中找不到纬度/经度坐标。")
-                except Exception as e:
-                    logging.warning(f"无法应用 bbox 过滤器: {e}")
-        logging.info(f"已成功获取并处理 {dataset_short_name} 的数据。")
-        return data
-    except Exception as e:
-        logging.error(f"获取 {dataset_short_name} 数据失败: {e}")
-        raise
+    return adapter_class(dataset_short_name, variables, start_time, end_time, bbox, point, **adapter_kwargs)
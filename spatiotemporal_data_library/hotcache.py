@@ -0,0 +1,209 @@
+"""
+Hot tier: decoded, standardized arrays stored uncompressed for memory-mapped reads.
+
+With the ``hot_cache`` option, each raw source file is parsed and standardized once and its
+variables are saved as plain .npy files next to a JSON file with dimensions, dtypes and
+attributes. Later requests open them with numpy's mmap_mode, so reading costs no
+decompression and processes share the pages through the OS page cache. The time window and
+bounding box are applied with searchsorted on the dimension coordinates and basic slicing,
+so subsets stay zero-copy views of the mapped files.
+
+Entries are keyed by dataset, variables, precision and the source file's path, size and
+mtime, so a re-downloaded file gets a new entry. Stale entries are not evicted automatically;
+delete the directory to reclaim space.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import xarray as xr
+from .config import CACHE_DIR
+from .precision import unify_packing
+
+HOT_CACHE_DIR = CACHE_DIR / "hot"
+META_FILE = "meta.json"
+# Options that do not change the standardized output of a file
+NEUTRAL_OPTIONS = ("hot_cache", "parse_workers", "retry", "export", "export_options", "executor",
+                   "result_cache", "result_cache_ttl", "resolution", "max_cells")
+
+
+def _naive_utc64(time_value):
+    timestamp = pd.Timestamp(time_value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.to_datetime64()
+
+
+def hot_cache_root(option):
+    """
+    Directory of the hot tier for a ``hot_cache`` option value.
+    Args:
+        option (bool or str or Path): True for the default location, or a directory.
+    Returns:
+        Path: Hot tier root directory.
+    """
+    return HOT_CACHE_DIR if option is True else Path(option).expanduser()
+
+
+def entry_key(adapter, path):
+    """
+    Key of the hot entry of one source file for an adapter's request.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+        path (Path): Raw source file.
+    Returns:
+        str: Hex digest.
+    """
+    stat = Path(path).stat()
+    options = {k: v for k, v in adapter.kwargs.items() if k not in NEUTRAL_OPTIONS}
+    identity = [adapter.dataset_name, sorted(adapter.raw_variables_requested), adapter.precision, options,
+                str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns]
+    return hashlib.md5(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def store_dataset(dataset: xr.Dataset, directory):
+    """
+    Save a dataset as one uncompressed .npy file per variable plus JSON metadata.
+    Dask-backed variables are written block by block into the mapped file.
+    Args:
+        dataset (xarray.Dataset): Dataset to store.
+        directory (Path): Entry directory; written atomically.
+    Raises:
+        TypeError: If a variable has a dtype that cannot be memory-mapped (e.g. strings).
+    """
+    directory = Path(directory)
+    # One temporary directory per process, so concurrent builders of the same entry do not share it
+    tmp = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    entries = []
+    try:
+        for i, (name, variable) in enumerate(dataset.variables.items()):
+            if variable.dtype.kind not in "biufcmM":
+                raise TypeError(f"Variable '{name}' of dtype {variable.dtype} cannot be memory-mapped.")
+            filename = f"{i}.npy"
+            target = np.lib.format.open_memmap(tmp / filename, mode="w+", dtype=variable.dtype, shape=variable.shape)
+            data = variable.data
+            if hasattr(data, "dask"):
+                import dask.array
+                dask.array.store(data, target, lock=True)
+            else:
+                target[...] = data
+            target.flush()
+            del target
+            entries.append({"name": name, "file": filename, "dims": list(variable.dims),
+                            "coord": name in dataset.coords, "attrs": variable.attrs})
+        meta = {"attrs": dataset.attrs, "variables": entries}
+        (tmp / META_FILE).write_text(json.dumps(meta, default=_json_default))
+        shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another process stored the same entry in between; keep its copy
+            if not (directory / META_FILE).exists():
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def load_dataset(directory) -> xr.Dataset:
+    """
+    Open a stored entry with every variable memory-mapped read-only.
+    Args:
+        directory (Path): Entry directory.
+    Returns:
+        xarray.Dataset: Dataset backed by np.memmap arrays.
+    """
+    directory = Path(directory)
+    meta = json.loads((directory / META_FILE).read_text())
+    coords, data_vars = {}, {}
+    for entry in meta["variables"]:
+        values = np.load(directory / entry["file"], mmap_mode="r")
+        variable = xr.Variable(entry["dims"], values, attrs=entry["attrs"])
+        (coords if entry["coord"] else data_vars)[entry["name"]] = variable
+    return xr.Dataset(data_vars, coords=coords, attrs=meta["attrs"])
+
+
+def _window(values, low, high, step_covering_low=False):
+    # Index range of monotonic values within [low, high], by binary search
+    if values.size == 0:
+        return slice(0, 0)
+    descending = values.size > 1 and values[0] > values[-1]
+    ordered = values[::-1] if descending else values
+    start = np.searchsorted(ordered, low, side="right" if step_covering_low else "left")
+    if step_covering_low:
+        start = max(start - 1, 0)
+    stop = np.searchsorted(ordered, high, side="right")
+    if descending:
+        start, stop = values.size - stop, values.size - start
+    return slice(int(start), int(stop))
+
+
+def subset_dataset(dataset: xr.Dataset, start_time=None, end_time=None, bbox=None) -> xr.Dataset:
+    """
+    Restrict a dataset to a time window and bounding box by slicing its dimension coordinates.
+    The time window keeps the step that covers start_time (e.g. a daily step starting at midnight).
+    Only dimension coordinates named time, latitude/lat and longitude/lon are used.
+    Args:
+        dataset (xarray.Dataset): Dataset with monotonic dimension coordinates.
+        start_time, end_time (datetime or str, optional): Time window.
+        bbox (list[float], optional): [min_lon, min_lat, max_lon, max_lat].
+    Returns:
+        xarray.Dataset: Sliced view of dataset.
+    """
+    slices = {}
+    if "time" in dataset.dims and "time" in dataset.coords and start_time is not None and end_time is not None:
+        slices["time"] = _window(dataset["time"].values, _naive_utc64(start_time), _naive_utc64(end_time),
+                                 step_covering_low=True)
+    if bbox:
+        for names, low, high in ((("latitude", "lat"), bbox[1], bbox[3]), (("longitude", "lon"), bbox[0], bbox[2])):
+            for name in names:
+                if name in dataset.dims and name in dataset.coords:
+                    slices[name] = _window(dataset[name].values, low, high)
+                    break
+    return dataset.isel(slices) if slices else dataset
+
+
+def get_hot_data(adapter, raw_data_info) -> xr.Dataset:
+    """
+    Standardized data of a request through the hot tier: parse and store each source file once,
+    then serve memory-mapped, subset views.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request; its ``hot_cache`` option selects the root.
+        raw_data_info (Path or list[Path]): Output of the adapter's _fetch_raw_data.
+    Returns:
+        xarray.Dataset: Standardized data restricted to the request's time window and bbox.
+    """
+    root = hot_cache_root(adapter.kwargs.get("hot_cache"))
+    as_list = isinstance(raw_data_info, (list, tuple))
+    files = sorted(raw_data_info) if as_list else [raw_data_info]
+    # Entries hold whole files; windows inside a file are applied to the loaded views
+    builder = copy.copy(adapter)
+    builder.within_file_window = False
+    pieces = []
+    for path in files:
+        entry = root / entry_key(adapter, path)
+        if not (entry / META_FILE).exists():
+            logging.info(f"Hot tier miss, decoding {path}")
+            parsed = builder._parse_data([path] if as_list else path)
+            store_dataset(builder._standardize_data(parsed), entry)
+        piece = subset_dataset(load_dataset(entry), adapter.start_time, adapter.end_time, adapter.bbox)
+        pieces.append(adapter._restrict_to_window(piece))
+    if len(pieces) == 1:
+        return pieces[0]
+    return xr.combine_by_coords(unify_packing(pieces), combine_attrs="override")
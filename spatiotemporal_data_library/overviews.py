@@ -0,0 +1,178 @@
+"""
+Multi-resolution overviews for coarse, wide-area queries on gridded datasets (ERA5, SMAP RSS, OSCAR).
+
+With the ``resolution`` (degrees) or ``max_cells`` option, fetch_data serves a request from
+a downsampled copy of each source file instead of the native grid. Overview levels are
+block means over OVERVIEW_FACTORS x OVERVIEW_FACTORS cells of latitude and longitude
+(``coarsen(...).mean()``), built once per source file from its standardized data and stored
+as NetCDF next to the raw cache. They are keyed like hot tier entries (dataset, variables,
+precision and the file's path, size and mtime), so a re-downloaded file gets new overviews.
+Packed variables are decoded before averaging, so levels hold float32 values and fill values
+never enter the means.
+
+Levels hold whole files. A file that the request's time window cuts below its time step (a
+SMAP RSS day, masked per pixel by observation minute) is instead masked at native resolution
+and coarsened for that request, so the window is never applied to block-averaged minutes.
+
+The level is chosen per request from the grid coordinates of the first source file, without
+decoding its data:
+
+- resolution: the coarsest level whose cell size does not exceed the requested resolution;
+- max_cells: the finest level whose lat x lon grid inside the request fits in max_cells.
+
+Along-track datasets and point requests are always served at native resolution.
+"""
+import copy
+import logging
+import os
+from pathlib import Path
+import numpy as np
+import xarray as xr
+from .config import CACHE_DIR
+from .hotcache import entry_key, subset_dataset
+from .precision import is_packed, decode_packed
+
+OVERVIEW_DIR = CACHE_DIR / "overviews"
+OVERVIEW_FACTORS = (2, 4, 8, 16)
+_LAT_NAMES = ("lat", "latitude")
+_LON_NAMES = ("lon", "longitude")
+
+
+def _grid_dims(dataset):
+    lat = next((name for name in _LAT_NAMES if name in dataset.dims and name in dataset.coords), None)
+    lon = next((name for name in _LON_NAMES if name in dataset.dims and name in dataset.coords), None)
+    return (lat, lon) if lat and lon else None
+
+
+def _cells_in(values, low, high):
+    if low is None:
+        return values.size
+    return int(np.count_nonzero((values >= low) & (values <= high)))
+
+
+def overview_factor(dataset: xr.Dataset, bbox=None, resolution=None, max_cells=None) -> int:
+    """
+    Downsampling factor of the overview level that serves a request.
+    Args:
+        dataset (xarray.Dataset): Native standardized data of one source file.
+        bbox (list[float], optional): [min_lon, min_lat, max_lon, max_lat] of the request.
+        resolution (float, optional): Coarsest acceptable cell size in degrees.
+        max_cells (int, optional): Largest acceptable number of lat x lon cells.
+    Returns:
+        int: 1 for the native grid, otherwise one of OVERVIEW_FACTORS.
+    Raises:
+        ValueError: If resolution or max_cells is not positive.
+    """
+    if resolution is not None and resolution <= 0:
+        raise ValueError("resolution must be a positive number of degrees.")
+    if max_cells is not None and max_cells < 1:
+        raise ValueError("max_cells must be at least 1.")
+    dims = _grid_dims(dataset)
+    if dims is None:
+        return 1
+    lat, lon = (dataset[name].values for name in dims)
+    factor = 1
+    if resolution is not None and lat.size > 1:
+        native = float(np.median(np.abs(np.diff(lat))))
+        factor = max([1] + [f for f in OVERVIEW_FACTORS if native * f <= resolution * (1 + 1e-6)])
+    if max_cells is not None:
+        n_lat = _cells_in(lat, bbox[1] if bbox else None, bbox[3] if bbox else None)
+        n_lon = _cells_in(lon, bbox[0] if bbox else None, bbox[2] if bbox else None)
+        fitting = [f for f in (1,) + OVERVIEW_FACTORS if (n_lat // f or 1) * (n_lon // f or 1) <= max_cells]
+        factor = max(factor, fitting[0] if fitting else OVERVIEW_FACTORS[-1])
+    return factor
+
+
+def coarsen_level(dataset: xr.Dataset, factor) -> xr.Dataset:
+    """
+    One overview level: block means over factor x factor cells of latitude and longitude.
+    Args:
+        dataset (xarray.Dataset): Native standardized data; packed variables are decoded first.
+        factor (int): One of OVERVIEW_FACTORS.
+    Returns:
+        xarray.Dataset: Coarsened data with an 'overview_factor' attribute.
+    """
+    lat, lon = _grid_dims(dataset)
+    dataset = dataset.assign({name: decode_packed(variable) for name, variable in dataset.data_vars.items()
+                              if is_packed(variable)})
+    window = {lat: min(factor, dataset.sizes[lat]), lon: min(factor, dataset.sizes[lon])}
+    level = dataset.coarsen(window, boundary="trim").mean(keep_attrs=True)
+    level.attrs["overview_factor"] = factor
+    return level
+
+
+def build_overviews(dataset: xr.Dataset, directory):
+    """
+    Write every overview level of one source file.
+    Args:
+        dataset (xarray.Dataset): Native standardized data of the file.
+        directory (Path): Entry directory; receives <factor>.nc per level.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    dataset = dataset.load()
+    for factor in OVERVIEW_FACTORS:
+        level = coarsen_level(dataset, factor)
+        encoding = {name: {"zlib": True, "complevel": 1} for name, variable in level.data_vars.items()
+                    if variable.dtype.kind == "f" and variable.ndim}
+        target = directory / f"{factor}.nc"
+        tmp = directory / f"{factor}.nc.tmp"
+        level.to_netcdf(tmp, encoding=encoding)
+        os.replace(tmp, target)
+
+
+def native_grid(path) -> xr.Dataset:
+    """
+    Latitude/longitude coordinates of a raw source file, read without decoding its data.
+    Args:
+        path (Path): Raw source file.
+    Returns:
+        xarray.Dataset: Dataset holding only the grid coordinates; empty if the file is not gridded.
+    """
+    with xr.open_dataset(path, chunks={}, decode_times=False) as dataset:
+        dims = _grid_dims(dataset)
+        if dims is None:
+            return xr.Dataset()
+        return xr.Dataset(coords={name: dataset[name].values for name in dims})
+
+
+def get_overview_data(adapter, raw_data_info) -> xr.Dataset:
+    """
+    Standardized data of a request at the overview level chosen by its ``resolution``/``max_cells`` options.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+        raw_data_info (Path or list[Path]): Output of the adapter's _fetch_raw_data.
+    Returns:
+        xarray.Dataset: Data restricted to the request's time window and bbox; coarsened data
+            carries an 'overview_factor' attribute.
+    """
+    as_list = isinstance(raw_data_info, (list, tuple))
+    files = sorted(raw_data_info) if as_list else [raw_data_info]
+    # The level is chosen from the grid coordinates alone, without parsing any data
+    factor = 1 if adapter.point else overview_factor(native_grid(files[0]), adapter.bbox, adapter.kwargs.get("resolution"),
+                                                     adapter.kwargs.get("max_cells"))
+    if factor == 1:
+        return adapter._standardize_data(adapter._parse_data(raw_data_info))
+    logging.info(f"Serving {adapter.dataset_name} from the {factor}x overview level")
+    # Overviews hold whole files, built without the window inside a file
+    builder = copy.copy(adapter)
+    builder.within_file_window = False
+    pieces = []
+    for path in files:
+        source = [path] if as_list else path
+        entry = OVERVIEW_DIR / entry_key(adapter, path)
+        if not (entry / f"{factor}.nc").exists():
+            logging.info(f"Building overviews of {path}")
+            build_overviews(builder._standardize_data(builder._parse_data(source)), entry)
+        level = xr.open_dataset(entry / f"{factor}.nc", chunks={})
+        piece = subset_dataset(level, adapter.start_time, adapter.end_time, adapter.bbox)
+        if adapter._restrict_to_window(piece) is not piece:
+            # The window cuts this file: mask it at native resolution, then coarsen it for this request
+            logging.info(f"Coarsening the window of {path} from native data")
+            native = coarsen_level(adapter._standardize_data(adapter._parse_data(source)), factor)
+            piece = subset_dataset(native, adapter.start_time, adapter.end_time, adapter.bbox)
+        pieces.append(piece)
+    if len(pieces) == 1:
+        return pieces[0]
+    # Pieces cover the full level grid inside the bbox; the outer join keeps it if files' grids differ
+    return xr.combine_by_coords(pieces, join="outer", combine_attrs="override")
@@ -0,0 +1,202 @@
+"""
+Compact-memory handling of packed NetCDF variables.
+
+ERA5 and SMAP store most variables as int16 with scale_factor/add_offset. xarray's default
+CF decoding expands them to float64, quadrupling memory. The ``precision`` option selects:
+
+- "float64": default xarray decoding (previous behaviour).
+- "float32": decode packed variables to float32 block-wise; other floats are cast to float32.
+- "packed": keep packed integer variables as stored, with their scale_factor/add_offset/_FillValue
+  attributes, and decode them (to float32) only when computing, e.g. in derived variables.
+  Files concatenated into one dataset must share a variable's packing attributes; variables
+  packed differently across files are decoded to float32 instead (see mixed_packing).
+
+In the compact modes float64 coordinates are stored as float32 and integer coordinates use
+the smallest integer type that holds them.
+"""
+import logging
+import numpy as np
+import xarray as xr
+
+PRECISIONS = ("float64", "float32", "packed")
+_PACKING_ATTRS = ("scale_factor", "add_offset")
+_FILL_ATTRS = ("_FillValue", "missing_value")
+
+
+def normalize_precision(precision):
+    """
+    Validate a precision option.
+    Args:
+        precision (str or None): One of PRECISIONS; None means "float64".
+    Returns:
+        str: The precision.
+    Raises:
+        ValueError: If precision is not supported.
+    """
+    if precision is None:
+        return "float64"
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision: {precision}. Must be one of {list(PRECISIONS)}")
+    return precision
+
+
+def open_kwargs(precision):
+    """
+    Extra keyword arguments for xr.open_dataset / xr.open_mfdataset.
+    Args:
+        precision (str): Normalized precision.
+    Returns:
+        dict: {'mask_and_scale': False} in the compact modes, so decoding is left to apply_precision.
+    """
+    if precision == "float64":
+        return {}
+    return {"mask_and_scale": False}
+
+
+def is_packed(da: xr.DataArray) -> bool:
+    """True if the variable holds integers packed with scale_factor/add_offset."""
+    return np.issubdtype(da.dtype, np.integer) and any(attr in da.attrs for attr in _PACKING_ATTRS)
+
+
+def _needs_decoding(da: xr.DataArray) -> bool:
+    return any(attr in da.attrs for attr in _PACKING_ATTRS + _FILL_ATTRS)
+
+
+def _decode_kernel(data, scale_factor, add_offset, fill_values, dtype):
+    out = data.astype(dtype)
+    for fill_value in fill_values:
+        out[data == fill_value] = np.nan
+    if scale_factor != 1:
+        out *= dtype.type(scale_factor)
+    if add_offset != 0:
+        out += dtype.type(add_offset)
+    return out
+
+
+def decode_packed(da: xr.DataArray, dtype=np.float32) -> xr.DataArray:
+    """
+    Apply _FillValue/missing_value masking and scale_factor/add_offset, block-wise and lazily on dask data.
+    Args:
+        da (xarray.DataArray): Variable opened with mask_and_scale=False.
+        dtype: Floating point output type.
+    Returns:
+        xarray.DataArray: Decoded variable without the packing attributes.
+    """
+    dtype = np.dtype(dtype)
+    attrs = {k: v for k, v in da.attrs.items() if k not in _PACKING_ATTRS + _FILL_ATTRS}
+    fill_values = [np.asarray(da.attrs[attr]).ravel().tolist() for attr in _FILL_ATTRS if attr in da.attrs]
+    fill_values = [value for values in fill_values for value in values]
+    decoded = xr.apply_ufunc(
+        _decode_kernel, da,
+        kwargs={"scale_factor": da.attrs.get("scale_factor", 1), "add_offset": da.attrs.get("add_offset", 0),
+                "fill_values": fill_values, "dtype": dtype},
+        dask="parallelized", output_dtypes=[dtype])
+    decoded.attrs = attrs
+    # Keep storage hints (chunking, compression, source) but not the packed on-disk representation
+    decoded.encoding = {k: v for k, v in da.encoding.items() if k not in ("dtype",) + _PACKING_ATTRS + _FILL_ATTRS}
+    return decoded
+
+
+def _compact_coord(values):
+    if values.dtype == np.float64:
+        return values.astype(np.float32)
+    if np.issubdtype(values.dtype, np.integer) and values.size:
+        for candidate in (np.int8, np.int16, np.int32):
+            info = np.iinfo(candidate)
+            if info.min <= values.min() and values.max() <= info.max:
+                return values.astype(candidate)
+    return values
+
+
+def _packing(da: xr.DataArray):
+    return tuple(np.asarray(da.attrs[attr]).tolist() if attr in da.attrs else None
+                 for attr in _PACKING_ATTRS + _FILL_ATTRS)
+
+
+def mixed_packing(datasets) -> set:
+    """
+    Packed variables whose scale_factor/add_offset/fill attributes differ between datasets.
+    Concatenating them would keep only the first dataset's attributes and mis-scale the others.
+    Args:
+        datasets (list[xarray.Dataset]): Datasets opened with open_kwargs("packed"), e.g. one per file.
+    Returns:
+        set[str]: Names of the variables that cannot stay packed.
+    """
+    packings = {}
+    for ds in datasets:
+        for name, da in ds.data_vars.items():
+            if is_packed(da):
+                packings.setdefault(name, set()).add(_packing(da))
+    mixed = {name for name, seen in packings.items() if len(seen) > 1}
+    if mixed:
+        logging.info(f"Packing of {sorted(mixed)} differs between files, decoding to float32.")
+    return mixed
+
+
+def mixed_packing_in_files(paths, **open_options) -> set:
+    """
+    mixed_packing of a list of files, reading only their metadata.
+    Args:
+        paths (list[Path]): NetCDF files to be opened as one dataset.
+        **open_options: Extra arguments for xr.open_dataset, e.g. engine.
+    Returns:
+        set[str]: Names of the variables that cannot stay packed.
+    """
+    datasets = [xr.open_dataset(path, decode_times=False, **open_kwargs("packed"), **open_options) for path in paths]
+    try:
+        return mixed_packing(datasets)
+    finally:
+        for ds in datasets:
+            ds.close()
+
+
+def unify_packing(datasets) -> list:
+    """
+    Decode, in every dataset, the packed variables that mixed_packing reports, so the datasets
+    can be concatenated.
+    Args:
+        datasets (list[xarray.Dataset]): Datasets in the "packed" precision.
+    Returns:
+        list[xarray.Dataset]: Datasets with consistent packing.
+    """
+    mixed = mixed_packing(datasets)
+    if not mixed:
+        return list(datasets)
+    return [ds.assign({name: decode_packed(ds[name]) for name in mixed if name in ds.data_vars})
+            for ds in datasets]
+
+
+def apply_precision(ds: xr.Dataset, precision, decode=()) -> xr.Dataset:
+    """
+    Convert a dataset opened with open_kwargs(precision) to the requested precision.
+    Args:
+        ds (xarray.Dataset): Dataset to convert.
+        precision (str): Normalized precision.
+        decode (set[str], optional): Variables to decode even with precision "packed", e.g. from mixed_packing.
+    Returns:
+        xarray.Dataset: Converted dataset.
+    """
+    if precision == "float64":
+        return ds
+    ds = ds.copy()
+    for name, da in list(ds.data_vars.items()):
+        if precision == "packed" and is_packed(da) and name not in decode:
+            continue
+        if _needs_decoding(da):
+            ds[name] = decode_packed(da, np.float32)
+        elif da.dtype == np.float64:
+            ds[name] = da.astype(np.float32)
+    coords = {}
+    for name, coord in ds.coords.items():
+        if coord.ndim != 1:
+            continue
+        if _needs_decoding(coord):
+            decoded = decode_packed(coord.variable.to_base_variable(), np.float32)
+            coords[name] = (coord.dims, np.asarray(decoded.values), decoded.attrs)
+            continue
+        compact = _compact_coord(coord.values)
+        if compact.dtype != coord.dtype:
+            coords[name] = (coord.dims, compact, coord.attrs)
+    if coords:
+        ds = ds.assign_coords(coords)
+    return ds
@@ -0,0 +1,168 @@
+"""
+Declarative quality-control filters applied while files are read.
+
+The ``qc`` option of fetch_data is a list of (variable, op, value) predicates, all of which
+must hold for a sample to be kept:
+
+    qc=[("quality_flags", "bits_clear", 0b101), ("surface_wind_speed", "<", 40.0)]
+
+Operators: ==, !=, <, <=, >, >=, in, not in, and for integer flag words bits_clear (none
+of the bits in value are set) and bits_set (all of them are set). Variables may be given by
+their native name in the file or by their standardized name; packed variables are compared
+in physical units.
+
+Predicates are evaluated per file with numpy, before files are concatenated:
+
+- along-track data (one sample dimension, e.g. CYGNSS, SFMR): rejected samples are dropped;
+- gridded data (e.g. SMAP land/ice/rain masks): rejected cells are set to NaN.
+"""
+import logging
+import numpy as np
+import xarray as xr
+from .precision import is_packed, decode_packed
+
+COMPARISONS = {
+    "==": np.equal, "=": np.equal, "!=": np.not_equal,
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+OPERATORS = tuple(COMPARISONS) + ("in", "not in", "bits_clear", "bits_set")
+
+
+def normalize_qc(qc):
+    """
+    Validate the ``qc`` option.
+    Args:
+        qc (list[tuple] or None): (variable, op, value) predicates.
+    Returns:
+        list[tuple]: Predicates as tuples; empty if qc is None.
+    Raises:
+        ValueError: If a predicate is malformed or uses an unknown operator.
+    """
+    predicates = []
+    for predicate in qc or []:
+        if len(predicate) != 3:
+            raise ValueError(f"QC filters must be (variable, op, value) tuples, got {predicate!r}.")
+        name, op, value = predicate
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported QC operator '{op}'; use one of {list(OPERATORS)}.")
+        if op in ("bits_clear", "bits_set") and not isinstance(value, (int, np.integer)):
+            raise ValueError(f"QC operator '{op}' needs an integer bit mask, got {value!r}.")
+        predicates.append((name, op, value))
+    return predicates
+
+
+def evaluate(values, op, value):
+    """
+    Evaluate one predicate on an array.
+    Args:
+        values (numpy.ndarray): Variable values.
+        op (str): Operator from OPERATORS.
+        value: Comparison value, collection (in / not in) or integer bit mask.
+    Returns:
+        numpy.ndarray: Boolean array, True where the sample passes. NaN never passes.
+    """
+    values = np.asarray(values)
+    if op == "in":
+        return np.isin(values, list(value))
+    if op == "not in":
+        return ~np.isin(values, list(value)) & ~_isnan(values)
+    if op in ("bits_clear", "bits_set"):
+        # Flag words decoded to float carry NaN for missing samples; cast around them, then reject them
+        missing = _isnan(values)
+        flags = np.where(missing, 0, values).astype(np.int64) & int(value)
+        return (flags == (0 if op == "bits_clear" else int(value))) & ~missing
+    return COMPARISONS[op](values, value)
+
+
+def _isnan(values):
+    return np.isnan(values) if values.dtype.kind == "f" else np.zeros(values.shape, dtype=bool)
+
+
+def _resolve(name, available, name_map):
+    if name in available:
+        return name
+    mapped = (name_map or {}).get(name)
+    if mapped in available:
+        return mapped
+    logging.warning(f"QC variable '{name}' not found, ignoring its filter.")
+    return None
+
+
+def qc_mask(dataset: xr.Dataset, qc, name_map=None):
+    """
+    Combined pass mask of all predicates on one file.
+    Args:
+        dataset (xarray.Dataset): Dataset of one file.
+        qc (list[tuple]): Predicates from normalize_qc.
+        name_map (dict, optional): Standardized name -> native name.
+    Returns:
+        xarray.DataArray or None: Boolean mask broadcast over the variables used, or None if no
+            predicate applies.
+    """
+    mask = None
+    for name, op, value in qc:
+        variable = _resolve(name, dataset.variables, name_map)
+        if variable is None:
+            continue
+        data = dataset[variable]
+        if is_packed(data):
+            data = decode_packed(data)
+        condition = xr.DataArray(evaluate(data.values, op, value), dims=data.dims)
+        mask = condition if mask is None else mask & condition
+    return mask
+
+
+def apply_qc(dataset: xr.Dataset, qc, name_map=None) -> xr.Dataset:
+    """
+    Apply QC predicates to one file: drop rejected samples of along-track data, mask rejected grid cells.
+    Args:
+        dataset (xarray.Dataset): Dataset of one file.
+        qc (list[tuple]): Predicates from normalize_qc.
+        name_map (dict, optional): Standardized name -> native name.
+    Returns:
+        xarray.Dataset: Filtered dataset.
+    """
+    if not qc:
+        return dataset
+    mask = qc_mask(dataset, qc, name_map)
+    if mask is None:
+        return dataset
+    if mask.ndim == 1:
+        keep = np.flatnonzero(mask.values)
+        logging.debug(f"QC keeps {keep.size} of {mask.size} samples.")
+        return dataset.isel({mask.dims[0]: keep})
+    masked = {name: mask_variable(variable, mask) for name, variable in dataset.data_vars.items()
+              if set(mask.dims) <= set(variable.dims)}
+    return dataset.assign(masked)
+
+
+def mask_variable(variable, mask):
+    """
+    Mask rejected cells of a variable: NaN for floats, the fill value for packed integers.
+    Args:
+        variable (xarray.DataArray): Variable to mask.
+        mask (xarray.DataArray): Boolean mask, True where cells are kept.
+    Returns:
+        xarray.DataArray: Masked variable.
+    """
+    if is_packed(variable) and "_FillValue" in variable.attrs:
+        return variable.where(mask, variable.attrs["_FillValue"])
+    return variable.where(mask)
+
+
+def qc_frame_mask(df, qc, name_map=None):
+    """
+    Pass mask of QC predicates on a table.
+    Args:
+        df (pandas.DataFrame): Table with one row per sample.
+        qc (list[tuple]): Predicates from normalize_qc.
+        name_map (dict, optional): Alternative name -> column name.
+    Returns:
+        numpy.ndarray: Boolean row mask.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for name, op, value in qc:
+        column = _resolve(name, df.columns, name_map)
+        if column is not None:
+            mask &= evaluate(df[column].to_numpy(), op, value)
+    return mask
@@ -0,0 +1,244 @@
+"""
+Memoized fetch_data results.
+
+With the ``result_cache`` option, the final output of fetch_data (after parsing,
+concatenation, standardization, derived variables and point/bbox selection) is stored in
+memory and as a compressed NetCDF file, keyed on the normalized request: dataset, variables,
+UTC time range, bbox or point and the options that change the result. Identical requests are
+then answered without touching the source files.
+
+An entry records the source files it was built from (path, size and mtime of the files the
+fetch actually read) and is discarded when any of them changes or disappears. Hits only stat
+those files; other files in the same cache directory do not affect the entry.
+Near-real-time products (OSCAR NRT) also expire after a TTL, DEFAULT_NRT_TTL seconds unless
+``result_cache_ttl`` says otherwise, because new data can be published for a period that is
+already cached.
+"""
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+import pandas as pd
+import xarray as xr
+from .precision import open_kwargs
+from .config import CACHE_DIR
+
+RESULT_CACHE_DIR = CACHE_DIR / "results"
+DEFAULT_NRT_TTL = 3600
+MEMORY_CACHE_BYTES = 512 * 1024 ** 2
+# Options that do not change the result of a request
+NEUTRAL_OPTIONS = ("result_cache", "result_cache_ttl", "hot_cache", "parse_workers", "retry", "executor")
+
+_memory = collections.OrderedDict()
+_memory_bytes = 0
+_memory_lock = threading.Lock()
+
+
+def _utc_iso(time_value):
+    timestamp = pd.Timestamp(time_value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp.isoformat()
+
+
+def result_cache_root(option):
+    """
+    Directory of the result cache for a ``result_cache`` option value.
+    Args:
+        option (bool or str or Path): True for the default location, or a directory.
+    Returns:
+        Path: Result cache directory.
+    """
+    return RESULT_CACHE_DIR if option is True else Path(option).expanduser()
+
+
+def result_key(adapter) -> str:
+    """
+    Key of a request's result.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+    Returns:
+        str: Hex digest.
+    """
+    options = {k: v for k, v in adapter.kwargs.items() if k not in NEUTRAL_OPTIONS}
+    identity = {
+        "dataset": adapter.dataset_name,
+        "variables": sorted(adapter.raw_variables_requested),
+        "start": _utc_iso(adapter.start_time),
+        "end": _utc_iso(adapter.end_time),
+        "bbox": [float(v) for v in adapter.bbox] if adapter.bbox else None,
+        "point": [float(v) for v in adapter.point] if adapter.point else None,
+        "options": options,
+    }
+    return hashlib.md5(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def file_states(paths) -> list:
+    """
+    Size and mtime of files.
+    Args:
+        paths (iterable[str or Path]): Files.
+    Returns:
+        list[list]: Sorted [path, size, mtime_ns] entries; size and mtime are None for missing files.
+    """
+    entries = []
+    for path in sorted({str(path) for path in paths}):
+        try:
+            stat = os.stat(path)
+            entries.append([path, stat.st_size, stat.st_mtime_ns])
+        except FileNotFoundError:
+            entries.append([path, None, None])
+    return entries
+
+
+def dependencies(adapter) -> list:
+    """
+    Source files a request actually read (the adapter's raw_data_info after get_data), with their size and mtime.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request, after fetching.
+    Returns:
+        list[list]: Sorted [path, size, mtime_ns] entries.
+    """
+    sources = adapter.raw_data_info
+    if not sources:
+        return []
+    return file_states(sources if isinstance(sources, (list, tuple)) else [sources])
+
+
+def result_ttl(adapter):
+    """
+    Lifetime of a request's cached result.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request.
+    Returns:
+        float or None: ``result_cache_ttl``, DEFAULT_NRT_TTL for near-real-time products, or None (no expiry).
+    """
+    ttl = adapter.kwargs.get("result_cache_ttl")
+    if ttl is None and adapter.near_real_time:
+        ttl = DEFAULT_NRT_TTL
+    return ttl
+
+
+def entry_meta(adapter) -> dict:
+    """
+    Metadata of a result computed now: creation time and dependencies.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request, after fetching.
+    Returns:
+        dict: {"created": <epoch seconds>, "dependencies": <dependencies(adapter)>}.
+    """
+    return {"created": time.time(), "dependencies": dependencies(adapter)}
+
+
+def is_current(meta, ttl) -> bool:
+    """
+    Whether a cached result is still valid: younger than ttl and built from unchanged source files.
+    Args:
+        meta (dict): Output of entry_meta when the result was stored.
+        ttl (float or None): Lifetime in seconds; None never expires.
+    Returns:
+        bool: True if the result can be served.
+    """
+    if ttl is not None and time.time() - meta["created"] > ttl:
+        return False
+    return meta["dependencies"] == file_states(entry[0] for entry in meta["dependencies"])
+
+
+def _valid(meta, adapter):
+    # The TTL of the current request applies, so callers can ask for fresher results
+    return is_current(meta, result_ttl(adapter))
+
+
+def _remember(key, meta, dataset):
+    global _memory_bytes
+    size = dataset.nbytes
+    with _memory_lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1].nbytes
+        if size > MEMORY_CACHE_BYTES:
+            return
+        _memory[key] = (meta, dataset)
+        _memory_bytes += size
+        while _memory_bytes > MEMORY_CACHE_BYTES:
+            _, (_, evicted) = _memory.popitem(last=False)
+            _memory_bytes -= evicted.nbytes
+
+
+def _forget(key):
+    global _memory_bytes
+    with _memory_lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1].nbytes
+
+
+def clear_memory():
+    """Drop every in-memory entry (disk entries are kept)."""
+    global _memory_bytes
+    with _memory_lock:
+        _memory.clear()
+        _memory_bytes = 0
+
+
+def _write(directory, key, meta, dataset):
+    directory.mkdir(parents=True, exist_ok=True)
+    target, tmp = directory / f"{key}.nc", directory / f"{key}.nc.tmp"
+    encoding = {name: {"zlib": True, "complevel": 4} for name, variable in dataset.data_vars.items()
+                if variable.dtype.kind in "biuf" and variable.ndim}
+    # No _FillValue is added to floats, so packed entries (opened without masking) read back unchanged
+    for name, variable in dataset.variables.items():
+        if variable.dtype.kind == "f":
+            encoding.setdefault(name, {})["_FillValue"] = None
+    try:
+        dataset.to_netcdf(tmp, encoding=encoding)
+    except Exception as e:
+        logging.warning(f"Result cache cannot store {key} on disk: {e}")
+        tmp.unlink(missing_ok=True)
+        return
+    os.replace(tmp, target)
+    meta_tmp = directory / f"{key}.json.tmp"
+    meta_tmp.write_text(json.dumps(meta))
+    os.replace(meta_tmp, directory / f"{key}.json")
+
+
+def _read(directory, key, precision):
+    meta_path, data_path = directory / f"{key}.json", directory / f"{key}.nc"
+    if not (meta_path.exists() and data_path.exists()):
+        return None, None
+    meta = json.loads(meta_path.read_text())
+    # Packed results stay packed, as on a miss
+    with xr.open_dataset(data_path, **open_kwargs(precision)) as dataset:
+        return meta, dataset.load()
+
+
+def cached_result(adapter, compute) -> xr.Dataset:
+    """
+    Result of a request from the memory or disk tier, or computed and stored.
+    Args:
+        adapter (DataSourceAdapter): Adapter of the request; its ``result_cache`` option selects the directory.
+        compute (callable): Produces the final result on a miss.
+    Returns:
+        xarray.Dataset: Result; a private copy, so callers may modify it.
+    """
+    directory = result_cache_root(adapter.kwargs["result_cache"])
+    key = result_key(adapter)
+    with _memory_lock:
+        meta, dataset = _memory.get(key, (None, None))
+    if meta is not None and _valid(meta, adapter):
+        logging.info(f"Result cache hit (memory): {key}")
+        return dataset.copy(deep=True)
+    meta, dataset = _read(directory, key, adapter.precision)
+    if meta is not None and _valid(meta, adapter):
+        logging.info(f"Result cache hit (disk): {key}")
+        _remember(key, meta, dataset)
+        return dataset.copy(deep=True)
+    _forget(key)
+    dataset = compute().load()
+    # Dependencies are listed after the fetch, when the source files exist
+    meta = entry_meta(adapter)
+    _write(directory, key, meta, dataset)
+    _remember(key, meta, dataset)
+    return dataset.copy(deep=True)
@@ -0,0 +1,352 @@
+"""
+Local data server: one long-running process that runs fetch_data for many clients on a node.
+
+Clients POST a JSON request to /fetch over HTTP or a Unix socket and receive the result in
+the binary format of wire.py. Identical requests that arrive while one is being fetched wait
+for that fetch instead of starting their own, and recent results are kept in an in-memory
+LRU cache bounded by size, so notebooks and services on the same node share downloads,
+file opens and memory. Cached results follow the rules of resultcache.py: they are dropped
+when one of the source files they were read from changes, and results of near-real-time
+products expire after resultcache.DEFAULT_NRT_TTL seconds.
+
+Run with:
+    python -m spatiotemporal_data_library.server --port 8765
+    python -m spatiotemporal_data_library.server --unix-socket /tmp/stdl.sock
+
+and use DataClient, whose fetch_data mirrors spatiotemporal_data_library.fetch_data:
+    >>> client = DataClient("http://127.0.0.1:8765")
+    >>> ds = client.fetch_data("ECMWF_ERA5", ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-01T03:00:00Z")
+"""
+import argparse
+import collections
+import datetime
+import http.client
+import http.server
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future
+import xarray as xr
+from .fetch import create_adapter, fetch_result
+from .resultcache import entry_meta, is_current, result_ttl
+from .wire import encode_dataset, decode_dataset
+
+CONTENT_TYPE = "application/x-stdl-dataset"
+# Request keys clients may send. Options that write files or choose where (export, parquet_path,
+# hot_cache, result_cache, ...) or that control execution on the server are not accepted.
+REQUEST_KEYS = ("dataset_short_name", "variables", "start_time", "end_time", "bbox", "point",
+                "precision", "qc", "aggregate", "resolution", "max_cells", "pressure_level",
+                "oscar_product_type", "storm_name", "mission_id", "year", "sfmr_file_type")
+
+
+def _request_key(request):
+    return json.dumps(request, sort_keys=True, default=str)
+
+
+def validate_request(request):
+    """
+    Check a client request before it reaches fetch_data.
+    Args:
+        request (dict): Keyword arguments of fetch_data sent by a client.
+    Raises:
+        ValueError: If the request is not a JSON object, has keys outside REQUEST_KEYS, or a
+            string option that looks like a path.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("A fetch request must be a JSON object of fetch_data arguments.")
+    rejected = sorted(set(request) - set(REQUEST_KEYS))
+    if rejected:
+        raise ValueError(f"The data server does not accept {rejected}; allowed keys are {list(REQUEST_KEYS)}.")
+    for name in ("storm_name", "mission_id", "year", "sfmr_file_type", "oscar_product_type"):
+        value = request.get(name)
+        if isinstance(value, str) and ("/" in value or "\\" in value or ".." in value):
+            raise ValueError(f"Invalid value for '{name}': {value!r}.")
+
+
+def _normalize_time(value):
+    return value.isoformat() if isinstance(value, (datetime.datetime, datetime.date)) else value
+
+
+class DataServer:
+    """
+    Serve fetch_data over HTTP (host/port) or a Unix socket, with request coalescing and an LRU cache.
+    """
+    def __init__(self, host="127.0.0.1", port=8765, unix_socket=None, cache_bytes=2 * 1024 ** 3):
+        """
+        Args:
+            host (str): Interface to bind for HTTP.
+            port (int): TCP port for HTTP; 0 picks a free port.
+            unix_socket (str, optional): Path of a Unix socket to serve on instead of TCP.
+            cache_bytes (int): Maximum total size of cached encoded results.
+        """
+        self.cache_bytes = cache_bytes
+        self.unix_socket = unix_socket
+        self._cache = collections.OrderedDict()
+        self._cached_bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "fetches": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            self.httpd = _ThreadingUnixHTTPServer(unix_socket, _RequestHandler)
+        else:
+            self.httpd = http.server.ThreadingHTTPServer((host, port), _RequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.data_server = self
+        self._thread = None
+
+    @property
+    def url(self):
+        """Address clients pass to DataClient: an http:// URL or unix:// plus the socket path."""
+        if self.unix_socket:
+            return f"unix://{self.unix_socket}"
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fetch(self, request: dict) -> bytearray:
+        """
+        Return the encoded result of a fetch_data request, from the cache, from an identical
+        in-flight request, or by running the request.
+        Args:
+            request (dict): Keyword arguments of fetch_data, limited to REQUEST_KEYS.
+        Returns:
+            bytearray: Result encoded with wire.encode_dataset; shared between callers, do not modify.
+        Raises:
+            ValueError: If the request is rejected by validate_request.
+        """
+        validate_request(request)
+        key = _request_key(request)
+        with self._lock:
+            self.stats["requests"] += 1
+            if key in self._cache:
+                payload, meta, ttl = self._cache[key]
+                if is_current(meta, ttl):
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    return payload
+                self._evict(key)
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.stats["fetches"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            return future.result()
+        try:
+            adapter = create_adapter(**request)
+            dataset = fetch_result(adapter, request["dataset_short_name"], request.get("bbox"), request.get("point"))
+            payload = encode_dataset(dataset)
+            meta, ttl = entry_meta(adapter), result_ttl(adapter)
+        except BaseException as e:
+            with self._lock:
+                self.stats["errors"] += 1
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(key, payload, meta, ttl)
+            del self._inflight[key]
+        future.set_result(payload)
+        return payload
+
+    def _store(self, key, payload, meta, ttl):
+        if len(payload) > self.cache_bytes:
+            return
+        self._cache[key] = (payload, meta, ttl)
+        self._cached_bytes += len(payload)
+        while self._cached_bytes > self.cache_bytes:
+            _, (evicted, _, _) = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    def _evict(self, key):
+        payload, _, _ = self._cache.pop(key)
+        self._cached_bytes -= len(payload)
+
+    def status(self) -> dict:
+        """
+        Returns:
+            dict: Request counters and cache occupancy.
+        """
+        with self._lock:
+            return dict(self.stats, cached_results=len(self._cache), cached_bytes=self._cached_bytes,
+                        inflight=len(self._inflight))
+
+    def serve_forever(self):
+        """Serve requests until shutdown() is called."""
+        logging.info(f"Data server listening on {self.url}")
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serve requests from a background thread. Returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self):
+        """Stop serving and release the socket."""
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread = None
+        self.httpd.server_close()
+        if self.unix_socket and os.path.exists(self.unix_socket):
+            os.unlink(self.unix_socket)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, error):
+        body = json.dumps({"error": str(error), "type": type(error).__name__}).encode("utf-8")
+        self._send(status, body, "application/json")
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send(200, json.dumps(self.server.data_server.status()).encode("utf-8"), "application/json")
+        else:
+            self._send_error(404, LookupError(f"Unknown path: {self.path}"))
+
+    def do_POST(self):
+        if self.path != "/fetch":
+            self._send_error(404, LookupError(f"Unknown path: {self.path}"))
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            payload = self.server.data_server.fetch(request)
+        except FileNotFoundError as e:
+            self._send_error(404, e)
+        except (ValueError, TypeError) as e:
+            self._send_error(400, e)
+        except Exception as e:
+            logging.error(f"Data server request failed: {e}")
+            self._send_error(500, e)
+        else:
+            self._send(200, payload, CONTENT_TYPE)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_socket = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+class DataClient:
+    """
+    Client of DataServer; fetch_data has the same signature as spatiotemporal_data_library.fetch_data.
+    """
+    def __init__(self, url="http://127.0.0.1:8765", timeout=None):
+        """
+        Args:
+            url (str): Server address, "http://host:port" or "unix:///path/to/socket".
+            timeout (float, optional): Socket timeout in seconds; None waits indefinitely.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.url.startswith("unix://"):
+            return _UnixHTTPConnection(self.url[len("unix://"):], timeout=self.timeout)
+        host_port = self.url.split("://", 1)[-1].rstrip("/")
+        return http.client.HTTPConnection(host_port, timeout=self.timeout)
+
+    def _call(self, method, path, body=None):
+        connection = self._connection()
+        try:
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+        if response.status == 200:
+            return response, data
+        try:
+            message = json.loads(data)["error"]
+        except (ValueError, KeyError):
+            message = data.decode("utf-8", "replace")
+        if response.status == 404:
+            raise FileNotFoundError(message)
+        if response.status == 400:
+            raise ValueError(message)
+        raise RuntimeError(f"Data server error ({response.status}): {message}")
+
+    def fetch_data(self, dataset_short_name, variables, start_time, end_time, bbox=None, point=None, **kwargs) -> xr.Dataset:
+        """
+        Fetch data through the server. Arguments are those of fetch_data and must be JSON-serializable
+        (datetimes are sent as ISO strings).
+        Returns:
+            xarray.Dataset: Result, backed by read-only arrays.
+        Raises:
+            ValueError: If the server rejects the request.
+            FileNotFoundError: If the data could not be found.
+            RuntimeError: For other server-side failures.
+        """
+        request = dict(kwargs, dataset_short_name=dataset_short_name, variables=list(variables),
+                       start_time=_normalize_time(start_time), end_time=_normalize_time(end_time),
+                       bbox=bbox, point=point)
+        _, data = self._call("POST", "/fetch", json.dumps(request).encode("utf-8"))
+        return decode_dataset(data)
+
+    def status(self) -> dict:
+        """
+        Returns:
+            dict: Server request counters and cache occupancy.
+        """
+        _, data = self._call("GET", "/status")
+        return json.loads(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fetch_data to local clients.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="serve on this Unix socket path instead of TCP")
+    parser.add_argument("--cache-mb", type=int, default=2048, help="size of the in-memory result cache")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    server = DataServer(args.host, args.port, args.unix_socket, cache_bytes=args.cache_mb * 1024 ** 2)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
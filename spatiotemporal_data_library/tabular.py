@@ -0,0 +1,212 @@
+"""
+Columnar (Arrow/Parquet) output for along-track observation datasets (SFMR, CYGNSS).
+
+Point observations are returned as pyarrow.Table instead of xarray.Dataset, and can be
+persisted as date-partitioned Parquet and read back with predicate pushdown on time,
+bounding box and quality fields. Requires the optional ``pyarrow`` dependency.
+"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+import pandas as pd
+
+OUTPUT_FORMATS = ("xarray", "arrow", "parquet")
+PARTITION_COLUMN = "date"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Columnar output requires pyarrow. Install it with: pip install pyarrow")
+    return pyarrow
+
+
+def _naive_utc(time_value):
+    timestamp = pd.Timestamp(time_value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return timestamp
+
+
+def table_from_dataframe(df):
+    """
+    Build a pyarrow.Table from a DataFrame without going through pandas' index handling.
+    Numeric columns are wrapped zero-copy; NaN stays NaN rather than becoming null.
+    Args:
+        df (pandas.DataFrame): Table with a flat index.
+    Returns:
+        pyarrow.Table: Columnar table.
+    """
+    pa = _require_pyarrow()
+    return pa.table({str(name): pa.array(df[name].to_numpy()) for name in df.columns})
+
+
+def build_filters(start_time=None, end_time=None, bbox=None, filters=None):
+    """
+    Build a conjunctive filter list on the standardized 'time', 'latitude' and 'longitude' columns.
+    Args:
+        start_time (datetime.datetime, optional): Inclusive lower time bound.
+        end_time (datetime.datetime, optional): Inclusive upper time bound.
+        bbox (list[float], optional): [min_lon, min_lat, max_lon, max_lat].
+        filters (list[tuple], optional): Extra (column, op, value) predicates, e.g. quality fields.
+    Returns:
+        list[tuple]: (column, op, value) predicates in pyarrow's filter syntax.
+    """
+    predicates = []
+    if start_time is not None:
+        predicates.append(("time", ">=", _naive_utc(start_time)))
+    if end_time is not None:
+        predicates.append(("time", "<=", _naive_utc(end_time)))
+    if bbox:
+        predicates.extend([
+            ("longitude", ">=", bbox[0]), ("latitude", ">=", bbox[1]),
+            ("longitude", "<=", bbox[2]), ("latitude", "<=", bbox[3]),
+        ])
+    if filters:
+        predicates.extend(tuple(f) for f in filters)
+    return predicates
+
+
+def filter_table(table, predicates):
+    """
+    Apply (column, op, value) predicates to an in-memory table, vectorized with pyarrow.compute.
+    Predicates on columns missing from the table are ignored.
+    Args:
+        table (pyarrow.Table): Input table.
+        predicates (list[tuple]): Predicates from build_filters.
+    Returns:
+        pyarrow.Table: Filtered table.
+    """
+    _require_pyarrow()
+    import pyarrow.compute as pc
+    ops = {
+        "==": pc.equal, "=": pc.equal, "!=": pc.not_equal,
+        "<": pc.less, "<=": pc.less_equal, ">": pc.greater, ">=": pc.greater_equal,
+    }
+    mask = None
+    for column, op, value in predicates:
+        if column not in table.column_names:
+            logging.warning(f"Filter column '{column}' not in table, ignoring.")
+            continue
+        if op == "in":
+            condition = pc.is_in(table[column], value_set=_value_set(value))
+        elif op == "not in":
+            condition = pc.invert(pc.is_in(table[column], value_set=_value_set(value)))
+        elif op in ops:
+            condition = ops[op](table[column], value)
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if mask is None:
+        return table
+    return table.filter(mask)
+
+
+def _value_set(values):
+    pa = _require_pyarrow()
+    return pa.array(list(values))
+
+
+def write_parquet(table, path, basename):
+    """
+    Persist a table as Parquet partitioned by observation date (``date=YYYY-MM-DD``).
+    Files written earlier under the same basename are replaced, so rewriting the data of a
+    source file never leaves duplicate rows behind.
+    Args:
+        table (pyarrow.Table): Table with a 'time' column.
+        path (str or Path): Root directory of the Parquet dataset.
+        basename (str): Stem for the data files of this write.
+    Returns:
+        list[str]: Paths of the files written.
+    """
+    _require_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    for stale in Path(path).glob(f"{PARTITION_COLUMN}=*/{basename}-*.parquet"):
+        stale.unlink()
+    if PARTITION_COLUMN not in table.column_names:
+        table = table.append_column(PARTITION_COLUMN, pc.strftime(table["time"], format="%Y-%m-%d"))
+    written = []
+    pq.write_to_dataset(table, root_path=str(path), partition_cols=[PARTITION_COLUMN],
+                        basename_template=f"{basename}-{{i}}.parquet",
+                        existing_data_behavior="overwrite_or_ignore",
+                        file_visitor=lambda written_file: written.append(written_file.path))
+    return written
+
+
+def read_parquet(path, start_time=None, end_time=None, bbox=None, filters=None, columns=None, files=None):
+    """
+    Read a Parquet dataset written by write_parquet, pushing time, bbox and extra predicates
+    down to partition pruning and row-group statistics.
+    Args:
+        path (str or Path): Root directory of the Parquet dataset.
+        start_time (datetime.datetime, optional): Inclusive lower time bound.
+        end_time (datetime.datetime, optional): Inclusive upper time bound.
+        bbox (list[float], optional): [min_lon, min_lat, max_lon, max_lat].
+        filters (list[tuple], optional): Extra (column, op, value) predicates.
+        columns (list[str], optional): Columns to read.
+        files (list[str], optional): Read only these data files of the dataset, e.g. the output of write_parquet.
+    Returns:
+        pyarrow.Table: Matching rows.
+    """
+    _require_pyarrow()
+    import pyarrow.dataset as pds
+    import pyarrow.parquet as pq
+    predicates = build_filters(start_time, end_time, bbox, filters)
+    if start_time is not None:
+        predicates.append((PARTITION_COLUMN, ">=", _naive_utc(start_time).strftime("%Y-%m-%d")))
+    if end_time is not None:
+        predicates.append((PARTITION_COLUMN, "<=", _naive_utc(end_time).strftime("%Y-%m-%d")))
+    if files is None:
+        return pq.read_table(str(path), columns=columns, filters=predicates or None,
+                             partitioning="hive")
+    dataset = pds.dataset(list(files), format="parquet",
+                          partitioning=pds.partitioning(flavor="hive"), partition_base_dir=str(path))
+    return dataset.to_table(columns=columns,
+                            filter=pq.filters_to_expression(predicates) if predicates else None)
+
+
+def to_columnar(adapter, output_format, parquet_path=None, filters=None):
+    """
+    Fetch an adapter's data as a table and return it in the requested columnar format.
+    Args:
+        adapter (DataSourceAdapter): Adapter with SUPPORTS_TABLE set.
+        output_format (str): 'arrow' or 'parquet'.
+        parquet_path (str or Path, optional): Dataset root, required for 'parquet'.
+        filters (list[tuple], optional): Extra (column, op, value) predicates.
+    Returns:
+        pyarrow.Table: Filtered table.
+    Raises:
+        ValueError: If the adapter does not produce tables or parquet_path is missing.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output_format: {output_format}. Must be one of {list(OUTPUT_FORMATS)}")
+    if not getattr(adapter, "SUPPORTS_TABLE", False):
+        raise ValueError(f"Columnar output is only supported for along-track datasets, not {adapter.dataset_name}")
+    if output_format == "parquet" and not parquet_path:
+        raise ValueError("output_format='parquet' requires 'parquet_path'.")
+    table = adapter.get_table()
+    if output_format == "arrow":
+        return filter_table(table, build_filters(adapter.start_time, adapter.end_time, adapter.bbox, filters))
+    written = write_parquet(table, parquet_path, source_basename(adapter))
+    return read_parquet(parquet_path, adapter.start_time, adapter.end_time, adapter.bbox, filters, files=written)
+
+
+def source_basename(adapter):
+    """
+    Stem of the Parquet files holding the table of an adapter's source files, so requests
+    that read the same file(s) rewrite the same Parquet files.
+    Args:
+        adapter (DataSourceAdapter): Adapter after get_table(), with raw_data_info set.
+    Returns:
+        str: '<dataset>-<source file name>', or '<dataset>-<digest of the names>' for several files.
+    """
+    sources = adapter.raw_data_info
+    names = sorted(Path(p).name for p in sources) if isinstance(sources, (list, tuple)) else [Path(sources).name]
+    if len(names) == 1:
+        return f"{adapter.dataset_name}-{names[0]}"
+    return f"{adapter.dataset_name}-{hashlib.md5(json.dumps(names).encode('utf-8')).hexdigest()[:16]}"
@@ -0,0 +1,273 @@
+"""
+Shared transfer layer: per-file retries with jittered exponential backoff, per-host
+concurrency limits that adapt to throttling, and resumable downloads into .part files.
+
+- RetryPolicy: how many attempts and how long to wait between them ("full jitter" backoff,
+  honouring Retry-After when the server sends it).
+- HostLimiter: additive-increase / multiplicative-decrease limit on concurrent transfers to one
+  host. Throttling responses (HTTP 429/503, FTP 421) halve the limit; successes raise it again.
+- retry_transfer(): runs one transfer under both.
+- http_download() / ftp_download(): stream into <target>.part, resume from the bytes already
+  received on retry, and rename into place only when complete, so a cached file is never partial.
+"""
+import ftplib
+import logging
+import os
+import random
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+import requests
+
+# (connect, read) timeouts for HTTP transfers, in seconds
+HTTP_TIMEOUT = (30, 300)
+THROTTLE_STATUS = (429, 503)
+
+
+class RetryPolicy:
+    """
+    Number of attempts and backoff between them.
+    """
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0):
+        """
+        Args:
+            max_attempts (int): Attempts per file, including the first one.
+            base_delay (float): Backoff scale in seconds.
+            max_delay (float): Upper bound of a single wait in seconds.
+        Raises:
+            ValueError: If max_attempts is smaller than 1.
+        """
+        if int(max_attempts) < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.max_attempts = int(max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Wait before the next attempt: uniform in [0, min(max_delay, base_delay * 2**attempt)],
+        or the server's Retry-After if it is longer.
+        Args:
+            attempt (int): Number of failed attempts so far, minus one.
+            retry_after (float, optional): Delay requested by the server.
+        Returns:
+            float: Seconds to wait.
+        """
+        wait = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            wait = max(wait, min(retry_after, self.max_delay))
+        return wait
+
+
+class HostLimiter:
+    """
+    Adaptive limit on concurrent transfers to one host (AIMD).
+    """
+    def __init__(self, initial=4, maximum=16):
+        self.limit = initial
+        self.maximum = maximum
+        self.active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one transfer slot for the duration of the block."""
+        with self._condition:
+            while self.active >= self.limit:
+                self._condition.wait()
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify_all()
+
+    def record(self, throttled=False):
+        """
+        Adapt the limit to the outcome of a transfer.
+        Args:
+            throttled (bool): True if the host signalled throttling, False on success.
+        """
+        with self._condition:
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+                    self._condition.notify_all()
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def host_limiter(host) -> HostLimiter:
+    """
+    Shared limiter of a host (one per process).
+    Args:
+        host (str): Host name.
+    Returns:
+        HostLimiter: The host's limiter.
+    """
+    with _LIMITERS_LOCK:
+        if host not in _LIMITERS:
+            _LIMITERS[host] = HostLimiter()
+        return _LIMITERS[host]
+
+
+def _http_status(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_throttled(exc) -> bool:
+    """Whether an error means the server is rate limiting us."""
+    if _http_status(exc) in THROTTLE_STATUS:
+        return True
+    if isinstance(exc, ftplib.error_temp) and str(exc).startswith("421"):
+        return True
+    stderr = getattr(exc, "stderr", None) or ""
+    return "429" in stderr or "Too Many Requests" in stderr
+
+
+def is_retryable(exc) -> bool:
+    """Whether an error is transient: throttling, server errors, resets and timeouts."""
+    status = _http_status(exc)
+    if status is not None:
+        return status in THROTTLE_STATUS or status >= 500
+    return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                            requests.exceptions.ChunkedEncodingError, ftplib.error_temp, ftplib.error_reply,
+                            EOFError, ConnectionError, TimeoutError, socket.timeout, subprocess.CalledProcessError))
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_transfer(func, host, description, policy=None, retryable=is_retryable):
+    """
+    Run a transfer with per-host concurrency limits and retries on transient errors.
+    Args:
+        func (callable): Performs one attempt; its return value is returned.
+        host (str): Host the transfer talks to, for the concurrency limit.
+        description (str): What is transferred, for log messages.
+        policy (RetryPolicy, optional): Retry policy; defaults to RetryPolicy().
+        retryable (callable): Predicate telling transient errors from permanent ones.
+    Returns:
+        Any: Result of func.
+    Raises:
+        Exception: The last error, once attempts are exhausted or the error is permanent.
+    """
+    policy = policy or RetryPolicy()
+    limiter = host_limiter(host)
+    attempt = 0
+    while True:
+        with limiter.slot():
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            else:
+                limiter.record(throttled=False)
+                return result
+        throttled = is_throttled(error)
+        if throttled:
+            limiter.record(throttled=True)
+        attempt += 1
+        if attempt >= policy.max_attempts or not retryable(error):
+            raise error
+        wait = policy.delay(attempt - 1, _retry_after(error))
+        logging.warning(f"Transfer of {description} failed ({error}); retry {attempt}/{policy.max_attempts - 1} "
+                        f"in {wait:.1f}s{' (throttled)' if throttled else ''}.")
+        time.sleep(wait)
+
+
+def part_path(target) -> Path:
+    """Temporary path a download of target is written to until it completes."""
+    target = Path(target)
+    return target.with_name(target.name + ".part")
+
+
+def http_download(url, target, policy=None, session=None):
+    """
+    Download a URL to target with retries, resuming from a partial .part file via Range requests.
+    Args:
+        url (str): Source URL.
+        target (Path): Destination file; only created once the download is complete.
+        policy (RetryPolicy, optional): Retry policy.
+        session (requests.Session, optional): Session to use; defaults to the requests module.
+    Returns:
+        Path: target.
+    Raises:
+        requests.exceptions.RequestException: If the download ultimately fails.
+    """
+    target, part = Path(target), part_path(target)
+    http = session or requests
+
+    def attempt():
+        offset = part.stat().st_size if part.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with http.get(url, stream=True, headers=headers, timeout=HTTP_TIMEOUT) as response:
+            if offset and response.status_code == 416:
+                return
+            response.raise_for_status()
+            mode = "ab" if offset and response.status_code == 206 else "wb"
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+
+    retry_transfer(attempt, urlparse(url).hostname or url, url, policy)
+    os.replace(part, target)
+    return target
+
+
+def ftp_download(host, user, password, remote_path, target, policy=None):
+    """
+    Download a file over FTP with retries, resuming from a partial .part file via REST when supported.
+    Args:
+        host (str): FTP host.
+        user (str): User name.
+        password (str): Password.
+        remote_path (str): Path of the file on the server.
+        target (Path): Destination file; only created once the download is complete.
+        policy (RetryPolicy, optional): Retry policy.
+    Returns:
+        Path: target.
+    Raises:
+        ftplib.Error or OSError: If the download ultimately fails.
+    """
+    target, part = Path(target), part_path(target)
+
+    def attempt():
+        offset = part.stat().st_size if part.exists() else 0
+        with ftplib.FTP(host) as ftp:
+            ftp.login(user, password)
+            if offset:
+                try:
+                    with open(part, "ab") as fp:
+                        ftp.retrbinary(f"RETR {remote_path}", fp.write, rest=offset)
+                    return
+                except ftplib.error_perm as e:
+                    if not str(e).startswith(("500", "502", "504")):
+                        raise
+                    logging.info(f"{host} does not support resuming; restarting {remote_path}.")
+            with open(part, "wb") as fp:
+                ftp.retrbinary(f"RETR {remote_path}", fp.write)
+
+    retry_transfer(attempt, host, f"ftp://{host}{remote_path}", policy)
+    os.replace(part, target)
+    return target
@@ -0,0 +1,104 @@
+"""
+Compact binary encoding of xarray Datasets, used between the data server and its clients.
+
+Layout:
+    MAGIC (6 bytes) | header length (uint32, little-endian) | JSON header | padding | array buffers
+
+The header lists every variable (coordinates first) with its dims, dtype, shape, attrs and
+the offset of its raw C-ordered buffer. Buffers are 8-byte aligned so the decoder can wrap
+them with numpy.frombuffer without copying. Nothing is pickled, so decoding untrusted
+payloads cannot execute code.
+"""
+import json
+import struct
+import numpy as np
+import xarray as xr
+
+MAGIC = b"STDL1\n"
+_ALIGN = 8
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def encode_dataset(dataset: xr.Dataset) -> bytearray:
+    """
+    Encode a Dataset into the binary wire format. Lazy variables are computed.
+    Numeric, boolean and datetime64/timedelta64 variables are sent as raw buffers;
+    other dtypes (strings, objects) are sent as JSON lists in the header.
+    Args:
+        dataset (xarray.Dataset): Dataset to encode.
+    Returns:
+        bytearray: Encoded payload.
+    """
+    entries, arrays, offset = [], [], 0
+    for name, variable in list(dataset.coords.items()) + list(dataset.data_vars.items()):
+        values = np.asarray(variable.values)
+        entry = {"name": str(name), "coord": name in dataset.coords, "dims": list(variable.dims),
+                 "attrs": _jsonable(variable.attrs)}
+        if values.dtype.kind in "biufcmM":
+            values = np.ascontiguousarray(values)
+            entry.update(dtype=values.dtype.newbyteorder("<").str, shape=list(values.shape),
+                         offset=offset, nbytes=values.nbytes)
+            arrays.append((values, offset))
+            offset = _aligned(offset + values.nbytes)
+        else:
+            entry.update(values=_jsonable(values), shape=list(values.shape))
+        entries.append(entry)
+    header = json.dumps({"attrs": _jsonable(dataset.attrs), "variables": entries}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    payload = bytearray(data_start + offset)
+    payload[:len(MAGIC)] = MAGIC
+    payload[len(MAGIC):len(MAGIC) + 4] = struct.pack("<I", len(header))
+    payload[len(MAGIC) + 4:len(MAGIC) + 4 + len(header)] = header
+    for values, start in arrays:
+        # Single copy, straight into the output buffer
+        target = np.frombuffer(payload, dtype=values.dtype.newbyteorder("<"), count=values.size,
+                               offset=data_start + start)
+        target[...] = values.reshape(-1)
+    return payload
+
+
+def decode_dataset(payload) -> xr.Dataset:
+    """
+    Decode a payload produced by encode_dataset. Array variables are read-only views of the payload.
+    Args:
+        payload (bytes or bytearray or memoryview): Encoded dataset.
+    Returns:
+        xarray.Dataset: Decoded dataset.
+    Raises:
+        ValueError: If the payload is not in the expected format.
+    """
+    view = memoryview(payload)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError("Payload is not an encoded dataset.")
+    (header_length,) = struct.unpack("<I", view[len(MAGIC):len(MAGIC) + 4])
+    header_end = len(MAGIC) + 4 + header_length
+    header = json.loads(bytes(view[len(MAGIC) + 4:header_end]).decode("utf-8"))
+    data_start = _aligned(header_end)
+    coords, data_vars = {}, {}
+    for entry in header["variables"]:
+        if "offset" in entry:
+            dtype = np.dtype(entry["dtype"])
+            values = np.frombuffer(view, dtype=dtype, count=int(np.prod(entry["shape"], dtype=np.int64)),
+                                   offset=data_start + entry["offset"]).reshape(entry["shape"])
+        else:
+            values = np.array(entry["values"], dtype=object).reshape(entry["shape"])
+        variable = xr.Variable(entry["dims"], values, attrs=entry["attrs"])
+        (coords if entry["coord"] else data_vars)[entry["name"]] = variable
+    return xr.Dataset(data_vars, coords=coords, attrs=header["attrs"])
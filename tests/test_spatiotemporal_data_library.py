@@ -71,4 +71,656 @@ def test_fetch_data_invalid_dataset():
             variables=["var"],
             start_time="2023-01-01T00:00:00Z",
             end_time="2023-01-01T01:00:00Z"
-        ) 
\ No newline at end of file
+        ) 
+def test_era5_plan_reports_cache_status(monkeypatch, tmp_path):
+    from spatiotemporal_data_library.adapters import era5
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    monkeypatch.setattr(era5, 'CACHE_DIR', tmp_path)
+    adapter = ERA5Adapter(DS_ECMWF_ERA5, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-01T03:00:00Z", bbox=[-5, 50, 0, 52])
+    plan = adapter.plan()
+    assert plan["n_units"] == 1 and plan["n_cached"] == 0
+    # 4 steps x 9 lat x 21 lon x 2 variables x 2 bytes
+    assert plan["estimated_download_bytes"] == 4 * 9 * 21 * 2 * 2
+    plan["units"][0]["target"].touch()
+    plan = adapter.plan()
+    assert plan["n_cached"] == 1 and plan["estimated_download_bytes"] == 0
+
+def test_era5_cache_target_is_stable_across_hash_seeds():
+    import os
+    import subprocess
+    import sys
+    code = ("from spatiotemporal_data_library.adapters.era5 import ERA5Adapter;"
+            "a = ERA5Adapter('ECMWF_ERA5', ['surface_wind_speed', 'surface_pressure', '2m_temperature'],"
+            " '2023-01-01T00:00:00Z', '2023-01-01T03:00:00Z');"
+            "print(a._cache_target(a._build_request_params()).name)")
+    names = {subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONHASHSEED=str(seed))).stdout for seed in range(4)}
+    assert len(names) == 1
+
+def test_fetch_data_dry_run_smap(monkeypatch, tmp_path):
+    from spatiotemporal_data_library.adapters import smap_rss
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    (tmp_path / "rss_smap_L3_daily_winds_v01.0_final_20230102.nc").write_bytes(b"x" * 10)
+    plan = fetch_data(
+        dataset_short_name=DS_SMAP_L3_RSS_FINAL,
+        variables=["surface_wind_speed"],
+        start_time="2023-01-01T00:00:00Z",
+        end_time="2023-01-03T00:00:00Z",
+        dry_run=True
+    )
+    assert plan["n_units"] == 3 and plan["n_cached"] == 1
+    assert plan["estimated_download_bytes"] == 2 * smap_rss.SMAPRSSAdapter.ESTIMATED_FILE_BYTES
+
+def _write_sfmr_ascii(path):
+    import gzip
+    with gzip.open(path, 'wt') as f:
+        f.write("# Date Time Lat Lon Sfc_WS RR\n")
+        f.write("20190828 95959 18.5 -65.2 30.5 2.0\n")
+        f.write("20190828 100000 18.6 -65.3 -99.9 3.5\n")
+        f.write("20190828 100001 18.7 -65.4 32.0 -99.9\n")
+
+def test_sfmr_ascii_parse_uses_parsed_cache(monkeypatch, tmp_path):
+    import numpy as np
+    import pandas as pd
+    from spatiotemporal_data_library.adapters import sfmr
+    from spatiotemporal_data_library.adapters.sfmr import SFMRAdapter
+    monkeypatch.setattr(sfmr, 'CACHE_DIR', tmp_path)
+    raw_path = tmp_path / "NOAA_SFMR20190828H1.dat.gz"
+    _write_sfmr_ascii(raw_path)
+    adapter = SFMRAdapter(DS_SFMR_HRD, ["surface_wind_speed"], "2019-08-28T00:00:00Z", "2019-08-29T00:00:00Z",
+                          storm_name="DORIAN", mission_id="20190828H1", sfmr_file_type="ascii")
+    ds = adapter._standardize_data(adapter._parse_data(raw_path))
+    assert ds['surface_wind_speed'].dtype == np.float32
+    assert np.isnan(ds['surface_wind_speed'].values[1])
+    assert ds['time'].values[0] == np.datetime64('2019-08-28T09:59:59')
+    monkeypatch.setattr(sfmr.pd, 'read_csv', lambda *args, **kwargs: pytest.fail("parsed cache not used"))
+    cached = adapter._standardize_data(adapter._parse_data(raw_path))
+    assert cached.identical(ds)
+    monkeypatch.undo()
+    monkeypatch.setattr(sfmr, 'CACHE_DIR', tmp_path)
+    import gzip, os
+    with gzip.open(raw_path, "wt") as f:
+        f.write("20190828 95959 18.5 -65.2 44.5 2.0\n")
+    stat = raw_path.stat()
+    os.utime(raw_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    updated = adapter._standardize_data(adapter._parse_data(raw_path))
+    assert updated['surface_wind_speed'].values.tolist() == [44.5]
+    assert [p.name for p in (tmp_path / "parsed").iterdir()] == ["NOAA_SFMR20190828H1.dat.gz.npz"]
+
+def test_fetch_data_sfmr_columnar_output(monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    from spatiotemporal_data_library.adapters import sfmr
+    monkeypatch.setattr(sfmr, 'CACHE_DIR', tmp_path)
+    _write_sfmr_ascii(tmp_path / "NOAA_SFMR20190828H1.dat.gz")
+    request = dict(dataset_short_name=DS_SFMR_HRD, variables=["surface_wind_speed"],
+                   start_time="2019-08-28T10:00:00Z", end_time="2019-08-28T11:00:00Z",
+                   storm_name="DORIAN", mission_id="20190828H1", sfmr_file_type="ascii")
+    table = fetch_data(output_format="arrow", **request)
+    assert table.num_rows == 2
+    assert table.column_names == ["time", "latitude", "longitude", "surface_wind_speed", "rain_rate"]
+    table = fetch_data(output_format="parquet", parquet_path=tmp_path / "sfmr.parquet",
+                       table_filters=[("rain_rate", "<", 3.0)], **request)
+    assert table.num_rows == 0
+    assert (tmp_path / "sfmr.parquet" / "date=2019-08-28").is_dir()
+    table = fetch_data(output_format="parquet", parquet_path=tmp_path / "sfmr.parquet", **request)
+    assert table.num_rows == 2
+    with pytest.raises(ValueError):
+        fetch_data(dataset_short_name=DS_SMAP_L3_RSS_FINAL, variables=["surface_wind_speed"],
+                   start_time="2023-01-01T00:00:00Z", end_time="2023-01-01T01:00:00Z", output_format="arrow")
+
+def test_parquet_output_is_keyed_on_source_file(monkeypatch, tmp_path):
+    pytest.importorskip("pyarrow")
+    from spatiotemporal_data_library.adapters import sfmr
+    from spatiotemporal_data_library.tabular import read_parquet
+    monkeypatch.setattr(sfmr, 'CACHE_DIR', tmp_path)
+    _write_sfmr_ascii(tmp_path / "NOAA_SFMR20190828H1.dat.gz")
+    request = dict(dataset_short_name=DS_SFMR_HRD, variables=["surface_wind_speed"], storm_name="DORIAN",
+                   mission_id="20190828H1", sfmr_file_type="ascii", output_format="parquet",
+                   parquet_path=tmp_path / "sfmr.parquet")
+    wide = fetch_data(start_time="2019-08-28T09:00:00Z", end_time="2019-08-28T11:00:00Z", **request)
+    narrow = fetch_data(start_time="2019-08-28T10:00:00Z", end_time="2019-08-28T10:30:00Z", **request)
+    assert wide.num_rows == 3
+    assert narrow.num_rows == 2
+    assert read_parquet(tmp_path / "sfmr.parquet").num_rows == 3
+    assert [p.name for p in (tmp_path / "sfmr.parquet").rglob("*.parquet")] == ["SFMR_HRD-NOAA_SFMR20190828H1.dat.gz-0.parquet"]
+
+def test_era5_derived_wind_is_lazy_and_drops_inputs():
+    import numpy as np
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    adapter = ERA5Adapter(DS_ECMWF_ERA5, ["surface_wind_speed", "surface_wind_direction"], "2023-01-01T00:00:00Z", "2023-01-01T01:00:00Z")
+    assert sorted(adapter.native_variables) == ["10m_u_component_of_wind", "10m_v_component_of_wind"]
+    raw = xr.Dataset(
+        {'u10': (('time', 'latitude', 'longitude'), np.full((2, 2, 2), 3.0, dtype=np.float32)),
+         'v10': (('time', 'latitude', 'longitude'), np.full((2, 2, 2), -4.0, dtype=np.float32))},
+        coords={'time': [0, 1], 'latitude': [50.0, 50.25], 'longitude': [0.0, 0.25]}).chunk({'time': 1})
+    ds = adapter._standardize_data(raw)
+    assert set(ds.data_vars) == {"surface_wind_speed", "surface_wind_direction"}
+    assert ds['surface_wind_speed'].chunks is not None
+    assert ds['surface_wind_speed'].dtype == np.float32
+    np.testing.assert_allclose(ds['surface_wind_speed'].values, 5.0)
+    np.testing.assert_allclose(ds['surface_wind_direction'].values, np.degrees(np.arctan2(3.0, -4.0)) + 180.0, rtol=1e-6)
+
+def test_oscar_current_speed_fetches_only_uv():
+    import numpy as np
+    from spatiotemporal_data_library.adapters.podaac import OSCARAdapter
+    adapter = OSCARAdapter(DS_OSCAR_V2_NRT, ["surface_current_speed"], "2023-01-01T00:00:00Z", "2023-01-02T00:00:00Z")
+    assert sorted(adapter.native_variables) == ["u", "v"]
+    raw = xr.Dataset({'u': (('lat',), [0.0, 1.0]), 'v': (('lat',), [1.0, 0.0]), 'ug': (('lat',), [9.0, 9.0])},
+                     coords={'lat': [0.0, 0.25]})
+    ds = adapter._standardize_data(adapter._select_native_variables(raw))
+    assert list(ds.data_vars) == ["surface_current_speed"]
+    np.testing.assert_allclose(ds['surface_current_speed'].values, [1.0, 1.0])
+
+def _write_packed_era5(path):
+    import numpy as np
+    shape = (2, 3, 4)
+    ds = xr.Dataset(
+        {'u10': (('time', 'latitude', 'longitude'), np.full(shape, 3.0)),
+         'v10': (('time', 'latitude', 'longitude'), np.full(shape, 4.0))},
+        coords={'time': np.array(['2023-01-01T00', '2023-01-01T01'], dtype='M8[ns]'),
+                'latitude': [50.5, 50.25, 50.0], 'longitude': [0.0, 0.25, 0.5, 0.75]})
+    ds['u10'][0, 0, 0] = np.nan
+    for var in ('u10', 'v10'):
+        ds[var].encoding.update(dtype='int16', scale_factor=0.001, add_offset=0.0, _FillValue=-32767)
+    ds.to_netcdf(path)
+    return ds
+
+@pytest.mark.parametrize("precision, var_dtype", [("float32", "float32"), ("packed", "int16")])
+def test_era5_compact_precision(tmp_path, precision, var_dtype):
+    import numpy as np
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    _write_packed_era5(tmp_path / "era5.nc")
+    adapter = ERA5Adapter(DS_ECMWF_ERA5, ["10m_u_component_of_wind", "surface_wind_speed"],
+                          "2023-01-01T00:00:00Z", "2023-01-01T01:00:00Z", precision=precision)
+    ds = adapter._standardize_data(adapter._parse_data(tmp_path / "era5.nc"))
+    assert ds['u10'].dtype == np.dtype(var_dtype)
+    assert ds['lat'].dtype == np.float32 and 'v10' not in ds
+    speed = ds['surface_wind_speed'].values
+    assert speed.dtype == np.float32 and np.isnan(speed[0, 0, 0])
+    np.testing.assert_allclose(speed[1], 5.0, rtol=1e-3)
+
+def test_float32_decoded_variables_round_trip_through_netcdf(tmp_path):
+    import numpy as np
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    original = _write_packed_era5(tmp_path / "era5.nc")
+    original['u10'][1, 1, 1] = 3.1234
+    original.to_netcdf(tmp_path / "era5.nc", mode="w")
+    adapter = ERA5Adapter(DS_ECMWF_ERA5, ["10m_u_component_of_wind"], "2023-01-01T00:00:00Z", "2023-01-01T01:00:00Z",
+                          precision="float32")
+    ds = adapter._standardize_data(adapter._parse_data(tmp_path / "era5.nc"))
+    ds.to_netcdf(tmp_path / "decoded.nc")
+    with xr.open_dataset(tmp_path / "decoded.nc") as back:
+        assert back['u10'].dtype == np.float32
+        assert np.isnan(back['u10'].values[0, 0, 0])
+        np.testing.assert_allclose(back['u10'].values, ds['u10'].values, rtol=1e-6)
+        assert abs(float(back['u10'][1, 1, 1]) - 3.123) < 1e-3
+
+def test_invalid_precision():
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    with pytest.raises(ValueError):
+        ERA5Adapter(DS_ECMWF_ERA5, ["10m_u_component_of_wind"], "2023-01-01T00:00:00Z", "2023-01-01T01:00:00Z", precision="float16")
+
+def test_benchmark_suite_runs_offline(tmp_path):
+    from benchmarks.run import run_benchmarks, STAGES
+    results = run_benchmarks(["small"], ["smap_rss", "sfmr"], data_dir=tmp_path)
+    assert set(results) == {f"small/{name}/{stage}" for name in ("smap_rss", "sfmr") for stage in STAGES}
+    assert results["small/smap_rss/fetch_raw_data"]["mb_per_s"] > 0
+    assert results["small/sfmr/parse_data"]["peak_mb"] > 0
+
+@pytest.mark.parametrize("spec", [{"time": "1D", "how": "mean"}, {"time": "12h", "how": "max"}, {"time": "hour", "how": "sum"}])
+def test_era5_streaming_aggregation_matches_full_resolution(monkeypatch, tmp_path, spec):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters import era5
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    monkeypatch.setattr(era5, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(era5, 'CDSAPIRC_PATH', tmp_path / ".cdsapirc")
+    (tmp_path / ".cdsapirc").touch()
+    monkeypatch.setattr(ERA5Adapter, 'STREAM_TIME_BLOCK', 5)
+    args = (DS_ECMWF_ERA5, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:00:00Z", [0, 50, 1, 51])
+    full_adapter = ERA5Adapter(*args)
+    synthetic.era5_for_request(full_adapter._cache_target(full_adapter._build_request_params()), full_adapter._build_request_params())
+    full = full_adapter.get_data().load()
+    aggregated = ERA5Adapter(*args, aggregate=spec).get_data()
+    if spec["time"] == "hour":
+        expected = full.groupby("time.hour").sum()
+    else:
+        expected = getattr(full.resample(time=spec["time"]), spec["how"])()
+    np.testing.assert_allclose(aggregated["surface_wind_speed"].values, expected["surface_wind_speed"].values, rtol=1e-5)
+
+def test_temporal_accumulator_updates_only_touched_bins(monkeypatch):
+    import numpy as np
+    from spatiotemporal_data_library import aggregate
+    times = np.arange("2023-01-01T00", "2023-01-03T00", dtype="datetime64[h]").astype("datetime64[ns]")
+    data = xr.Dataset({"wind": (("time", "lat"), np.random.default_rng(0).random((times.size, 3)))},
+                      coords={"time": times, "lat": [0.0, 1.0, 2.0]})
+    data["wind"][5, 1] = np.nan
+    concat = xr.concat
+    calls = []
+    monkeypatch.setattr(aggregate.xr, "concat", lambda *args, **kwargs: calls.append(1) or concat(*args, **kwargs))
+    for how in ("mean", "max"):
+        accumulator = aggregate.TemporalAccumulator({"time": "6h", "how": how})
+        for start in range(0, times.size, 5):
+            accumulator.add(data.isel(time=slice(start, start + 5)))
+        assert not calls
+        expected = getattr(data.resample(time="6h"), how)()
+        np.testing.assert_allclose(accumulator.result()["wind"].values, expected["wind"].values, rtol=1e-12)
+        calls.clear()
+
+def test_smap_parse_workers_matches_serial(tmp_path):
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters.smap_rss import SMAPRSSAdapter
+    paths = synthetic.smap_rss_files(tmp_path, datetime.date(2023, 1, 1), 3, n_lat=8, n_lon=16)
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-03T23:59:59Z")
+    serial = SMAPRSSAdapter(*args)._parse_data(paths)
+    parallel = SMAPRSSAdapter(*args, parse_workers=2)._parse_data(list(reversed(paths)))
+    xr.testing.assert_identical(parallel, serial.load())
+
+def test_granule_watcher_picks_up_later_granules_of_a_seen_day(tmp_path):
+    import shutil
+    from benchmarks import synthetic
+    from benchmarks.standins import patched_services
+    from spatiotemporal_data_library.adapters.podaac import NOAACygnssL2Adapter
+    from spatiotemporal_data_library.watch import GranuleWatcher
+    source = tmp_path / "source" / "podaac" / NOAACygnssL2Adapter.COLLECTION_SHORT_NAME
+    first, = synthetic.cygnss_files(source, datetime.date(2023, 1, 1), 1, 50)
+    with patched_services(tmp_path / "source", tmp_path / "cache"):
+        watcher = GranuleWatcher(DS_NOAA_CYGNSS_L2, ["surface_wind_speed"], tmp_path / "store", start_time="2023-01-01T00:00:00+00:00")
+        assert [p.name for p in watcher.poll(now="2023-01-01T12:00:00+00:00")] == [f"{first.stem}.nc"]
+        second = source / first.name.replace("-000000-", "-120000-")
+        shutil.copy(first, second)
+        appended = watcher.poll(now="2023-01-01T23:00:00+00:00")
+        assert [p.name for p in appended] == [f"{second.stem}.nc"]
+        assert watcher.poll(now="2023-01-01T23:30:00+00:00") == []
+
+@pytest.mark.parametrize("transport", ["tcp", "unix"])
+def test_data_server_coalesces_and_caches(monkeypatch, tmp_path, transport):
+    import threading
+    import time
+    import numpy as np
+    from spatiotemporal_data_library import resultcache, server
+    calls = []
+    source = tmp_path / "source.nc"
+    source.write_text("v1")
+    def fake_fetch_result(adapter=None, *args):
+        if adapter is not None:
+            calls.append(adapter)
+            adapter.raw_data_info = [source]
+            time.sleep(0.3)
+        return xr.Dataset({"wind": (("time",), np.arange(3, dtype="float32"), {"units": "m s-1"})},
+                          coords={"time": np.array(["2023-01-01", "2023-01-02", "2023-01-03"], dtype="datetime64[ns]")})
+    monkeypatch.setattr(server, "fetch_result", fake_fetch_result)
+    options = {"unix_socket": str(tmp_path / "stdl.sock")} if transport == "unix" else {"port": 0}
+    with server.DataServer(**options) as data_server:
+        client = server.DataClient(data_server.url)
+        args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], datetime.datetime(2023, 1, 1), "2023-01-03T00:00:00Z")
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.fetch_data(*args))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        cached = client.fetch_data(*args)
+        status = client.status()
+        # A changed source file or an expired near-real-time result is fetched again
+        source.write_text("v2 with another size")
+        client.fetch_data(*args)
+        client.fetch_data(*args)
+        nrt_args = (DS_OSCAR_V2_NRT, ["surface_current_speed"], "2023-01-01T00:00:00Z", "2023-01-02T00:00:00Z")
+        monkeypatch.setattr(resultcache, "DEFAULT_NRT_TTL", 0)
+        client.fetch_data(*nrt_args)
+        client.fetch_data(*nrt_args)
+        assert [c.dataset_name for c in calls] == [DS_SMAP_L3_RSS_FINAL] * 2 + [DS_OSCAR_V2_NRT] * 2
+        for option in ({"export": str(tmp_path / "out.nc")}, {"hot_cache": str(tmp_path / "hot")},
+                       {"result_cache": str(tmp_path / "results")}, {"mission_id": "../../escape"}):
+            with pytest.raises(ValueError):
+                client.fetch_data(*args, **option)
+    assert calls[0].start_time == datetime.datetime(2023, 1, 1)
+    assert status["fetches"] == 1 and status["coalesced"] == 3 and status["cache_hits"] == 1
+    for ds in results + [cached]:
+        xr.testing.assert_identical(ds, fake_fetch_result())
+    assert not (tmp_path / "out.nc").exists() and not (tmp_path / "hot").exists()
+
+def test_granule_watcher_appends_only_new_granules(tmp_path):
+    from benchmarks import synthetic
+    from benchmarks.standins import patched_services
+    from spatiotemporal_data_library.adapters.podaac import OSCARAdapter
+    from spatiotemporal_data_library.watch import GranuleWatcher
+    source = tmp_path / "source" / "podaac" / OSCARAdapter.COLLECTION_MAP["nrt"]
+    synthetic.oscar_files(source, datetime.date(2023, 1, 1), 2, n_lat=4, n_lon=8)
+    with patched_services(tmp_path / "source", tmp_path / "cache"):
+        watcher = GranuleWatcher(DS_OSCAR_V2_NRT, ["surface_current_speed"], tmp_path / "store", start_time="2023-01-01T00:00:00+00:00")
+        assert len(watcher.poll(now="2023-01-02T12:00:00+00:00")) == 2
+        synthetic.oscar_files(source, datetime.date(2023, 1, 3), 1, n_lat=4, n_lon=8)
+        resumed = GranuleWatcher(DS_OSCAR_V2_NRT, ["surface_current_speed"], tmp_path / "store", start_time="2023-01-01T00:00:00+00:00")
+        appended = resumed.poll(now="2023-01-03T12:00:00+00:00")
+        assert [p.name for p in appended] == ["oscar_currents_nrt_20230103.nc"]
+        assert resumed.poll(now="2023-01-03T18:00:00+00:00") == []
+        assert resumed.high_water_mark.startswith("2023-01-03")
+        ds = resumed.open()
+        # The PO.DAAC cache now only returns granules of the requested days
+        adapter = OSCARAdapter(DS_OSCAR_V2_NRT, ["zonal_surface_current"], "2023-01-02T00:00:00Z", "2023-01-02T23:00:00Z", oscar_product_type="nrt")
+        assert [p.name for p in adapter._fetch_raw_data(adapter._build_request_params())] == ["oscar_currents_nrt_20230102.nc"]
+    assert ds.sizes["time"] == 3 and list(ds.data_vars) == ["surface_current_speed"]
+
+def test_http_download_retries_and_resumes(tmp_path):
+    import http.server
+    import threading
+    from spatiotemporal_data_library import transfer
+    body = bytes(range(256)) * 1024
+    seen_ranges = []
+    class FlakyHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+        def do_GET(self):
+            seen_ranges.append(self.headers.get("Range"))
+            if len(seen_ranges) == 1:
+                self.send_response(503)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif len(seen_ranges) == 2:
+                # Drop the connection half way through the body
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[:len(body) // 2])
+                self.close_connection = True
+            else:
+                start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+                self.send_response(206)
+                self.send_header("Content-Length", str(len(body) - start))
+                self.end_headers()
+                self.wfile.write(body[start:])
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        target = tmp_path / "flight.dat.gz"
+        url = f"http://127.0.0.1:{server.server_address[1]}/flight.dat.gz"
+        transfer.http_download(url, target, transfer.RetryPolicy(max_attempts=4, base_delay=0.01))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert target.read_bytes() == body and not transfer.part_path(target).exists()
+    assert seen_ranges[:2] == [None, None] and seen_ranges[2].startswith("bytes=") and seen_ranges[2] != "bytes=0-"
+    assert transfer.host_limiter("127.0.0.1").limit < transfer.HostLimiter().limit
+
+@pytest.mark.parametrize("suffix", [".nc", ".zarr"])
+def test_fetch_data_streaming_export_matches_get_data(monkeypatch, tmp_path, suffix):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters import era5
+    from spatiotemporal_data_library.adapters.era5 import ERA5Adapter
+    if suffix == ".zarr":
+        pytest.importorskip("zarr")
+    monkeypatch.setattr(era5, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(era5, 'CDSAPIRC_PATH', tmp_path / ".cdsapirc")
+    (tmp_path / ".cdsapirc").touch()
+    monkeypatch.setattr(ERA5Adapter, 'STREAM_TIME_BLOCK', 7)
+    args = (DS_ECMWF_ERA5, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:00:00Z", [0, 50, 1, 51])
+    adapter = ERA5Adapter(*args)
+    synthetic.era5_for_request(adapter._cache_target(adapter._build_request_params()), adapter._build_request_params())
+    expected = adapter.get_data().load()
+    exported = fetch_data(*args, export=str(tmp_path / f"out{suffix}"), export_options={"chunks": {"lat": 3}})
+    assert exported.sizes["time"] == 48
+    np.testing.assert_allclose(exported["surface_wind_speed"].values, expected["surface_wind_speed"].values, rtol=1e-6)
+    np.testing.assert_array_equal(exported["time"].values, expected["time"].values)
+    if suffix == ".nc":
+        assert exported["surface_wind_speed"].encoding["chunksizes"][1] == 3
+    for option in ({"hot_cache": True}, {"max_cells": 4}, {"result_cache": str(tmp_path / "results")}):
+        with pytest.raises(ValueError):
+            fetch_data(*args, export=str(tmp_path / f"rejected{suffix}"), **option)
+    assert not (tmp_path / f"rejected{suffix}").exists()
+
+def test_smap_hot_cache_serves_memmapped_subsets(monkeypatch, tmp_path):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters import smap_rss
+    paths = synthetic.smap_rss_files(tmp_path / "src", datetime.date(2023, 1, 1), 2, n_lat=36, n_lon=72)
+    for path in paths:
+        path.rename(tmp_path / path.name)
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:00:00Z", [10, -20, 60, 30])
+    expected = fetch_data(*args).load()
+    first = fetch_data(*args, hot_cache=str(tmp_path / "hot"))
+    mtimes = {p: p.stat().st_mtime_ns for p in (tmp_path / "hot").rglob("*.npy")}
+    second = smap_rss.SMAPRSSAdapter(*args, hot_cache=str(tmp_path / "hot")).get_data()
+    xr.testing.assert_identical(first, expected)
+    xr.testing.assert_identical(second, expected)
+    assert len(mtimes) > 0 and {p: p.stat().st_mtime_ns for p in mtimes} == mtimes
+    assert not list((tmp_path / "hot").rglob("*.tmp"))
+    whole_day = smap_rss.SMAPRSSAdapter(DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-02T00:00:00Z", "2023-01-02T23:59:00Z",
+                                        [10, -20, 60, 30], hot_cache=str(tmp_path / "hot")).get_data()
+    assert isinstance(whole_day["wind"].data.base, np.memmap) or isinstance(whole_day["wind"].data, np.memmap)
+    one_day = smap_rss.SMAPRSSAdapter(DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-02T03:00:00Z", "2023-01-02T06:00:00Z",
+                                      [10, -20, 60, 30], hot_cache=str(tmp_path / "hot")).get_data()
+    np.testing.assert_array_equal(one_day["time"].values, expected["time"].values[1:])
+    xr.testing.assert_identical(one_day, fetch_data(DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-02T03:00:00Z",
+                                                    "2023-01-02T06:00:00Z", [10, -20, 60, 30]).load())
+
+def test_executor_runs_daily_windows_on_worker_processes(monkeypatch, tmp_path):
+    import multiprocessing
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    from benchmarks import synthetic
+    from spatiotemporal_data_library import config, distributed
+    from spatiotemporal_data_library.adapters import smap_rss
+    paths = synthetic.smap_rss_files(tmp_path / "src", datetime.date(2023, 1, 1), 3, n_lat=8, n_lon=16)
+    for path in paths:
+        path.rename(tmp_path / path.name)
+    # Spawned workers resolve the shared cache from the environment
+    monkeypatch.setenv(config.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(config, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-03T23:00:00Z", [10, -20, 60, 30])
+    expected = fetch_data(*args).load()
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        result = fetch_data(*args, executor=pool)
+        windows = sorted((tmp_path / "distributed").rglob("*.nc"))
+        mtimes = [p.stat().st_mtime_ns for p in windows]
+        again = fetch_data(*args, executor=pool)
+        unchanged = [p.stat().st_mtime_ns for p in windows]
+        # A changed source file recomputes only its own window
+        source = tmp_path / paths[0].name
+        os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10**9))
+        adapter = smap_rss.SMAPRSSAdapter(*args, executor=pool)
+        refreshed = adapter.get_data()
+        xr.testing.assert_identical(refreshed.load(), smap_rss.SMAPRSSAdapter(*args).get_data().load())
+    xr.testing.assert_identical(result.load(), expected)
+    xr.testing.assert_identical(again.load(), expected)
+    assert len(windows) == 3 and unchanged == mtimes
+    assert [p.stat().st_mtime_ns != m for p, m in zip(windows, mtimes)] == [True, False, False]
+    assert adapter.raw_data_info == sorted(tmp_path / p.name for p in paths)
+    assert len(distributed.split_time_windows(datetime.datetime(2023, 1, 1, 12), datetime.datetime(2023, 1, 3, 6))) == 3
+    with pytest.raises(ValueError):
+        fetch_data(*args, executor=pool, aggregate={"time": "1D"})
+
+def test_qc_filters_drop_samples_and_mask_grids(tmp_path):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters.podaac import NOAACygnssL2Adapter
+    from spatiotemporal_data_library.adapters.smap_rss import SMAPRSSAdapter
+    paths = synthetic.cygnss_files(tmp_path / "cygnss", datetime.date(2023, 1, 1), 2, 500)
+    args = (DS_NOAA_CYGNSS_L2, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:59:59Z")
+    qc = [("quality_flags", "bits_clear", 0b101), ("surface_wind_speed", "<", 10.0)]
+    full = xr.concat([xr.open_dataset(p) for p in paths], dim="sample")
+    keep = ((full["quality_flags"].values & 0b101) == 0) & (full["wind_speed"].values < 10.0)
+    for workers in (1, 2):
+        filtered = NOAACygnssL2Adapter(*args, qc=qc, parse_workers=workers)._parse_data(paths)
+        assert filtered.sizes["sample"] == keep.sum() < full.sizes["sample"]
+        np.testing.assert_array_equal(filtered["wind_speed"].values, full["wind_speed"].values[keep])
+    smap_paths = synthetic.smap_rss_files(tmp_path / "smap", datetime.date(2023, 1, 1), 1, n_lat=8, n_lon=16)
+    smap_args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-01T23:59:59Z")
+    for precision in ("float64", "packed"):
+        masked = SMAPRSSAdapter(*smap_args, precision=precision, qc=[("time_of_day_utc_minute", "<", 720)])._parse_data(smap_paths)
+        wind = SMAPRSSAdapter(*smap_args)._parse_data(smap_paths)
+        expected = wind["wind"].where(wind["minute"] < 720)
+        actual = masked["wind"] if precision == "float64" else masked["wind"].astype("float64") * masked["wind"].attrs["scale_factor"]
+        if precision == "packed":
+            actual = actual.where(masked["wind"] != masked["wind"].attrs["_FillValue"])
+        np.testing.assert_allclose(actual.values, expected.values, atol=1e-6)
+    # A flag word with a _FillValue decodes to float with NaN, and a missing flag never passes
+    from spatiotemporal_data_library import qc as qc_module
+    flagged = xr.Dataset({"quality_flags": (("sample",), np.array([0, 4, -1, 1], dtype="int16")),
+                          "wind_speed": (("sample",), np.arange(4.0))})
+    flagged.to_netcdf(tmp_path / "flags.nc", encoding={"quality_flags": {"_FillValue": -1}})
+    with xr.open_dataset(tmp_path / "flags.nc") as decoded:
+        assert decoded["quality_flags"].dtype.kind == "f" and np.isnan(decoded["quality_flags"].values[2])
+        kept = qc_module.apply_qc(decoded.load(), [("quality_flags", "bits_clear", 0b010)])
+        assert kept["wind_speed"].values.tolist() == [0.0, 1.0, 3.0]
+        kept = qc_module.apply_qc(decoded, [("quality_flags", "bits_set", 0)])
+        assert kept["wind_speed"].values.tolist() == [0.0, 1.0, 3.0]
+    with pytest.raises(ValueError):
+        SMAPRSSAdapter(*smap_args, qc=[("minute", "~", 1)])
+
+def test_packed_precision_decodes_variables_packed_differently_across_files(tmp_path):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters.smap_rss import SMAPRSSAdapter
+    from spatiotemporal_data_library.precision import decode_packed
+    paths = synthetic.smap_rss_files(tmp_path, datetime.date(2023, 1, 1), 3, n_lat=8, n_lon=16)
+    with xr.open_dataset(paths[1]) as ds:
+        rescaled = ds.load()
+    rescaled.to_netcdf(paths[1], encoding={"wind": synthetic._packed(0.05)})
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-03T23:59:59Z")
+    expected = SMAPRSSAdapter(*args)._parse_data(paths)["wind"].load()
+    for workers in (1, 2):
+        packed = SMAPRSSAdapter(*args, precision="packed", parse_workers=workers)._parse_data(paths)
+        assert packed["wind"].dtype == np.float32 and "scale_factor" not in packed["wind"].attrs
+        np.testing.assert_allclose(packed["wind"].values, expected.values, atol=1e-5)
+    same = SMAPRSSAdapter(*args, precision="packed")._parse_data([paths[0], paths[2]])
+    assert same["wind"].dtype == np.int16
+    np.testing.assert_allclose(decode_packed(same["wind"]).values, expected.values[[0, 2]], atol=1e-5)
+
+def test_smap_sub_daily_window_filters_pixels_by_observation_minute(monkeypatch, tmp_path):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library.adapters import smap_rss
+    paths = synthetic.smap_rss_files(tmp_path / "src", datetime.date(2023, 1, 1), 2, n_lat=8, n_lon=48)
+    for path in paths:
+        path.rename(tmp_path / path.name)
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    whole = fetch_data(DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:59:59Z").load()
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-02T03:00:00Z", "2023-01-02T06:00:00Z")
+    window = fetch_data(*args).load()
+    times = smap_rss.pixel_times(whole["minute"].values[1], whole["time"].values[1])
+    inside = (times >= np.datetime64("2023-01-02T03:00")) & (times <= np.datetime64("2023-01-02T06:00"))
+    assert window.sizes["time"] == 1 and window.sizes["lon"] == whole.sizes["lon"]
+    assert np.isfinite(window["wind"].values).sum() == (inside & np.isfinite(whole["wind"].values[1])).sum()
+    minutes = window["minute"].values[np.isfinite(window["minute"].values)]
+    assert minutes.size and minutes.min() >= 180 and minutes.max() <= 360
+    # Only the box covering the window is read, but the result matches masking the full grid
+    np.testing.assert_array_equal(window["wind"].values[0], np.where(inside, whole["wind"].values[1], np.nan))
+    for precision in ("float32", "packed"):
+        compact = fetch_data(*args, precision=precision)
+        decoded = compact["wind"] if precision == "float32" else smap_rss.decode_packed(compact["wind"])
+        np.testing.assert_allclose(decoded.values, window["wind"].values, rtol=1e-6, atol=0.01)
+    hot = fetch_data(*args, hot_cache=str(tmp_path / "hot"))
+    parallel = fetch_data(*args, parse_workers=2)
+    xr.testing.assert_identical(hot.load(), window)
+    xr.testing.assert_identical(parallel, window)
+    # A window across midnight cuts both days; inside the bbox only the first day has matching pixels
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T20:00:00Z", "2023-01-02T04:00:00Z", [10, -20, 60, 30])
+    window = fetch_data(*args).load()
+    assert window.sizes["time"] == 2 and window.sizes["lat"] > 0 and window.sizes["lon"] > 0
+    assert np.isfinite(window["wind"].values[0]).any() and not np.isfinite(window["wind"].values[1]).any()
+    xr.testing.assert_identical(fetch_data(*args, hot_cache=str(tmp_path / "hot")).load(), window)
+    xr.testing.assert_identical(fetch_data(*args, parse_workers=2), window)
+    for target in ("window.nc", "window.zarr"):
+        exported = fetch_data(*args, export=str(tmp_path / target)).load()
+        xr.testing.assert_allclose(exported.drop_encoding(), window)
+
+def test_result_cache_memoizes_and_invalidates_on_source_change(monkeypatch, tmp_path):
+    import json
+    import os
+    from benchmarks import synthetic
+    from spatiotemporal_data_library import resultcache
+    from spatiotemporal_data_library.adapters import smap_rss
+    paths = synthetic.smap_rss_files(tmp_path / "src", datetime.date(2023, 1, 1), 2, n_lat=8, n_lon=16)
+    for path in paths:
+        path.rename(tmp_path / path.name)
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    calls = []
+    get_data = smap_rss.SMAPRSSAdapter.get_data
+    monkeypatch.setattr(smap_rss.SMAPRSSAdapter, 'get_data', lambda self: calls.append(1) or get_data(self))
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:59:59Z", [10, -20, 60, 30])
+    options = {"result_cache": str(tmp_path / "results")}
+    resultcache.clear_memory()
+    first = fetch_data(*args, **options)
+    memory_hit = fetch_data(*args[:2], datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc), *args[3:], **options)
+    resultcache.clear_memory()
+    disk_hit = fetch_data(*args, **options)
+    assert len(calls) == 1
+    xr.testing.assert_identical(memory_hit, first)
+    xr.testing.assert_identical(disk_hit, first)
+    memory_hit["wind"][:] = 0
+    xr.testing.assert_identical(fetch_data(*args, **options), first)
+    # Hits only stat the files the request read: other files in the cache directory do not matter
+    monkeypatch.setattr(smap_rss.SMAPRSSAdapter, 'plan', lambda self: pytest.fail("hits must not list the fetch plan"))
+    for path in synthetic.smap_rss_files(tmp_path / "later", datetime.date(2023, 1, 5), 1, n_lat=8, n_lon=16):
+        path.rename(tmp_path / path.name)
+    (tmp_path / "unrelated.txt").write_text("new")
+    xr.testing.assert_identical(fetch_data(*args, **options), first)
+    assert len(calls) == 1
+    meta, = [json.loads(p.read_text()) for p in (tmp_path / "results").glob("*.json")]
+    assert [entry[0] for entry in meta["dependencies"]] == sorted(str(tmp_path / p.name) for p in paths)
+    stat = (tmp_path / paths[0].name).stat()
+    os.utime(tmp_path / paths[0].name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    fetch_data(*args, **options)
+    fetch_data(*args, result_cache_ttl=0, **options)
+    assert len(calls) == 3
+    # A disk hit has the dtypes and attributes of a miss in every precision
+    for precision in ("float32", "packed"):
+        resultcache.clear_memory()
+        miss = fetch_data(*args, precision=precision, **options)
+        resultcache.clear_memory()
+        disk_hit = fetch_data(*args, precision=precision, **options)
+        assert disk_hit["wind"].dtype == miss["wind"].dtype == ("float32" if precision == "float32" else "int16")
+        xr.testing.assert_identical(disk_hit, miss)
+    assert len(calls) == 5
+    assert resultcache.result_key(smap_rss.SMAPRSSAdapter(DS_SMAP_L3_RSS_FINAL, ["time_of_day_utc_minute", "surface_wind_speed"], *args[2:])) == \
+        resultcache.result_key(smap_rss.SMAPRSSAdapter(DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed", "time_of_day_utc_minute"], *args[2:]))
+
+def test_overview_levels_serve_coarse_requests(monkeypatch, tmp_path):
+    import numpy as np
+    from benchmarks import synthetic
+    from spatiotemporal_data_library import overviews
+    from spatiotemporal_data_library.adapters import smap_rss
+    paths = synthetic.smap_rss_files(tmp_path / "src", datetime.date(2023, 1, 1), 2, n_lat=32, n_lon=64)
+    for path in paths:
+        path.rename(tmp_path / path.name)
+    monkeypatch.setattr(smap_rss, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(overviews, 'OVERVIEW_DIR', tmp_path / "overviews")
+    args = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T00:00:00Z", "2023-01-02T23:59:59Z")
+    native = fetch_data(*args).load()
+    coarse = fetch_data(*args, resolution=25.0).load()
+    assert coarse.attrs["overview_factor"] == 4 and coarse.sizes["lat"] == 8 and coarse.sizes["lon"] == 16
+    expected = native["wind"].coarsen(lat=4, lon=4).mean()
+    np.testing.assert_allclose(coarse["wind"].values, expected.values, rtol=1e-6)
+    built = {p: p.stat().st_mtime_ns for p in (tmp_path / "overviews").rglob("*.nc")}
+    assert len(built) == 2 * len(overviews.OVERVIEW_FACTORS)
+    fitted = fetch_data(*args, bbox=[0, -45, 180, 45], max_cells=100)
+    assert fitted.attrs["overview_factor"] == 4 and fitted.sizes["lat"] * fitted.sizes["lon"] <= 100
+    assert {p: p.stat().st_mtime_ns for p in built} == built
+    assert "overview_factor" not in fetch_data(*args, max_cells=10 ** 6).attrs
+    # Packed variables are decoded before averaging, so fill values never enter the means
+    packed = fetch_data(*args, resolution=25.0, precision="packed").load()
+    assert packed["wind"].dtype == np.float32
+    np.testing.assert_allclose(packed["wind"].values, expected.values, rtol=1e-4, atol=0.01)
+    # Whole days come from the stored levels; days cut by a sub-daily window are masked per pixel
+    # at native resolution and coarsened afterwards
+    parse_data = smap_rss.SMAPRSSAdapter._parse_data
+    parsed = []
+    monkeypatch.setattr(smap_rss.SMAPRSSAdapter, '_parse_data', lambda self, paths: parsed.append(paths) or parse_data(self, paths))
+    fetch_data(*args, resolution=25.0)
+    assert parsed == []
+    sub_daily = (DS_SMAP_L3_RSS_FINAL, ["surface_wind_speed"], "2023-01-01T22:10:00Z", "2023-01-02T04:00:00Z", [10, -20, 60, 30])
+    native_window = fetch_data(*sub_daily[:4]).load()
+    for option in ({"resolution": 12.0}, {"max_cells": 10}):
+        window = fetch_data(*sub_daily, **option).load()
+        factor = window.attrs["overview_factor"]
+        assert factor > 1 and window.sizes["time"] == 2
+        assert window.sizes["lat"] > 0 and window.sizes["lon"] > 0 and np.isfinite(window["wind"].values).any()
+        expected_window = native_window["wind"].coarsen(lat=factor, lon=factor).mean().sel(lat=window["lat"], lon=window["lon"])
+        np.testing.assert_allclose(window["wind"].values, expected_window.values, rtol=1e-6)
+    assert {p: p.stat().st_mtime_ns for p in built} == built